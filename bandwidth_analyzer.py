@@ -7,9 +7,10 @@ from textual.app import App, ComposeResult
 from textual.containers import Container, Vertical, ScrollableContainer
 from textual.widgets import Header, Footer, Button, Static, DataTable
 from textual.binding import Binding
-import psutil
-import time
 from collections import defaultdict
+from net_sampler import get_sampler
+from sock_diag import ProcessTraffic
+from table_utils import sync_table
 
 
 class BandwidthAnalyzerApp(App):
@@ -72,10 +73,11 @@ class BandwidthAnalyzerApp(App):
     def __init__(self):
         super().__init__()
         self.monitoring = False
-        self.last_io = {}
-        self.last_time = time.time()
+        self.collecting = False
+        self.traffic = None
         self.sort_column = "download"
         self.sort_reverse = True
+        self.sampler = get_sampler()
     
     def compose(self) -> ComposeResult:
         """Compone la interfaz de usuario"""
@@ -127,15 +129,23 @@ class BandwidthAnalyzerApp(App):
         """Inicia la monitorización"""
         if not self.monitoring:
             self.monitoring = True
+            # Las velocidades totales se leen de la última muestra al actualizar
+            self.sampler.acquire()
             self.notify("Monitoreo iniciado", severity="information")
             self.update_processes()
             self.set_interval(2.0, self.update_processes)
     
     def pause_monitoring(self) -> None:
         """Pausa la monitorización"""
+        if self.monitoring:
+            self.sampler.release()
         self.monitoring = False
         self.notify("Monitorización pausada", severity="warning")
     
+    def on_unmount(self) -> None:
+        if self.monitoring:
+            self.sampler.release()
+    
     def action_refresh(self) -> None:
         """Actualiza manualmente"""
         if self.monitoring:
@@ -150,76 +160,33 @@ class BandwidthAnalyzerApp(App):
         self.notify("Orden invertido", severity="information")
     
     def update_processes(self) -> None:
-        """Actualiza la información de procesos"""
-        if not self.monitoring:
+        """Lanza la lectura de procesos en un hilo (si no hay otra en curso)"""
+        if not self.monitoring or self.collecting:
             return
-        
+        self.collecting = True
+        self.run_worker(self.collect_processes, thread=True)
+    
+    def collect_processes(self) -> None:
+        """Una enumeración de sockets para todo el sistema (hilo de trabajo)"""
         try:
-            current_time = time.time()
-            time_diff = current_time - self.last_time
-            
-            # Obtener I/O de red total
-            net_io = psutil.net_io_counters()
-            total_sent = net_io.bytes_sent
-            total_recv = net_io.bytes_recv
-            
-            # Calcular velocidades totales
-            if hasattr(self, 'last_total_sent'):
-                total_download_speed = (total_recv - self.last_total_recv) / time_diff
-                total_upload_speed = (total_sent - self.last_total_sent) / time_diff
-            else:
-                total_download_speed = 0
-                total_upload_speed = 0
-            
-            self.last_total_sent = total_sent
-            self.last_total_recv = total_recv
-            
-            # Obtener procesos con conexiones de red
-            processes_data = []
-            
-            for proc in psutil.process_iter(['pid', 'name', 'username']):
-                try:
-                    pid = proc.info['pid']
-                    name = proc.info['name']
-                    username = proc.info['username'] or "N/A"
-                    
-                    # Obtener conexiones
-                    connections = proc.connections(kind='inet')
-                    num_connections = len(connections)
-                    
-                    if num_connections > 0:
-                        # Intentar obtener I/O (puede requerir permisos)
-                        try:
-                            io = proc.io_counters()
-                            current_read = io.read_bytes
-                            current_write = io.write_bytes
-                            
-                            if pid in self.last_io:
-                                download = (current_read - self.last_io[pid]['read']) / time_diff
-                                upload = (current_write - self.last_io[pid]['write']) / time_diff
-                            else:
-                                download = 0
-                                upload = 0
-                            
-                            self.last_io[pid] = {
-                                'read': current_read,
-                                'write': current_write
-                            }
-                        except (psutil.AccessDenied, psutil.NoSuchProcess):
-                            download = 0
-                            upload = 0
-                        
-                        processes_data.append({
-                            'pid': pid,
-                            'name': name,
-                            'username': username,
-                            'download': download,
-                            'upload': upload,
-                            'connections': num_connections
-                        })
-                
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
+            if self.traffic is None:
+                self.traffic = ProcessTraffic()
+            processes_data = self.traffic.sample()
+        except Exception as e:
+            self.collecting = False
+            self.call_from_thread(self.notify, f"Error al actualizar: {str(e)}", severity="error")
+            return
+        self.collecting = False
+        self.call_from_thread(self.show_processes, processes_data)
+    
+    def show_processes(self, processes_data) -> None:
+        """Pinta la tabla de procesos y las estadísticas totales"""
+        try:
+            # Velocidades totales calculadas por el muestreador compartido
+            total_rates = self.sampler.snapshot().total_rates
+            total_download_speed = total_rates.bytes_recv
+            total_upload_speed = total_rates.bytes_sent
+            has_bytes = self.traffic.has_bytes
             
             # Ordenar según columna seleccionada
             processes_data.sort(
@@ -229,29 +196,30 @@ class BandwidthAnalyzerApp(App):
             
             # Actualizar tabla
             table = self.query_one("#processes-table", DataTable)
-            table.clear()
-            
+            rows = {}
             for proc in processes_data[:50]:  # Limitar a top 50
-                table.add_row(
+                rows[proc['pid']] = (
                     str(proc['pid']),
                     proc['name'][:30],
                     proc['username'][:15],
-                    self.format_bytes(proc['download']) + "/s",
-                    self.format_bytes(proc['upload']) + "/s",
+                    self.format_bytes(proc['download']) + "/s" if has_bytes else "N/D",
+                    self.format_bytes(proc['upload']) + "/s" if has_bytes else "N/D",
                     str(proc['connections'])
                 )
+            sync_table(table, rows, ordered=True)
             
             # Actualizar estadísticas
             stats = f"[bold cyan]📊 Estadísticas Totales[/]\n\n"
             stats += f"Procesos con actividad de red: [yellow]{len(processes_data)}[/]\n"
             stats += f"Velocidad de descarga total:  [green]{self.format_bytes(total_download_speed)}/s[/]\n"
             stats += f"Velocidad de subida total:    [blue]{self.format_bytes(total_upload_speed)}/s[/]\n"
-            stats += f"Ordenado por: [cyan]{self.sort_column}[/]"
+            if has_bytes:
+                stats += f"Ordenado por: [cyan]{self.sort_column}[/] · bytes por proceso: TCP (sock_diag)"
+            else:
+                stats += f"Ordenado por: [cyan]{self.sort_column}[/] · [dim]bytes por proceso no disponibles en este sistema[/]"
             
             self.query_one("#stats", Static).update(stats)
             
-            self.last_time = current_time
-            
         except Exception as e:
             self.notify(f"Error al actualizar: {str(e)}", severity="error")
     
@@ -0,0 +1,206 @@
+"""
+Rotación de conexiones (churn) entre instantáneas de netstat_monitor
+
+Cada conexión se identifica por una clave compacta (los bytes de extremos y
+puertos que da sock_diag o, en otros sistemas, la tupla proto, local, remoto);
+las altas y bajas entre dos instantáneas salen de restar los conjuntos de
+claves. Las conexiones nuevas se cuentan por host remoto y por proceso en
+contadores con decaimiento exponencial (media de unos HALF_LIFE segundos) y
+tamaño acotado, así que la memoria no crece aunque pasen millones de clientes
+distintos.
+
+También se sigue la acumulación de TIME_WAIT y los picos de SYN_RECV.
+"""
+
+import heapq
+import math
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from conn_snapshot import ConnectionSnapshot
+
+
+HALF_LIFE = 30.0        # Segundos en los que un contador pierde la mitad
+MAX_KEYS = 1024         # Claves máximas por contador
+SYN_SPIKE_MIN = 20      # SYN_RECV mínimos para hablar de pico
+SYN_SPIKE_FACTOR = 3.0  # ... y veces por encima de su media
+
+# Nombres de SYN_RECV en Linux, Windows y macOS
+SYN_RECV_STATES = ("SYN_RECV", "SYN_RECEIVED", "SYN_RCVD")
+
+
+def host_of(endpoint: str) -> str:
+    """Host de '1.2.3.4:80', '[::1]:80' o '1.2.3.4.80' (macOS)"""
+    separator = ':' if ':' in endpoint else '.'
+    return endpoint.rpartition(separator)[0] or endpoint
+
+
+def program_of(process: str) -> str:
+    """'1234/nginx' -> 'nginx' (los workers de un mismo programa se suman)"""
+    return process.partition('/')[2] or process
+
+
+class DecayingCounter:
+    """Contadores por clave con decaimiento exponencial y tamaño máximo"""
+
+    def __init__(self, half_life: float = HALF_LIFE, max_keys: int = MAX_KEYS):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.values: Dict[Hashable, float] = {}
+        self._start: Optional[float] = None
+        self._last: Optional[float] = None
+
+    def decay(self, now: float):
+        """Envejece todos los valores hasta `now` (la primera llamada marca el inicio)"""
+        if self._start is None:
+            self._start = now
+        if self._last is not None and now > self._last:
+            factor = 0.5 ** ((now - self._last) / self.half_life)
+            values = self.values
+            for key in list(values):
+                value = values[key] * factor
+                if value < 0.01:
+                    del values[key]
+                else:
+                    values[key] = value
+        self._last = now
+
+    def add(self, key: Hashable, amount: float = 1.0):
+        values = self.values
+        values[key] = values.get(key, 0.0) + amount
+        if len(values) > self.max_keys:
+            # Se quedan las 3/4 partes más altas: el recorte no es por alta
+            keep = heapq.nlargest(self.max_keys * 3 // 4, values.items(), key=lambda item: item[1])
+            self.values = dict(keep)
+
+    def _scale(self) -> float:
+        """Paso de valor acumulado a eventos/s, corregido mientras no hay historia"""
+        scale = math.log(2) / self.half_life
+        if self._start is not None and self._last > self._start:
+            scale /= 1 - 0.5 ** ((self._last - self._start) / self.half_life)
+        return scale
+
+    def rate(self, key: Hashable) -> float:
+        """Eventos por segundo (media exponencial)"""
+        return self.values.get(key, 0.0) * self._scale()
+
+    def top(self, n: int = 5) -> List[Tuple[Hashable, float]]:
+        scale = self._scale()
+        return [(key, value * scale)
+                for key, value in heapq.nlargest(n, self.values.items(), key=lambda item: item[1])]
+
+
+class ChurnTracker:
+    """Altas/bajas de conexiones y su ritmo a partir de instantáneas sucesivas"""
+
+    def __init__(self, half_life: float = HALF_LIFE, max_keys: int = MAX_KEYS):
+        self.half_life = half_life
+        self.by_remote = DecayingCounter(half_life, max_keys)
+        self.by_process = DecayingCounter(half_life, max_keys)
+        self._keys: Optional[Dict[Hashable, int]] = None    # clave -> posición
+        self._time: Optional[float] = None
+        self.intervals = 0
+        self.opened = 0             # En el último intervalo
+        self.closed = 0
+        self.opened_rate = 0.0      # Medias exponenciales por segundo
+        self.closed_rate = 0.0
+        self.time_wait = 0
+        self.time_wait_rate = 0.0   # Crecimiento de TIME_WAIT por segundo
+        self.syn_recv = 0
+        self.syn_recv_avg = 0.0
+        self.syn_spike = False
+
+    def _smooth(self, average: float, value: float, elapsed: float) -> float:
+        if self.intervals == 1:
+            return value    # La media empieza en el primer valor, no en 0
+        weight = 0.5 ** (elapsed / self.half_life)
+        return average * weight + value * (1 - weight)
+
+    def update(self, snapshot: ConnectionSnapshot, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        keys = dict(zip(snapshot.connection_keys(), range(len(snapshot))))
+        time_wait = len(snapshot.by_state.get("TIME_WAIT", ()))
+        syn_recv = sum(len(snapshot.by_state.get(state, ())) for state in SYN_RECV_STATES)
+        previous, elapsed = self._keys, (now - self._time) if self._time is not None else 0.0
+        self._keys, self._time = keys, now
+
+        if previous is None or elapsed <= 0:
+            # Primera instantánea: solo sirve de referencia
+            self.by_remote.decay(now)
+            self.by_process.decay(now)
+            self.time_wait, self.syn_recv = time_wait, syn_recv
+            self.syn_recv_avg = float(syn_recv)
+            return
+
+        self.intervals += 1
+        new = keys.keys() - previous.keys()
+        # Las que siguen son las actuales menos las nuevas: no hace falta la otra resta
+        self.closed = len(previous) - (len(keys) - len(new))
+        self.by_remote.decay(now)
+        self.by_process.decay(now)
+        # Toda clave nueva es una conexión abierta, aunque ya se vea en
+        # TIME_WAIT (abierta y cerrada entre dos instantáneas); esas ya no
+        # tienen proceso y solo cuentan por host remoto
+        opened = len(new)
+        remote, process = snapshot.remote, snapshot.process
+        for key in new:
+            i = keys[key]
+            self.by_remote.add(host_of(remote[i]))
+            if process[i]:
+                self.by_process.add(program_of(process[i]))
+        self.opened = opened
+
+        self.opened_rate = self._smooth(self.opened_rate, opened / elapsed, elapsed)
+        self.closed_rate = self._smooth(self.closed_rate, self.closed / elapsed, elapsed)
+        self.time_wait_rate = self._smooth(self.time_wait_rate, (time_wait - self.time_wait) / elapsed, elapsed)
+        self.time_wait = time_wait
+        self.syn_spike = syn_recv >= max(SYN_SPIKE_MIN, SYN_SPIKE_FACTOR * self.syn_recv_avg)
+        self.syn_recv = syn_recv
+        self.syn_recv_avg = self._smooth(self.syn_recv_avg, syn_recv, elapsed)
+
+
+if __name__ == "__main__":
+    # Benchmark: python conn_churn.py [conexiones] [% nuevas por tick]
+    import random
+    import struct
+    import sys
+    from array import array
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    churn = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    programs = ("1/nginx", "2/nginx", "3/haproxy", "4/curl")
+    states = ("ESTABLISHED",) * 6 + ("TIME_WAIT", "SYN_RECV")
+    counter = 0
+
+    def connection():
+        # Fila de texto, puertos y clave empaquetada como las de sock_diag
+        global counter
+        counter += 1
+        sport = 443 if counter % 4 else 32768 + counter % 28000
+        dport = 1024 + counter % 64000
+        remote = bytes((198, 51, counter % 200, counter % 97))
+        row = ("tcp", f"10.0.0.1:{sport}", f"{'.'.join(map(str, remote))}:{dport}",
+               random.choice(states), random.choice(programs))
+        key = struct.pack('=HH16s16s', sport, dport, b'\n\0\0\1', remote + counter.to_bytes(4, 'little'))
+        return row, sport, dport, key
+
+    connections = [connection() for _ in range(n)]
+    for packed in (False, True):
+        tracker = ChurnTracker()
+        times = []
+        for tick in range(11):
+            for _ in range(int(n * churn / 100)):
+                connections[random.randrange(n)] = connection()
+            rows, sports, dports, keys = zip(*connections)
+            snapshot = ConnectionSnapshot(rows, (array('H', sports), array('H', dports)),
+                                          list(keys) if packed else None)
+            start = time.perf_counter()
+            tracker.update(snapshot, now=float(tick))
+            if tick:
+                times.append(time.perf_counter() - start)
+        print(f"{n:,} conexiones, {churn}% nuevas por segundo, claves {'empaquetadas' if packed else 'de texto'}: "
+              f"update() {sum(times) / len(times) * 1000:.1f} ms (máx {max(times) * 1000:.1f} ms)")
+    print(f"nuevas {tracker.opened_rate:.0f}/s, cerradas {tracker.closed_rate:.0f}/s, "
+          f"claves: {len(tracker.by_remote.values)} remotos, {len(tracker.by_process.values)} procesos")
+    print("top remotos:", ", ".join(f"{host} {rate:.1f}/s" for host, rate in tracker.by_remote.top(3)))
+    print("top procesos:", ", ".join(f"{name} {rate:.1f}/s" for name, rate in tracker.by_process.top(3)))
@@ -0,0 +1,252 @@
+"""
+Instantánea de conexiones por columnas, con índices para filtrar y ordenar
+
+Cada refresco de netstat_monitor se guarda por columnas (proto, local, remoto,
+estado, proceso) junto con índices pequeños por estado, puerto, proceso y
+protocolo. Un filtro como `state:ESTABLISHED port:443 proc:nginx` se resuelve
+cruzando esos índices; las palabras sin clave buscan en una columna de texto
+ya pasada a minúsculas. Los resultados (y los órdenes por columna) se guardan
+en caché hasta el siguiente refresco.
+"""
+
+from array import array
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+COLUMNS = ("Proto", "Local Address", "Remote Address", "State", "PID/Program")
+FILTER_KEYS = ("state", "port", "proc", "proto")
+FILTER_HELP = "state:ESTABLISHED port:443 proc:nginx proto:tcp texto"
+
+_MAX_CACHED = 64    # Filtros recordados por instantánea
+
+
+def port_of(endpoint: str) -> int:
+    """Puerto de '1.2.3.4:80', '[::1]:80' o '1.2.3.4.80' (macOS); 0 si no hay"""
+    separator = ':' if ':' in endpoint else '.'
+    port = endpoint.rpartition(separator)[2]
+    return int(port) if port.isdigit() else 0
+
+
+def _index(values: Iterable) -> Dict[object, array]:
+    """valor -> posiciones (array ordenado) en las que aparece"""
+    index = defaultdict(list)
+    for i, value in enumerate(values):
+        index[value].append(i)
+    return {value: array('I', rows) for value, rows in index.items()}
+
+
+class ConnectionSnapshot:
+    """Conexiones de un refresco guardadas por columnas"""
+
+    def __init__(self, rows: Iterable[Sequence[str]] = (),
+                 ports: Optional[Tuple[Sequence[int], Sequence[int]]] = None,
+                 keys: Optional[Sequence[Hashable]] = None):
+        """
+        `rows` son tuplas (proto, local, remoto, estado, proceso). Si ya se
+        conocen los puertos (local, remoto) como números se pasan en `ports`
+        para no sacarlos del texto, y si hay una clave compacta por conexión
+        (SocketTable.key) se pasa en `keys`.
+        """
+        rows = list(rows)
+        self.columns: Tuple[tuple, ...] = tuple(zip(*rows)) if rows else ((),) * len(COLUMNS)
+        self.proto, self.local, self.remote, self.state, self.process = self.columns
+        self.widths = [max(len(title), max(map(len, column), default=0))
+                       for title, column in zip(COLUMNS, self.columns)]
+
+        self.by_state = _index(self.state)
+        self.by_process = _index(map(str.lower, self.process))
+        self.by_proto = _index(map(str.lower, self.proto))
+        if ports is None:
+            ports = (map(port_of, self.local), map(port_of, self.remote))
+        by_port = defaultdict(list)
+        for i, (local_port, remote_port) in enumerate(zip(*ports)):
+            by_port[local_port].append(i)
+            if remote_port != local_port:
+                by_port[remote_port].append(i)
+        by_port.pop(0, None)
+        self.by_port: Dict[int, array] = {port: array('I', rows) for port, rows in by_port.items()}
+
+        self.keys = keys
+        self._text: Optional[List[str]] = None
+        self._filters: Dict[str, array] = {}
+        self._last_query = ""
+        self._orders: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self.proto)
+
+    def row(self, index: int) -> tuple:
+        return tuple(column[index] for column in self.columns)
+
+    def find(self, row: Sequence[str]) -> Optional[int]:
+        """Posición de la conexión `row` (mismo proto, extremos y proceso)"""
+        proto, local, remote, _, process = row
+        candidates = self.by_port.get(port_of(local)) or range(len(self))
+        for i in candidates:
+            if (self.local[i] == local and self.remote[i] == remote
+                    and self.proto[i] == proto and self.process[i] == process):
+                return i
+        return None
+
+    def connection_keys(self) -> Sequence[Hashable]:
+        """Una clave por conexión: SocketTable.key o, si no hay, (proto, local, remoto)"""
+        if self.keys is None:
+            self.keys = list(zip(self.proto, self.local, self.remote))
+        return self.keys
+
+    def text(self) -> List[str]:
+        """Cada conexión como una línea en minúsculas (para el texto libre)"""
+        if self._text is None:
+            self._text = ["\t".join(values).lower() for values in zip(*self.columns)]
+        return self._text
+
+    # --- Filtros ---
+
+    def _lookup(self, key: str, value: str) -> Iterable[int]:
+        if key == "port":
+            return self.by_port.get(int(value), ()) if value.isdigit() else ()
+        if key == "state":
+            value = value.upper().replace('-', '_')
+            index = self.by_state
+            matches = [name for name in index if name.startswith(value)]
+        elif key == "proto":
+            index = self.by_proto
+            matches = [name for name in index if name.startswith(value)]
+        else:
+            index = self.by_process
+            matches = [name for name in index if value in name]
+        if len(matches) == 1:
+            return index[matches[0]]
+        selected = set()
+        for name in matches:
+            selected.update(index[name])
+        return selected
+
+    @staticmethod
+    def _narrows(previous: str, query: str) -> bool:
+        """
+        True si todo lo que cumple `query` cumple también `previous`, como
+        ocurre al seguir escribiendo (salvo en port:, que busca el número exacto)
+        """
+        if not previous or not query.startswith(previous):
+            return False
+        if query[len(previous)] == " ":
+            return True     # Se añaden condiciones
+        old = previous.split()[-1]
+        new = query.split()[len(previous.split()) - 1]
+        old_key, old_sep, old_value = old.partition(':')
+        new_key, new_sep, _ = new.partition(':')
+        old_keyed = bool(old_sep) and old_key in FILTER_KEYS
+        new_keyed = bool(new_sep) and new_key in FILTER_KEYS
+        if old_keyed != new_keyed:
+            return False
+        if not old_keyed:
+            return True     # Texto libre más largo
+        return old_key == new_key and (not old_value or old_key != "port")
+
+    def filter(self, query: str) -> Optional[array]:
+        """Posiciones que cumplen el filtro (None si el filtro está vacío)"""
+        query = " ".join(query.lower().split())
+        if not query:
+            return None
+        cached = self._filters.get(query)
+        if cached is not None:
+            return cached
+
+        # Al escribir, basta con buscar entre los resultados anteriores
+        base = None
+        if self._narrows(self._last_query, query):
+            base = self._filters.get(self._last_query)
+
+        selected = None
+        terms = []
+        for token in query.split():
+            key, separator, value = token.partition(':')
+            if separator and key in FILTER_KEYS:
+                if not value:
+                    continue    # Clave a medio escribir: todavía no filtra
+                rows = self._lookup(key, value)
+                selected = set(rows) if selected is None else selected.intersection(rows)
+            else:
+                terms.append(token)
+        if selected is None:
+            candidates = range(len(self)) if base is None else base
+        else:
+            if base is not None:
+                selected.intersection_update(base)
+            candidates = sorted(selected)
+        if terms:
+            text = self.text()
+            # Una pasada por palabra: cada una busca solo entre lo que queda
+            for term in terms:
+                candidates = [i for i in candidates if term in text[i]]
+        result = candidates if isinstance(candidates, array) else array('I', candidates)
+
+        if len(self._filters) >= _MAX_CACHED:
+            self._filters.clear()
+        self._filters[query] = result
+        self._last_query = query
+        return result
+
+    def order(self, column: int) -> array:
+        """Todas las posiciones ordenadas por la columna `column`"""
+        order = self._orders.get(column)
+        if order is None:
+            if column == 3:
+                # Por estado basta con concatenar el índice
+                order = array('I')
+                for state in sorted(self.by_state):
+                    order.extend(self.by_state[state])
+            else:
+                values = self.columns[column]
+                order = array('I', sorted(range(len(self)), key=values.__getitem__))
+            self._orders[column] = order
+        return order
+
+    def select(self, query: str, sort_column: Optional[int] = None) -> Sequence[int]:
+        """Posiciones a mostrar: filtradas y, si se pide, ordenadas"""
+        rows = self.filter(query)
+        if sort_column is None:
+            return range(len(self)) if rows is None else rows
+        order = self.order(sort_column)
+        if rows is None:
+            return order
+        if len(rows) == len(self):
+            return order
+        wanted = set(rows)
+        return array('I', [i for i in order if i in wanted])
+
+
+if __name__ == "__main__":
+    # Benchmark: python conn_snapshot.py [conexiones]
+    import random
+    import sys
+    import time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    states = ("ESTABLISHED", "TIME_WAIT", "LISTEN", "CLOSE_WAIT", "SYN_RECV")
+    programs = [f"{pid}/{name}" for pid, name in enumerate(
+        ("nginx", "sshd", "postgres", "python3", "redis-server", "chrome", "java", "node"), 1000)]
+    rows = [("tcp", f"10.0.0.1:{random.choice((80, 443, 8080, 5432))}",
+             f"192.168.{i // 256 % 256}.{i % 256}:{random.randint(1024, 65535)}",
+             random.choice(states), random.choice(programs)) for i in range(n)]
+
+    def timed(label, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        print(f"{label:<44} {(time.perf_counter() - start) * 1000:8.2f} ms")
+        return result
+
+    timed(f"instantánea de {n:,} (puertos del texto)", ConnectionSnapshot, rows)
+    ports = (array('H', map(port_of, (row[1] for row in rows))),
+             array('H', map(port_of, (row[2] for row in rows))))
+    snapshot = timed(f"instantánea de {n:,} (puertos numéricos)", ConnectionSnapshot, rows, ports)
+    timed("texto para búsquedas", snapshot.text)
+    for query in ("state:ESTABLISHED", "port:443", "state:ESTABLISHED port:443 proc:nginx",
+                  "proc:java", "192.168.7", "state:time port:5432 192.168.1"):
+        found = timed(f"filtro '{query}'", snapshot.filter, query)
+        print(f"{'':<4}{len(found):,} conexiones")
+    timed("ordenar por remoto", snapshot.order, 2)
+    timed("ordenar por estado", snapshot.order, 3)
+    timed("filtrar y ordenar (en caché)", snapshot.select, "port:443", 2)
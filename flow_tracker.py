@@ -0,0 +1,160 @@
+"""
+Agregación de paquetes en flujos/conversaciones (5-tupla)
+
+Los flujos se guardan en un OrderedDict en orden LRU: cada paquete mueve su
+flujo al final, así que los más antiguos quedan al principio y expirarlos o
+desalojarlos cuesta O(1) por flujo. El número de flujos nunca supera
+`max_flows`, aunque pasen millones de 5-tuplas distintas.
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+# Estados TCP simplificados (vistos desde fuera, no es la máquina completa)
+TCP_NEW = "NUEVO"
+TCP_SYN = "SYN"
+TCP_SYN_ACK = "SYN-ACK"
+TCP_ESTABLISHED = "ESTABLECIDA"
+TCP_CLOSING = "CERRANDO"
+TCP_CLOSED = "CERRADA"
+TCP_RESET = "RESET"
+
+_FIN, _SYN, _RST, _ACK = 0x01, 0x02, 0x04, 0x10
+
+
+class FlowRecord:
+    """Estado de una conversación"""
+
+    __slots__ = (
+        'proto', 'src', 'sport', 'dst', 'dport',
+        'packets', 'bytes', 'first_seen', 'last_seen', 'tcp_state',
+    )
+
+    def __init__(self, proto: int, src: str, sport: int, dst: str, dport: int, ts: float):
+        self.proto = proto
+        self.src = src          # Quien envió el primer paquete visto
+        self.sport = sport
+        self.dst = dst
+        self.dport = dport
+        self.packets = 0
+        self.bytes = 0
+        self.first_seen = ts
+        self.last_seen = ts
+        self.tcp_state = TCP_NEW if proto == 6 else ""
+
+    def update_tcp_state(self, flags: int):
+        """Avanza el estado TCP según los flags del paquete"""
+        if flags & _RST:
+            self.tcp_state = TCP_RESET
+        elif flags & _FIN:
+            self.tcp_state = TCP_CLOSED if self.tcp_state == TCP_CLOSING else TCP_CLOSING
+        elif flags & _SYN:
+            self.tcp_state = TCP_SYN_ACK if flags & _ACK else TCP_SYN
+        elif flags & _ACK and self.tcp_state in (TCP_NEW, TCP_SYN, TCP_SYN_ACK):
+            self.tcp_state = TCP_ESTABLISHED
+
+    def as_tuple(self) -> Tuple:
+        """Copia inmutable del registro (segura para pasar a otro hilo)"""
+        return (self.proto, self.src, self.sport, self.dst, self.dport,
+                self.packets, self.bytes, self.first_seen, self.last_seen, self.tcp_state)
+
+
+class FlowTracker:
+    """Tabla de flujos acotada con expiración por inactividad y desalojo LRU"""
+
+    def __init__(self, max_flows: int = 100000, idle_timeout: float = 120.0):
+        self.max_flows = max_flows
+        self.idle_timeout = idle_timeout
+        self.flows = OrderedDict()
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    def update(self, proto: int, src: str, sport: int, dst: str, dport: int,
+               length: int, ts: Optional[float] = None, tcp_flags: int = 0) -> FlowRecord:
+        """Contabiliza un paquete en su flujo (ambos sentidos comparten flujo)"""
+        if ts is None:
+            ts = time.time()
+
+        # Clave canónica: el mismo flujo en ambos sentidos
+        a = (src, sport)
+        b = (dst, dport)
+        key = (proto, a, b) if a <= b else (proto, b, a)
+
+        flows = self.flows
+        flow = flows.get(key)
+        if flow is None:
+            flow = FlowRecord(proto, src, sport, dst, dport, ts)
+            flows[key] = flow
+            if len(flows) > self.max_flows:
+                flows.popitem(last=False)
+                self.evicted += 1
+        else:
+            flows.move_to_end(key)
+
+        flow.packets += 1
+        flow.bytes += length
+        flow.last_seen = ts
+        if proto == 6:
+            flow.update_tcp_state(tcp_flags)
+        return flow
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Elimina los flujos inactivos más de `idle_timeout` segundos"""
+        if now is None:
+            now = time.time()
+        limit = now - self.idle_timeout
+        flows = self.flows
+        removed = 0
+        # En orden LRU: basta con mirar el principio del diccionario
+        while flows:
+            key = next(iter(flows))
+            if flows[key].last_seen >= limit:
+                break
+            del flows[key]
+            removed += 1
+        self.expired += removed
+        return removed
+
+    def top_talkers(self, n: int = 20) -> List[Tuple]:
+        """Los `n` flujos con más bytes, como tuplas (ver FlowRecord.as_tuple)"""
+        top = heapq.nlargest(n, self.flows.values(), key=lambda f: f.bytes)
+        return [flow.as_tuple() for flow in top]
+
+    def clear(self):
+        self.flows.clear()
+        self.evicted = 0
+        self.expired = 0
+
+
+def _benchmark(n: int, max_flows: int) -> FlowTracker:
+    tracker = FlowTracker(max_flows=max_flows)
+    base = time.time()
+    for i in range(n):
+        tracker.update(6, f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}", 1024 + i % 50000,
+                       "192.168.1.1", 443, 60, base + i * 0.0001, 0x02)
+    return tracker
+
+
+if __name__ == "__main__":
+    # Benchmark: un millón de flujos distintos con la memoria acotada
+    import tracemalloc
+
+    start = time.perf_counter()
+    tracker = _benchmark(1_000_000, 100000)
+    elapsed = time.perf_counter() - start
+    print(f"1.000.000 flujos en {elapsed:.2f}s ({1_000_000 / elapsed:,.0f} paquetes/s)")
+    print(f"Flujos en tabla: {len(tracker):,} (desalojados: {tracker.evicted:,})")
+    del tracker
+
+    # Segunda pasada solo para medir memoria (tracemalloc ralentiza mucho)
+    tracemalloc.start()
+    tracker = _benchmark(1_000_000, 100000)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Memoria: actual {current / 1024 / 1024:.1f} MB, pico {peak / 1024 / 1024:.1f} MB")
@@ -8,6 +8,7 @@ from textual.binding import Binding
 import psutil
 import netifaces
 import socket
+from net_sampler import get_sampler
 
 class NetworkInterfaceMonitor(App):
     """Aplicación para monitorear interfaces de red"""
@@ -56,6 +57,10 @@ class NetworkInterfaceMonitor(App):
         Binding("ctrl+c", "quit", "Salir"),
     ]
     
+    def __init__(self):
+        super().__init__()
+        self.sampler = get_sampler()
+    
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
         with Container(id="info-container"):
@@ -67,8 +72,13 @@ class NetworkInterfaceMonitor(App):
     def on_mount(self) -> None:
         """Al montar, cargar información de interfaces"""
         self.title = "📡 Monitor de interfaces de red"
+        # Mantener el muestreador en marcha para tener velocidades al actualizar
+        self.sampler.acquire()
         self.refresh_interfaces()
     
+    def on_unmount(self) -> None:
+        self.sampler.release()
+    
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Manejar clic en botones"""
         if event.button.id == "refresh-btn":
@@ -105,11 +115,13 @@ class NetworkInterfaceMonitor(App):
         results = []
         results.append("[bold cyan]═══ INTERFACES DE RED DEL SISTEMA ═══[/]\n")
         
-        # Obtener estadísticas de red
-        net_io = psutil.net_io_counters(pernic=True)
+        # Obtener estadísticas de red (última muestra del muestreador)
+        snapshot = self.sampler.snapshot()
+        net_io = snapshot.counters
         
-        # Obtener todas las interfaces
+        # Obtener todas las interfaces (estado leído una sola vez para todas)
         interfaces = netifaces.interfaces()
+        if_stats = psutil.net_if_stats()
         
         active_count = 0
         inactive_count = 0
@@ -118,7 +130,7 @@ class NetworkInterfaceMonitor(App):
             addrs = netifaces.ifaddresses(iface)
             
             # Determinar si está activa
-            stats = psutil.net_if_stats().get(iface)
+            stats = if_stats.get(iface)
             is_up = stats.isup if stats else False
             
             if is_up:
@@ -172,6 +184,9 @@ class NetworkInterfaceMonitor(App):
                 recv_mb = io.bytes_recv / (1024 * 1024)
                 results.append(f"  📤 Enviados: [green]{sent_mb:.2f} MB[/] ({io.packets_sent:,} paquetes)")
                 results.append(f"  📥 Recibidos: [blue]{recv_mb:.2f} MB[/] ({io.packets_recv:,} paquetes)")
+                rate = snapshot.rates.get(iface)
+                if rate:
+                    results.append(f"  ⚡ Velocidad: ⬆️ {rate.bytes_sent / 1024:.1f} KB/s  ⬇️ {rate.bytes_recv / 1024:.1f} KB/s")
                 
                 if io.errin > 0 or io.errout > 0:
                     results.append(f"  [red]⚠ Errores: {io.errin + io.errout}[/]")
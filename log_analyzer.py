@@ -2,8 +2,13 @@ from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Button, DataTable, DirectoryTree, Label, Static
 from textual.containers import Container, Horizontal, Vertical
 from textual.binding import Binding
-import re
+from textual.worker import get_current_worker
+from functools import partial
 import os
+import time
+
+from log_rules import MAX_ROWS, RULES_DIR, ThreatAggregator, load_rules
+from log_sources import LogSource
 
 class LogAnalyzerApp(App):
     """Herramienta de análisis de logs para detectar patrones de ataque"""
@@ -52,8 +57,12 @@ class LogAnalyzerApp(App):
     
     BINDINGS = [
         Binding("q", "quit", "Salir"),
+        Binding("r", "reanalyze", "Reanalizar"),
     ]
 
+    current_path = None
+    generation = 0      # Análisis en curso; los resultados de otro se descartan
+
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
         
@@ -71,52 +80,98 @@ class LogAnalyzerApp(App):
 
     def on_mount(self):
         table = self.query_one(DataTable)
-        table.add_columns("Línea", "Tipo de Amenaza", "Contenido Detectado")
+        table.add_columns("Línea", "Tipo de Amenaza", "IP origen", "Usuario", "URL", "Contenido Detectado")
 
     def on_directory_tree_file_selected(self, event: DirectoryTree.FileSelected):
         self.analyze_file(event.path)
 
+    def action_reanalyze(self):
+        """Vuelve a analizar el archivo (con los paquetes de reglas que haya ahora)"""
+        if self.current_path is not None:
+            self.analyze_file(self.current_path)
+
     def analyze_file(self, path):
+        self.current_path = path
+        self.generation += 1
         table = self.query_one(DataTable)
         table.clear()
         status = self.query_one("#status-msg", Static)
         
         status.update(f"⏳ Analizando: {os.path.basename(path)}...")
-        
-        patterns = {
-            "SQL Injection": r"(UNION SELECT|OR '1'='1|--|#|\/\*|\*\/|WAITFOR DELAY|SLEEP\()",
-            "XSS": r"(<script>|javascript:|onerror=|onload=|alert\()",
-            "Path Traversal": r"(\.\./|\.\.\\|/etc/passwd|c:\\windows|boot\.ini)",
-            "Command Injection": r"(;|\||&&|\$\(|`|eval\()",
-            "Brute Force": r"(Failed password|Invalid user|Authentication failure|Login failed)",
-            "Sensitive Info": r"(API_KEY|password=|passwd=|secret=|token=)",
-        }
-        
-        count = 0
+        self.run_worker(partial(self._analyze, path, self.generation), thread=True,
+                        exclusive=True, group="analyze")
+
+    def _add_rows(self, generation, rows):
+        # En el hilo de la interfaz: un lote que llega después de empezar otro
+        # análisis (ya encolado al cancelar el trabajador) se descarta
+        if generation == self.generation:
+            self.query_one(DataTable).add_rows(rows)
+
+    def _set_status(self, generation, message):
+        if generation == self.generation:
+            self.query_one("#status-msg", Static).update(message)
+
+    def _report_error(self, generation, error):
+        if generation == self.generation:
+            self.notify(f"Error al leer archivo: {error}", severity="error")
+            self.query_one("#status-msg", Static).update(f"❌ Error: {error}")
+    
+    def _analyze(self, path, generation):
+        """Aplica las reglas en un hilo; a la tabla solo llegan lotes de filas"""
+        worker = get_current_worker()
+        name = os.path.basename(path)
+        # Reglas integradas y paquetes de siem_rules/ (solo se recompilan los que cambian)
+        ruleset, pack_errors = load_rules()
+        for error in pack_errors:
+            if worker.is_cancelled:
+                return
+            self.call_from_thread(self.notify, f"Paquete de reglas no cargado: {error}", severity="warning")
+        aggregator = ThreatAggregator()
+        lines, last_report = 0, 0.0
+        start = time.monotonic()
         try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                for i, line in enumerate(f, 1):
-                    line = line.strip()
-                    if not line: continue
-                    
-                    found = False
-                    for threat_type, pattern in patterns.items():
-                        if re.search(pattern, line, re.IGNORECASE):
-                            # Truncate long lines
-                            content = (line[:97] + '...') if len(line) > 100 else line
-                            table.add_row(str(i), threat_type, content)
-                            count += 1
-                            found = True
-                            # Don't break, a line might have multiple threats
-            
-            if count == 0:
-                status.update(f"✅ Análisis completado: {os.path.basename(path)}\nNo se encontraron amenazas obvias.")
-            else:
-                status.update(f"⚠️ Análisis completado: {os.path.basename(path)}\nSe detectaron {count} posibles amenazas.")
-            
+            # Los logs comprimidos (.gz, .xz, .bz2, .zst) se descomprimen al leer
+            source = LogSource([path])
+            for rows, lines in ruleset.scan_chunks(source.chunks(should_stop=lambda: worker.is_cancelled),
+                                                   aggregator, should_stop=lambda: worker.is_cancelled):
+                # Un análisis nuevo ya ha vaciado la tabla: nada de filas viejas
+                if worker.is_cancelled:
+                    return
+                if rows:
+                    self.call_from_thread(self._add_rows, generation,
+                                          [(str(row[0]), *row[1:]) for row in rows])
+                now = time.monotonic()
+                if now - last_report >= 0.2:
+                    last_report = now
+                    self.call_from_thread(self._set_status, generation,
+                                          f"⏳ Analizando: {name}... {lines:,} líneas, "
+                                          f"{sum(aggregator.fired.values()):,} posibles amenazas")
         except Exception as e:
-            self.notify(f"Error al leer archivo: {e}", severity="error")
-            status.update(f"❌ Error: {e}")
+            if worker.is_cancelled:
+                return
+            self.call_from_thread(self._report_error, generation, e)
+            return
+        if worker.is_cancelled:
+            return
+        
+        count = sum(aggregator.fired.values())
+        elapsed = time.monotonic() - start
+        if count == 0:
+            message = f"✅ Análisis completado: {name}\nNo se encontraron amenazas obvias."
+        else:
+            summary = ", ".join(f"{threat}: {n:,}" for threat, n in aggregator.fired.items() if n)
+            message = f"⚠️ Análisis completado: {name}\nSe detectaron {count:,} posibles amenazas ({summary})."
+            if count > MAX_ROWS:
+                message += f"\nSe muestran las {MAX_ROWS:,} primeras."
+        if aggregator.alerts:
+            # Las claves que más veces han superado un umbral (IP de fuerza bruta...)
+            top = sorted(aggregator.alerts.values(), key=lambda alert: alert.count, reverse=True)[:5]
+            message += "\nUmbrales superados: " + ", ".join(
+                f"{alert.rule} {alert.key or '-'} ×{alert.count:,}" for alert in top)
+        message += f"\n{lines:,} líneas en {elapsed:.1f} s, {len(ruleset.rules)} reglas (paquetes en {RULES_DIR}/)"
+        if source.errors:
+            message += f"\n⚠️ Archivo dañado, analizado hasta el error: {'; '.join(source.errors)}"
+        self.call_from_thread(self._set_status, generation, message)
 
 if __name__ == "__main__":
     LogAnalyzerApp().run()
@@ -0,0 +1,236 @@
+"""
+Seguimiento de un log en vivo (como tail -f)
+
+FileFollower guarda el offset hasta el que ha leído y en cada aviso solo lee
+los bytes añadidos desde ahí; una línea a medio escribir se guarda hasta que
+llega su salto de línea. Si la ruta pasa a ser otro archivo (rotación) se
+termina de leer el antiguo y se sigue con el nuevo desde el principio; si el
+archivo mengua (truncado) se vuelve a empezar.
+
+En Linux se espera con inotify sobre el directorio (así también se ven las
+rotaciones), filtrando por el nombre del archivo; en el resto de sistemas se
+comprueba con stat() cada POLL_INTERVAL segundos. Mientras el log no cambia
+el hilo está bloqueado y no gasta CPU.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+POLL_INTERVAL = 0.5     # Segundos entre comprobaciones sin inotify
+READ_SIZE = 1024 * 1024 # Bytes leídos como mucho en cada vuelta
+
+# Eventos de inotify (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len (el nombre va detrás)
+
+ROTATED = "--- archivo rotado: se sigue con el nuevo ---"
+TRUNCATED = "--- archivo truncado: se sigue desde el principio ---"
+
+
+class _Inotify:
+    """Aviso cuando cambia (o se crea, mueve o borra) un nombre de un directorio"""
+
+    MASK = IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, path: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        directory, self.name = os.path.split(os.path.abspath(path))
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch")
+        self.name = os.fsencode(self.name)
+
+    def wait(self, timeout: float) -> bool:
+        """True si ha habido algún evento del archivo antes de `timeout` segundos"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if name == self.name:
+                return True
+        return False
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileFollower:
+    """Lee las líneas que se van añadiendo a un archivo"""
+
+    def __init__(self, path, offset: int = 0, line: int = 0):
+        """
+        Empieza en `offset` (principio de una línea), que es la línea número
+        `line` contando desde 0. Las líneas ya existentes antes no se leen.
+        """
+        self.path = str(path)
+        self.offset = offset
+        self.line = line
+        self._pending = b''
+        self._file = open(self.path, 'rb')
+        self._stat = os.fstat(self._file.fileno())
+        self._watch: Optional[_Inotify] = None
+        if sys.platform.startswith("linux"):
+            try:
+                self._watch = _Inotify(self.path)
+            except (OSError, AttributeError):
+                self._watch = None     # Sin inotify: se comprueba con stat()
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._watch is not None
+
+    def wait(self, timeout: float = 1.0):
+        """Espera a que el archivo cambie (o a que pase `timeout`)"""
+        if self._watch is not None:
+            self._watch.wait(timeout)
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._changed():
+                return
+            time.sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    def _changed(self) -> bool:
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return False
+        return ((current.st_ino, current.st_dev) != (self._stat.st_ino, self._stat.st_dev)
+                or current.st_size != self.offset + len(self._pending))
+
+    def _read_lines(self) -> List[Tuple[int, str]]:
+        """Líneas completas añadidas al archivo abierto desde el último offset"""
+        lines = []
+        while True:
+            self._file.seek(self.offset + len(self._pending))
+            data = self._file.read(READ_SIZE)
+            if not data:
+                return lines
+            data = self._pending + data
+            cut = data.rfind(b'\n') + 1
+            self._pending = data[cut:]
+            for raw in data[:cut].split(b'\n')[:-1]:
+                self.line += 1
+                lines.append((self.line, raw.decode('utf-8', errors='replace').rstrip('\r')))
+            self.offset += cut
+
+    def _restart(self, reopen: bool):
+        if reopen:
+            self._file.close()
+            self._file = open(self.path, 'rb')
+        self._stat = os.fstat(self._file.fileno())
+        self.offset = 0
+        self.line = 0
+        self._pending = b''
+
+    def read(self) -> List[Tuple[int, str]]:
+        """
+        Líneas nuevas como (número de línea, texto). Las rotaciones y truncados
+        se señalan con una línea de número 0 (ROTATED o TRUNCATED).
+        """
+        lines = []
+        size = os.fstat(self._file.fileno()).st_size
+        if size < self.offset + len(self._pending):
+            self._restart(reopen=False)
+            lines.append((0, TRUNCATED))
+        lines += self._read_lines()
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return lines    # Rotado y todavía sin archivo nuevo
+        if (current.st_ino, current.st_dev) != (self._stat.st_ino, self._stat.st_dev):
+            # Lo que quede del antiguo (incluida una última línea sin salto)
+            if self._pending:
+                self.line += 1
+                lines.append((self.line, self._pending.decode('utf-8', errors='replace')))
+            try:
+                self._restart(reopen=True)
+            except OSError:
+                return lines
+            lines.append((0, ROTATED))
+            lines += self._read_lines()
+        return lines
+
+    def close(self):
+        self._file.close()
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_follow.py [segundos]  (CPU en reposo y latencia de aviso)
+    import tempfile
+    import threading
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "app.log")
+    with open(path, "wb") as f:
+        f.write(b"inicio\n")
+    follower = FileFollower(path, offset=os.path.getsize(path), line=1)
+    print(f"Esperando con {'inotify' if follower.uses_inotify else 'stat()'}")
+    try:
+        start_cpu, start = time.process_time(), time.monotonic()
+        while time.monotonic() - start < seconds:
+            follower.wait(1.0)
+            follower.read()
+        cpu = time.process_time() - start_cpu
+        print(f"Reposo {seconds:.0f} s: {cpu * 1000:.1f} ms de CPU ({cpu / seconds * 100:.3f} %)")
+
+        def writer():
+            for i in range(200):
+                with open(path, "ab") as f:
+                    f.write(b"%d %.6f\n" % (i, time.monotonic()))
+                time.sleep(0.005)
+            os.rename(path, path + ".1")
+            with open(path, "wb") as f:
+                f.write(b"nuevo %.6f\n" % time.monotonic())
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        delays, received, events = [], 0, []
+        while received < 201:
+            follower.wait(1.0)
+            now = time.monotonic()
+            for number, text in follower.read():
+                if number == 0:
+                    events.append(text)
+                    continue
+                received += 1
+                delays.append(now - float(text.split()[-1]))
+        thread.join()
+        delays.sort()
+        print(f"{received} líneas, aviso en mediana {delays[len(delays) // 2] * 1000:.2f} ms "
+              f"(máx {delays[-1] * 1000:.2f} ms); eventos: {events}")
+    finally:
+        follower.close()
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+        os.rmdir(directory)
@@ -0,0 +1,308 @@
+"""
+Índice disperso de líneas para paginar logs enormes
+
+Se guarda un punto (número de línea, offset en bytes) cada STRIDE líneas como
+mínimo, en dos array('Q'). Para leer la línea N se busca el punto anterior con
+bisect y se avanza desde su offset menos de STRIDE líneas más un bloque, así
+que cualquier rango de líneas de un archivo de varios GB se lee al momento.
+
+El archivo se recorre en bloques contando saltos de línea sobre los bytes (sin
+crear una cadena por línea). El índice se guarda en disco con la identidad del
+archivo (dispositivo e inodo), el tamaño indexado y su mtime; si el archivo ha
+crecido se continúa desde donde se quedó en lugar de empezar de nuevo.
+"""
+
+import bisect
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, List, Optional
+
+
+STRIDE = 1000                   # Líneas (como mínimo) entre dos puntos del índice
+BLOCK_SIZE = 64 * 1024          # Cada cuántos bytes se comprueba si toca un punto
+READ_SIZE = 4 * 1024 * 1024     # Bytes por lectura al indexar
+TAIL_CHECK = 64                 # Bytes finales que se comparan para reutilizar un índice
+CACHE_DIR = ".log_index"        # Índices guardados (en el directorio actual)
+MIN_CACHED_SIZE = 8 * 1024 * 1024   # Los archivos pequeños se indexan al momento
+MAX_CACHED = 64                 # Índices guardados como mucho
+
+_MAGIC = b'CLIX'
+_VERSION = 1
+# magia, versión, paso, dispositivo, inodo, tamaño, mtime_ns, saltos de línea,
+# nº de puntos, bytes de cola
+_HEADER = struct.Struct('<4sHIQQQqQQH')
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == 'little':
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _le_array(data) -> array:
+    values = array('Q')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class LineIndex:
+    """Índice de líneas de un archivo, ampliable a medida que crece"""
+
+    def __init__(self, path, stride: int = STRIDE):
+        self.path = str(path)
+        self.stride = stride
+        self._reset()
+
+    def _reset(self, stat: Optional[os.stat_result] = None):
+        # offsets se amplía siempre antes que lines: quien lea desde otro hilo
+        # nunca encuentra un número de línea sin su offset
+        self.lines = array('Q', [0])    # Número de línea de cada punto
+        self.offsets = array('Q', [0])  # Offset en bytes de esa línea
+        self.size = 0                   # Bytes indexados
+        self.newlines = 0               # Saltos de línea en esos bytes
+        self.tail = b''                 # Últimos bytes indexados
+        self.dev = stat.st_dev if stat else 0
+        self.ino = stat.st_ino if stat else 0
+        self.mtime_ns = 0
+
+    @property
+    def line_count(self) -> int:
+        """Líneas indexadas (la última cuenta aunque no acabe en salto de línea)"""
+        if self.size == 0 or self.tail.endswith(b'\n'):
+            return self.newlines
+        return self.newlines + 1
+
+    def is_current(self) -> bool:
+        """True si el índice cubre el archivo tal como está ahora"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return ((stat.st_dev, stat.st_ino) == (self.dev, self.ino)
+                and stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns)
+
+    # --- Construcción ---
+
+    def _matches(self, f, stat: os.stat_result) -> bool:
+        """¿Es el archivo abierto el mismo que se indexó (y como mucho ha crecido)?"""
+        if (stat.st_dev, stat.st_ino) != (self.dev, self.ino) or stat.st_size < self.size:
+            return False
+        if not self.tail:
+            return True
+        f.seek(self.size - len(self.tail))
+        return f.read(len(self.tail)) == self.tail
+
+    def update(self, progress: Optional[Callable[["LineIndex"], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Indexa lo que falte del archivo. Si es otro archivo (rotación) o ha
+        menguado se empieza de cero. Devuelve False si se ha interrumpido.
+        """
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if not self._matches(f, stat):
+                self._reset(stat)
+            f.seek(self.size)
+            while True:
+                if should_stop is not None and should_stop():
+                    return False
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                self._scan(chunk)
+                if progress is not None:
+                    progress(self)
+            self.mtime_ns = stat.st_mtime_ns
+        return True
+
+    def feed(self, chunk: bytes):
+        """Indexa bytes que quien escribe el archivo acaba de añadir (al descomprimir, por ejemplo)"""
+        if chunk:
+            self._scan(chunk)
+
+    def _scan(self, chunk: bytes):
+        base = self.size
+        newlines = self.newlines
+        next_point = self.lines[-1] + self.stride
+        for start in range(0, len(chunk), BLOCK_SIZE):
+            end = start + BLOCK_SIZE
+            if newlines >= next_point:
+                # El punto va al principio de la primera línea que empieza en el bloque
+                first = chunk.find(b'\n', start, end)
+                if first >= 0:
+                    self.offsets.append(base + first + 1)
+                    self.lines.append(newlines + 1)
+                    next_point = newlines + 1 + self.stride
+            newlines += chunk.count(b'\n', start, end)
+        self.newlines = newlines
+        self.size = base + len(chunk)
+        self.tail = (self.tail + chunk[-TAIL_CHECK:])[-TAIL_CHECK:]
+
+    # --- Lectura ---
+
+    def locate(self, line: int) -> tuple:
+        """(offset del punto anterior a `line`, líneas a saltar desde él)"""
+        point = bisect.bisect_right(self.lines, line) - 1
+        return self.offsets[point], line - self.lines[point]
+
+    def line_offset(self, f, line: int) -> int:
+        """Offset en bytes del principio de la línea `line` (o del final indexado)"""
+        offset, skip = self.locate(line)
+        f.seek(offset)
+        while skip:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            position = -1
+            while skip:
+                position = block.find(b'\n', position + 1)
+                if position < 0:
+                    break
+                skip -= 1
+            if skip:
+                offset += len(block)
+            else:
+                offset += position + 1
+        return min(offset, self.size)
+
+    def read_lines(self, f, first: int, count: int) -> List[bytes]:
+        """Líneas [first, first + count) del archivo abierto en binario `f`"""
+        offset, skip = self.locate(first)
+        f.seek(offset)
+        wanted = skip + count
+        lines: List[bytes] = []
+        pending = b''
+        while len(lines) < wanted:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                if pending:
+                    lines.append(pending)
+                break
+            parts = (pending + block).split(b'\n')
+            pending = parts.pop()
+            lines.extend(parts)
+        return lines[skip:wanted]
+
+    # --- Caché en disco ---
+
+    @staticmethod
+    def cache_path(stat: os.stat_result, cache_dir: str = CACHE_DIR) -> str:
+        return os.path.join(cache_dir, f"{stat.st_dev}-{stat.st_ino}.idx")
+
+    def save(self, cache_dir: str = CACHE_DIR):
+        """Guarda el índice (escritura atómica); los archivos pequeños no se guardan"""
+        if self.size < MIN_CACHED_SIZE:
+            return
+        os.makedirs(cache_dir, exist_ok=True)
+        count = min(len(self.lines), len(self.offsets))
+        header = _HEADER.pack(_MAGIC, _VERSION, self.stride, self.dev, self.ino, self.size,
+                              self.mtime_ns, self.newlines, count, len(self.tail))
+        path = os.path.join(cache_dir, f"{self.dev}-{self.ino}.idx")
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(header + self.tail + _le_bytes(self.lines[:count]) + _le_bytes(self.offsets[:count]))
+        os.replace(tmp, path)
+        _prune_cache(cache_dir)
+
+    @classmethod
+    def load(cls, path, stride: int = STRIDE, cache_dir: str = CACHE_DIR) -> "LineIndex":
+        """
+        Índice guardado de `path` si es del mismo archivo (aunque haya crecido);
+        si no, uno vacío. En los dos casos hay que llamar a update().
+        """
+        index = cls(path, stride)
+        try:
+            stat = os.stat(path)
+            with open(cls.cache_path(stat, cache_dir), 'rb') as f:
+                data = f.read()
+            (magic, version, saved_stride, dev, ino, size, mtime_ns,
+             newlines, count, tail_len) = _HEADER.unpack_from(data, 0)
+            if (magic, version, saved_stride) != (_MAGIC, _VERSION, stride) or (dev, ino) != (stat.st_dev, stat.st_ino):
+                return index
+            offset = _HEADER.size
+            tail = data[offset:offset + tail_len]
+            offset += tail_len
+            lines = _le_array(data[offset:offset + 8 * count])
+            offsets = _le_array(data[offset + 8 * count:offset + 16 * count])
+            if len(lines) != count or len(offsets) != count:
+                return index
+        except (OSError, struct.error):
+            return index
+        index.lines, index.offsets = lines, offsets
+        index.dev, index.ino = dev, ino
+        index.size, index.mtime_ns, index.newlines, index.tail = size, mtime_ns, newlines, tail
+        return index
+
+
+def _prune_cache(cache_dir: str):
+    """Deja como mucho MAX_CACHED índices (se borran los usados hace más tiempo)"""
+    try:
+        with os.scandir(cache_dir) as entries:
+            files = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.name.endswith(".idx")]
+    except OSError:
+        return
+    if len(files) > MAX_CACHED:
+        files.sort()
+        for _, path in files[:len(files) - MAX_CACHED]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_index.py [GB]  (crea un log de prueba temporal)
+    import random
+    import tempfile
+    import time
+
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    line = b"Jan 12 10:00:00 servidor sshd[1234]: Accepted publickey for admin from 10.0.0.5 port 52022\n"
+    chunk = line * (1024 * 1024 // len(line))
+    fd, path = tempfile.mkstemp(suffix=".log")
+    cache_dir = tempfile.mkdtemp()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(int(size_gb * 1024)):
+                f.write(chunk)
+        total_lines = os.path.getsize(path) // len(line)
+
+        start = time.perf_counter()
+        index = LineIndex(path)
+        index.update()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(f"Indexado de {size / 1024 ** 3:.2f} GB ({index.line_count:,} líneas): {elapsed:.2f} s "
+              f"({size / elapsed / 1024 ** 2:.0f} MB/s), {len(index.lines):,} puntos "
+              f"({16 * len(index.lines) / 1024:.0f} KB)")
+        assert index.line_count == total_lines
+
+        with open(path, 'rb') as f:
+            pages = [random.randrange(total_lines - 100) for _ in range(1000)]
+            start = time.perf_counter()
+            for first in pages:
+                lines = index.read_lines(f, first, 100)
+            elapsed = (time.perf_counter() - start) / len(pages)
+            assert lines == [line[:-1]] * 100
+        print(f"Página de 100 líneas en una posición al azar: {elapsed * 1000:.2f} ms")
+
+        index.save(cache_dir)
+        with open(path, 'ab') as f:
+            f.write(chunk)
+        start = time.perf_counter()
+        cached = LineIndex.load(path, cache_dir=cache_dir)
+        cached.update()
+        print(f"Índice guardado + 1 MB añadido: {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({cached.line_count:,} líneas)")
+        assert cached.line_count == total_lines + len(chunk) // len(line)
+    finally:
+        os.unlink(path)
+        for name in os.listdir(cache_dir):
+            os.unlink(os.path.join(cache_dir, name))
+        os.rmdir(cache_dir)
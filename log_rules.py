@@ -0,0 +1,526 @@
+"""
+Reglas de amenazas del analizador de logs (Mini-SIEM)
+
+Las reglas vienen en paquetes JSON o YAML (el integrado, DEFAULT_PACK, y los
+que haya en RULES_DIR). Cada paquete se compila una vez y se guarda mientras
+el archivo no cambie. Un log se procesa por trozos, sin guardar más que lo
+que se muestra y un número acotado de contadores:
+
+    leer (trozos de bytes) -> cotejar (prefiltro de literales + patrón)
+    -> extraer campos (solo de las líneas que coinciden) -> agregar (umbrales)
+
+- De cada regla se sacan los literales de sus alternativas ('union', '<script'...).
+  Se buscan con bytes.find (sobre el trozo en minúsculas si la regla no
+  distingue mayúsculas) y solo las líneas donde aparecen son candidatas; si
+  todas las alternativas son literales no hace falta más. Si no, el patrón
+  confirma cada línea candidata (o el campo de la línea, si la regla mira
+  solo uno, como la URL). Una regla con alguna alternativa sin literal se
+  recorre entera con su patrón.
+- De las líneas que coinciden se extraen la IP de origen, el usuario, la URL
+  y la hora (FIELD_PATTERNS; un paquete puede añadir o cambiar campos).
+- Una regla con umbral solo salta cuando la misma clave (por ejemplo la IP
+  de origen) la cumple `count` veces en `window` segundos.
+
+Formato de un paquete:
+
+    {"name": "web", "fields": {"campo": "regex con un grupo"},
+     "rules": [{"name": "SQL Injection", "pattern": "...", "field": "url",
+                "case_sensitive": false,
+                "threshold": {"count": 5, "window": 60, "by": "source_ip"}}]}
+"""
+
+import calendar
+import json
+import os
+import re
+import time
+try:
+    from re import _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_parse
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import yaml     # Opcional: sin PyYAML solo se cargan paquetes JSON
+except ImportError:
+    yaml = None
+
+
+RULES_DIR = "siem_rules"    # Paquetes de reglas del usuario (en el directorio actual)
+PACK_SUFFIXES = ('.json', '.yaml', '.yml')
+
+MAX_ROWS = 2000         # Coincidencias que se muestran (las demás solo se cuentan)
+MAX_CONTENT = 100       # Caracteres de la línea que se muestran
+MAX_KEYS = 10000        # Claves seguidas por cada regla con umbral
+MAX_ALERTS = 1000       # Claves que han superado un umbral guardadas
+
+# Campo -> expresión regular; el valor es el primer grupo que coincide
+FIELD_PATTERNS = {
+    "source_ip": r"^\[?((?:\d{1,3}\.){3}\d{1,3}|[0-9a-f]*:[0-9a-f:.]*[0-9a-f])\]?\s"
+                 r"|(?:\bfrom|\brhost=|\bclient:?|\bsrc=)\s*\[?((?:\d{1,3}\.){3}\d{1,3}|[0-9a-f]*:[0-9a-f:.]*[0-9a-f])",
+    "user": r"^\S+ \S+ ([^\s-]\S*) \[|(?:password for|publickey for|invalid user|\buser[= ])\s*(?:invalid user )?([^\s;,'\"]+)",
+    "url": r"\"(?:GET|POST|HEAD|PUT|DELETE|OPTIONS|PATCH|CONNECT|TRACE|PROPFIND) (\S+)",
+    "time": r"\[(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2})|^(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})"
+            r"|^(\w{3} [ \d]\d \d{2}:\d{2}:\d{2})",
+}
+SHOWN_FIELDS = ("source_ip", "user", "url")
+
+# Reglas integradas. Los comentarios SQL (# y --) solo cuentan detrás de una
+# comilla y los separadores de comandos (; | &&) solo delante de un comando:
+# sueltos aparecen en casi cualquier log (agentes de usuario, fechas...).
+_SPACE = r"(?:\s|\+|%20)"
+_QUOTES = ("'", "%27")
+_SEPARATORS = (";", "%3B", "|", "%7C", "&&", "%26%26", "$(", "%24%28", "`", "%60")
+_COMMANDS = rf"{_SPACE}*(?:cat|ls|id|whoami|uname|wget|curl|nc|ncat|bash|sh|ping|rm|chmod)\b"
+_SECRETS = ("api_key", "apikey", "password", "passwd", "secret", "token")
+# Cada alternativa lleva su propio literal, que es lo que busca el prefiltro
+DEFAULT_PACK = {
+    "name": "integrado",
+    "rules": [
+        {"name": "SQL Injection",
+         "pattern": "|".join([rf"union{_SPACE}+(?:all{_SPACE}+)?select"]
+                             + [rf"{quote}{_SPACE}*(?:or|and){_SPACE}+(?:'|%27)?\d+(?:'|%27)?{_SPACE}*=" for quote in _QUOTES]
+                             + [rf"{quote}{_SPACE}*(?:--|#|%23)" for quote in _QUOTES]
+                             + [rf"waitfor{_SPACE}+delay", rf"sleep{_SPACE}*\({_SPACE}*\d",
+                                rf"benchmark{_SPACE}*\(", "information_schema"])},
+        {"name": "XSS",
+         "pattern": "|".join([r"<script", "%3Cscript", "javascript:", r"alert\(", r"document\.cookie"]
+                             + [rf"\b{handler}\s*=" for handler in ("onerror", "onload", "onmouseover", "onfocus")])},
+        {"name": "Path Traversal",
+         "pattern": r"\.\./|\.\.\\|%2e%2e(?:/|%2f|\\|%5c)|/etc/passwd|/etc/shadow|c:\\windows|boot\.ini"},
+        {"name": "Command Injection",
+         "pattern": "|".join([re.escape(separator) + _COMMANDS for separator in _SEPARATORS] + [r"\beval\("])},
+        {"name": "Brute Force",
+         "pattern": r"Failed password|Invalid user|Authentication failure|Login failed",
+         "threshold": {"count": 5, "window": 60, "by": "source_ip"}},
+        {"name": "Sensitive Info",
+         "pattern": "|".join(rf"{secret}=[^\s&\"']+" for secret in _SECRETS)},
+    ],
+}
+
+# Reglas de antes de los paquetes (ruidosas: '#', '--' o ';' sueltos cuentan)
+LEGACY_PATTERNS = {
+    "SQL Injection": r"(UNION SELECT|OR '1'='1|--|#|\/\*|\*\/|WAITFOR DELAY|SLEEP\()",
+    "XSS": r"(<script>|javascript:|onerror=|onload=|alert\()",
+    "Path Traversal": r"(\.\./|\.\.\\|/etc/passwd|c:\\windows|boot\.ini)",
+    "Command Injection": r"(;|\||&&|\$\(|`|eval\()",
+    "Brute Force": r"(Failed password|Invalid user|Authentication failure|Login failed)",
+    "Sensitive Info": r"(API_KEY|password=|passwd=|secret=|token=)",
+}
+
+# (línea, tipo de amenaza, IP de origen, usuario, URL, contenido)
+Row = Tuple[int, str, str, str, str, str]
+
+
+class RulePackError(ValueError):
+    """Paquete de reglas que no se puede leer o no tiene el formato esperado"""
+
+
+def branch_literals(source: bytes, flags: int = 0) -> Tuple[Optional[List[bytes]], bool]:
+    """
+    (literal más largo de cada alternativa de `source`, todas son solo literal)
+
+    Toda coincidencia contiene alguno de los literales. None si alguna
+    alternativa no tiene literal (o el patrón no se entiende).
+    """
+    try:
+        parsed = list(sre_parse.parse(source, flags))
+        # (a|b|c) -> a|b|c (salvo que el grupo cambie marcas, como (?i:...))
+        if len(parsed) == 1 and parsed[0][0] is sre_parse.SUBPATTERN and not any(parsed[0][1][1:3]):
+            parsed = list(parsed[0][1][-1])
+        if len(parsed) == 1 and parsed[0][0] is sre_parse.BRANCH:
+            branches = [list(branch) for branch in parsed[0][1][1]]
+        else:
+            branches = [parsed]
+        literals, exact = [], True
+        for branch in branches:
+            best, run = b'', bytearray()
+            for op, value in branch:
+                if op is sre_parse.LITERAL:
+                    run.append(value)
+                    continue
+                exact = False
+                if len(run) > len(best):
+                    best = bytes(run)
+                run = bytearray()
+            if len(run) > len(best):
+                best = bytes(run)
+            if not best:
+                return None, False
+            literals.append(best)
+        return literals, exact
+    except Exception:
+        return None, False
+
+
+def parse_time(value: str) -> Optional[float]:
+    """Segundos de una hora de log ('12/Jan/2024:10:00:00', ISO o syslog); None si no se entiende"""
+    for fmt in ("%d/%b/%Y:%H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return calendar.timegm(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    try:
+        # syslog no lleva año: basta para medir intervalos (2000 es bisiesto)
+        return calendar.timegm(time.strptime("2000 " + " ".join(value.split()), "%Y %b %d %H:%M:%S"))
+    except ValueError:
+        return None
+
+
+class ThreatRule:
+    """Una regla compilada: patrón sobre bytes, literales del prefiltro, campo y umbral"""
+
+    def __init__(self, name: str, pattern: str, flags: int = re.IGNORECASE, field: Optional[str] = None,
+                 threshold: Optional[Tuple[int, float, Optional[str]]] = None):
+        self.name = name
+        self.field = field              # Solo se mira este campo de la línea (None: toda)
+        self.threshold = threshold      # (veces, ventana en segundos o 0, campo clave o None)
+        source = pattern.encode('utf-8')
+        # re.error llega a quien compila las reglas (patrón no válido).
+        # MULTILINE: ^ y $ son principio y final de cada línea del trozo
+        self.pattern = re.compile(source, flags | re.MULTILINE)
+        self.fold = bool(self.pattern.flags & re.IGNORECASE)
+        literals, self.exact = branch_literals(source, flags)
+        if literals is not None and self.fold:
+            literals = [literal.lower() for literal in literals]
+        # Los literales repetidos o contenidos en otro más corto sobran
+        if literals is not None:
+            literals = sorted(set(literals), key=len)
+            literals = [literal for i, literal in enumerate(literals)
+                        if not any(shorter in literal for shorter in literals[:i])]
+        self.literals = literals
+
+    def line_starts(self, data: bytes, folded: bytes) -> Dict[int, int]:
+        """
+        Principio -> final de cada línea de `data` en la que está la regla (si
+        la regla mira un campo, las candidatas: el campo se comprueba después)
+        """
+        found: Dict[int, int] = {}
+        if self.literals is None:
+            search, position = self.pattern.search, 0
+            while True:
+                match = search(data, position)
+                if match is None:
+                    return found
+                start = data.rfind(b'\n', 0, match.start()) + 1
+                end = data.find(b'\n', match.start())
+                if end < 0:
+                    end = len(data)
+                found[start] = end
+                position = end + 1
+        haystack = folded if self.fold else data
+        find, rfind = haystack.find, haystack.rfind
+        for literal in self.literals:
+            position = find(literal)
+            while position >= 0:
+                start = rfind(b'\n', 0, position) + 1
+                end = find(b'\n', position)
+                if end < 0:
+                    end = len(data)
+                found[start] = end
+                position = find(literal, end + 1)
+        if not self.exact and self.field is None:
+            search = self.pattern.search
+            found = {start: end for start, end in found.items() if search(data, start, end)}
+        return found
+
+
+class Alert:
+    """Una clave que ha superado el umbral de una regla"""
+
+    def __init__(self, rule: str, key: str, count: int, line: int):
+        self.rule = rule
+        self.key = key
+        self.count = count      # Coincidencias de la clave desde que se empezó a seguir
+        self.first_line = line  # Línea en la que se superó el umbral
+        self.last_line = line
+
+
+class ThreatAggregator:
+    """
+    Agrega las coincidencias de un log con memoria acotada: cuenta por regla,
+    aplica los umbrales (MAX_KEYS claves por regla, las menos recientes se
+    olvidan) y guarda las MAX_ALERTS primeras alertas
+    """
+
+    def __init__(self):
+        self.matches: Dict[str, int] = {}   # Coincidencias por regla
+        self.fired: Dict[str, int] = {}     # Veces que ha saltado (con umbral, alertas)
+        self.alerts: Dict[Tuple[str, str], Alert] = {}
+        self._windows: Dict[str, OrderedDict] = {}  # regla -> clave -> horas (o líneas) recientes
+        self._last_time = 0.0
+
+    def add(self, rule: ThreatRule, line: int, fields: Dict[str, str]) -> bool:
+        """Anota una coincidencia; True si la regla salta (hay que mostrarla)"""
+        self.matches[rule.name] = self.matches.get(rule.name, 0) + 1
+        if rule.threshold is None:
+            self.fired[rule.name] = self.fired.get(rule.name, 0) + 1
+            return True
+        count, window, by = rule.threshold
+        key = fields.get(by, "") if by else ""
+        alert = self.alerts.get((rule.name, key))
+        if alert is not None:
+            alert.count += 1
+            alert.last_line = line
+            return False
+        # Sin hora en la línea vale la última vista (los logs van en orden)
+        moment = parse_time(fields["time"]) if window and fields.get("time") else None
+        if moment is None:
+            moment = self._last_time if window else line
+        self._last_time = moment
+        keys = self._windows.setdefault(rule.name, OrderedDict())
+        recent = keys.get(key)
+        if recent is None:
+            recent = keys[key] = deque(maxlen=count)
+            if len(keys) > MAX_KEYS:
+                keys.popitem(last=False)
+        else:
+            keys.move_to_end(key)
+        recent.append(moment)
+        if len(recent) < count or (window and recent[-1] - recent[0] > window):
+            return False
+        del keys[key]
+        self.fired[rule.name] = self.fired.get(rule.name, 0) + 1
+        if len(self.alerts) < MAX_ALERTS:
+            self.alerts[(rule.name, key)] = Alert(rule.name, key, count, line)
+        return True
+
+
+class RuleSet:
+    """Reglas compiladas que se aplican juntas a un log"""
+
+    def __init__(self, rules: List[ThreatRule], fields: Optional[Dict[str, str]] = None):
+        self.rules = rules
+        patterns = dict(FIELD_PATTERNS)
+        patterns.update(fields or {})
+        self.field_patterns = patterns
+        self.fields = {name: re.compile(pattern.encode('utf-8'), re.IGNORECASE | re.MULTILINE)
+                       for name, pattern in patterns.items()}
+
+    def extract(self, data: bytes, start: int, end: int) -> Dict[str, str]:
+        """Campos de la línea data[start:end] (solo los que aparecen)"""
+        values = {}
+        for name, pattern in self.fields.items():
+            match = pattern.search(data, start, end)
+            if match is not None:
+                value = next((group for group in match.groups() if group is not None), match.group())
+                values[name] = value.decode('utf-8', errors='replace')
+        return values
+
+    def scan_chunks(self, chunks: Iterator[bytes], aggregator: ThreatAggregator,
+                    should_stop: Optional[Callable[[], bool]] = None,
+                    max_rows: int = MAX_ROWS) -> Iterator[Tuple[List[Row], int]]:
+        """
+        Aplica las reglas a trozos que acaban en salto de línea. Por cada trozo
+        entrega (filas nuevas a mostrar, líneas leídas); los totales y las
+        alertas quedan en `aggregator`.
+        """
+        shown = 0
+        line = 1
+        fold = any(rule.fold for rule in self.rules)
+        for data in chunks:
+            if should_stop is not None and should_stop():
+                return
+            folded = data.lower() if fold else data
+            hits: List[Tuple[int, int, int]] = []    # (principio, regla, final)
+            for number, rule in enumerate(self.rules):
+                hits.extend((start, number, end) for start, end in rule.line_starts(data, folded).items())
+            hits.sort()
+            rows: List[Row] = []
+            counted = 0
+            fields, fields_start = {}, -1
+            for start, number, end in hits:
+                rule = self.rules[number]
+                # Los campos solo hacen falta para el umbral, el campo de la
+                # regla o una fila que todavía se va a mostrar
+                if start != fields_start and (shown < max_rows or rule.field is not None
+                                              or rule.threshold is not None):
+                    fields, fields_start = self.extract(data, start, end), start
+                elif start != fields_start:
+                    fields = {}
+                if rule.field is not None:
+                    value = fields.get(rule.field)
+                    if value is None or not rule.pattern.search(value.encode('utf-8')):
+                        continue
+                line += data.count(b'\n', counted, start)
+                counted = start
+                if aggregator.add(rule, line, fields) and shown < max_rows:
+                    text = data[start:end].decode('utf-8', errors='ignore').strip()
+                    if len(text) > MAX_CONTENT:
+                        text = text[:MAX_CONTENT - 3] + '...'
+                    rows.append((line, rule.name, *(fields.get(name, "") for name in SHOWN_FIELDS), text))
+                    shown += 1
+            line += data.count(b'\n', counted)
+            # Una última línea sin salto también cuenta como leída
+            yield rows, line - (1 if data.endswith(b'\n') else 0)
+
+
+# --- Paquetes de reglas ---
+
+def _threshold(rule: dict, where: str, fields: Dict[str, str]) -> Optional[Tuple[int, float, Optional[str]]]:
+    threshold = rule.get("threshold")
+    if threshold is None:
+        return None
+    if not isinstance(threshold, dict):
+        raise RulePackError(f"{where}: 'threshold' debe ser un objeto")
+    count, window, by = threshold.get("count", 1), threshold.get("window", 0), threshold.get("by")
+    if not isinstance(count, int) or count < 1:
+        raise RulePackError(f"{where}: 'threshold.count' debe ser un entero mayor que 0")
+    if not isinstance(window, (int, float)) or window < 0:
+        raise RulePackError(f"{where}: 'threshold.window' debe ser un número de segundos")
+    if by is not None and by not in fields:
+        raise RulePackError(f"{where}: campo desconocido en 'threshold.by': {by}")
+    return count, float(window), by
+
+
+def compile_pack(pack: dict, origin: str = "paquete") -> RuleSet:
+    """Compila un paquete ya leído; RulePackError si no es válido"""
+    if not isinstance(pack, dict) or not isinstance(pack.get("rules"), list):
+        raise RulePackError(f"{origin}: falta la lista 'rules'")
+    fields = pack.get("fields") or {}
+    if not isinstance(fields, dict) or not all(isinstance(value, str) for value in fields.values()):
+        raise RulePackError(f"{origin}: 'fields' debe asociar nombres con expresiones regulares")
+    known = dict(FIELD_PATTERNS)
+    known.update(fields)
+    rules = []
+    for i, rule in enumerate(pack["rules"], 1):
+        where = f"{origin}, regla {i}"
+        if not isinstance(rule, dict) or not isinstance(rule.get("name"), str) or not isinstance(rule.get("pattern"), str):
+            raise RulePackError(f"{where}: cada regla necesita 'name' y 'pattern'")
+        field = rule.get("field")
+        if field is not None and field not in known:
+            raise RulePackError(f"{where}: campo desconocido: {field}")
+        flags = 0 if rule.get("case_sensitive") else re.IGNORECASE
+        try:
+            rules.append(ThreatRule(rule["name"], rule["pattern"], flags, field, _threshold(rule, where, known)))
+        except re.error as e:
+            raise RulePackError(f"{where}: expresión no válida: {e}") from e
+    try:
+        return RuleSet(rules, fields)
+    except re.error as e:
+        raise RulePackError(f"{origin}: expresión de campo no válida: {e}") from e
+
+
+def read_pack(path: str) -> dict:
+    """Lee un paquete JSON o YAML (YAML necesita PyYAML)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.lower().endswith('.json'):
+                return json.load(f)
+            if yaml is None:
+                raise RulePackError(f"{os.path.basename(path)}: para paquetes YAML instala PyYAML (pip install pyyaml)")
+            return yaml.safe_load(f)
+    except RulePackError:
+        raise
+    except (OSError, ValueError) as e:
+        raise RulePackError(f"{os.path.basename(path)}: {e}") from e
+    except Exception as e:  # yaml.YAMLError
+        raise RulePackError(f"{os.path.basename(path)}: {e}") from e
+
+
+_compiled: Dict[str, Tuple[tuple, RuleSet]] = {}    # ruta -> (mtime, tamaño), reglas
+
+
+def load_pack(path: str) -> RuleSet:
+    """Reglas de un archivo; se compilan de nuevo solo si el archivo ha cambiado"""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _compiled.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    ruleset = compile_pack(read_pack(path), os.path.basename(path))
+    _compiled[path] = (version, ruleset)
+    return ruleset
+
+
+_default: Optional[RuleSet] = None
+
+
+def load_rules(directory: str = RULES_DIR) -> Tuple[RuleSet, List[str]]:
+    """
+    Reglas integradas más las de los paquetes de `directory`, juntas en un
+    RuleSet (los campos de un paquete valen para todos). Devuelve también los
+    errores de los paquetes que no se han podido cargar.
+    """
+    global _default
+    if _default is None:
+        _default = compile_pack(DEFAULT_PACK, "integrado")
+    rulesets, errors = [_default], []
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.lower().endswith(PACK_SUFFIXES))
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            rulesets.append(load_pack(os.path.join(directory, name)))
+        except (RulePackError, OSError) as e:
+            errors.append(str(e))
+    if len(rulesets) == 1:
+        return _default, errors
+    fields = {}
+    for ruleset in rulesets[1:]:
+        fields.update({name: pattern for name, pattern in ruleset.field_patterns.items()
+                       if FIELD_PATTERNS.get(name) != pattern})
+    return RuleSet([rule for ruleset in rulesets for rule in ruleset.rules], fields), errors
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_rules.py [GB]  (crea un access.log de prueba temporal)
+    import random
+    import sys
+    import tempfile
+
+    from log_search import mapped_chunks
+
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    random.seed(1)
+    paths = ["/index.html", "/api/v1/items?id=42", "/static/app.js", "/login", "/search?q=hola+mundo",
+             "/img/logo.png", "/../../etc/passwd", "/?q=<script>alert(1)</script>", "/item?id=1+UNION+SELECT+1",
+             "/?id=1'--", "/#inicio"]
+    agents = ['"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"',
+              '"curl/8.0.1"', '"Googlebot/2.1 (+http://www.google.com/bot.html)"']
+    sample = "".join(
+        f'203.0.113.{i % 250} - - [12/Jan/2024:10:{i % 60:02d}:{i % 59:02d} +0000] "GET {random.choice(paths)} HTTP/1.1" '
+        f'200 {i % 5000} "-" {random.choice(agents)}\n' for i in range(20000)).encode()
+    fd, path = tempfile.mkstemp(suffix=".log")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(max(1, int(size_gb * 1024 ** 3) // len(sample))):
+                f.write(sample)
+        size = os.path.getsize(path)
+        total_lines = size // len(sample) * sample.count(b'\n')
+        print(f"access.log de {size / 1024 ** 3:.2f} GB, {total_lines:,} líneas")
+
+        for label, pack in (("reglas de antes", {"rules": [{"name": name, "pattern": pattern}
+                                                           for name, pattern in LEGACY_PATTERNS.items()]}),
+                            ("paquete integrado", DEFAULT_PACK)):
+            start = time.perf_counter()
+            ruleset = compile_pack(pack)
+            aggregator = ThreatAggregator()
+            with open(path, 'rb') as f:
+                for rows, lines in ruleset.scan_chunks(mapped_chunks(f), aggregator):
+                    pass
+            elapsed = time.perf_counter() - start
+            print(f"{label:<28} {elapsed:7.2f} s  {lines / elapsed:12,.0f} líneas/s  "
+                  f"{sum(aggregator.fired.values()):,} avisos: "
+                  + ", ".join(f"{name} {count:,}" for name, count in aggregator.fired.items()))
+
+        # Antes: las seis expresiones con re.search en cada línea (solo los primeros MB)
+        limit = min(size, 64 * 1024 * 1024)
+        start = time.perf_counter()
+        read = lines = 0
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for text in f:
+                read += len(text)
+                lines += 1
+                text = text.strip()
+                for pattern in LEGACY_PATTERNS.values():
+                    re.search(pattern, text, re.IGNORECASE)
+                if read >= limit:
+                    break
+        elapsed = time.perf_counter() - start
+        print(f"{'re.search por línea':<28} {elapsed * size / read:7.2f} s  {lines / elapsed:12,.0f} líneas/s  "
+              f"(estimado con los primeros {read // 1024 ** 2} MB)")
+    finally:
+        os.unlink(path)
@@ -0,0 +1,266 @@
+"""
+Búsqueda rápida en archivos de log
+
+El archivo se proyecta en memoria con mmap y se recorre en trozos de unos
+CHUNK_SIZE bytes que acaban en un salto de línea. En cada trozo se busca sobre
+los bytes (bytes.find para texto literal, un patrón `re` compilado sobre bytes
+para expresiones regulares y palabra completa) y solo se decodifican las
+líneas que coinciden. El número de línea sale de contar saltos de línea entre
+una coincidencia y la anterior.
+
+Las expresiones regulares (y la palabra completa) se aceleran como grep:
+si el patrón contiene un literal obligatorio, primero se busca ese literal
+con bytes.find y el patrón solo se aplica a las líneas candidatas.
+
+Las coincidencias se entregan por lotes a medida que aparecen, para que el
+visor pueda ir mostrándolas mientras sigue la búsqueda.
+"""
+
+import mmap
+import os
+import re
+from functools import partial
+try:
+    from re import _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_parse
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+
+CHUNK_SIZE = 16 * 1024 * 1024   # Bytes por trozo (se amplía hasta el siguiente salto de línea)
+BATCH_SIZE = 500                # Coincidencias por lote entregado
+MAX_RESULTS = 100000            # Coincidencias máximas por búsqueda
+MIN_PREFILTER = 3               # Longitud mínima del literal usado como prefiltro
+
+Match = Tuple[int, str]         # (número de línea empezando en 1, texto de la línea)
+
+
+class LogSearch:
+    """
+    Una búsqueda compilada
+
+    - `regex`: la consulta es una expresión regular (sintaxis de `re`)
+    - `case_sensitive`: distingue mayúsculas (sin ella se pliegan las ASCII)
+    - `whole_word`: la coincidencia debe ser una palabra completa
+    """
+
+    def __init__(self, query: str, regex: bool = False, case_sensitive: bool = False,
+                 whole_word: bool = False):
+        self.query = query
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        encoded = query.encode('utf-8')
+        self.needle: Optional[bytes] = None     # Literal a buscar con find
+        self.pattern: Optional[re.Pattern] = None
+        self.fold = not case_sensitive          # ¿Se busca el literal en minúsculas?
+        if regex or whole_word:
+            source = encoded if regex else re.escape(encoded)
+            if whole_word:
+                # Las marcas globales como (?i) tienen que seguir al principio
+                flags_prefix = re.match(rb'(?:\(\?[aiLmsux]+\))*', source).group()
+                source = flags_prefix + rb'\b(?:' + source[len(flags_prefix):] + rb')\b'
+            flags = 0 if case_sensitive else re.IGNORECASE
+            # re.error llega a quien crea la búsqueda (expresión no válida).
+            # MULTILINE: ^ y $ son principio y final de cada línea del trozo
+            self.pattern = re.compile(source, flags | re.MULTILINE)
+            # Un (?i) dentro de la expresión también pliega mayúsculas
+            self.fold = bool(self.pattern.flags & re.IGNORECASE)
+            literal = required_literal(encoded, flags) if regex else encoded
+            if literal is not None and len(literal) >= MIN_PREFILTER:
+                self.needle = literal
+        else:
+            self.needle = encoded
+        if self.needle is not None and self.fold:
+            self.needle = self.needle.lower()
+
+    def _positions(self, data: bytes) -> Iterator[int]:
+        """Posición de cada coincidencia (como mucho una por línea)"""
+        needle, pattern = self.needle, self.pattern
+        if needle is None:
+            # Patrón sin literal obligatorio: el motor de re recorre todo
+            search = pattern.search
+            position = 0
+            while True:
+                found = search(data, position)
+                if found is None:
+                    return
+                yield found.start()
+                # La siguiente, a partir de la línea siguiente
+                end = data.find(b'\n', found.start())
+                if end < 0:
+                    return
+                position = end + 1
+        haystack = data.lower() if self.fold else data
+        find = haystack.find
+        position = find(needle)
+        while position >= 0:
+            end = haystack.find(b'\n', position)
+            if end < 0:
+                end = len(data)
+            if pattern is None:
+                yield position
+            else:
+                # Línea candidata: el patrón confirma (y dice dónde empieza)
+                start = haystack.rfind(b'\n', 0, position) + 1
+                found = pattern.search(data, start, end)
+                if found is not None:
+                    yield found.start()
+            position = find(needle, end + 1)
+
+    def search_chunks(self, chunks: Iterator[bytes],
+                      should_stop: Optional[Callable[[], bool]] = None,
+                      limit: int = MAX_RESULTS) -> Iterator[List[Match]]:
+        """Busca en trozos que acaban en salto de línea; entrega lotes de coincidencias"""
+        batch: List[Match] = []
+        line = 1
+        found = 0
+        for data in chunks:
+            if should_stop is not None and should_stop():
+                break
+            counted = 0     # Hasta dónde se han contado saltos de línea en `data`
+            for position in self._positions(data):
+                start = data.rfind(b'\n', 0, position) + 1
+                end = data.find(b'\n', position)
+                if end < 0:
+                    end = len(data)
+                line += data.count(b'\n', counted, start)
+                counted = start
+                batch.append((line, data[start:end].decode('utf-8', errors='replace').rstrip('\r')))
+                found += 1
+                if found >= limit:
+                    yield batch
+                    return
+                if len(batch) >= BATCH_SIZE:
+                    yield batch
+                    batch = []
+            line += data.count(b'\n', counted)
+            if batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def search_file(self, path, should_stop: Optional[Callable[[], bool]] = None,
+                    limit: int = MAX_RESULTS) -> Iterator[List[Match]]:
+        """Busca en un archivo; entrega lotes de (número de línea, texto)"""
+        with open(path, 'rb') as f:
+            yield from self.search_chunks(mapped_chunks(f), should_stop, limit)
+
+
+def required_literal(source: bytes, flags: int = 0) -> Optional[bytes]:
+    """
+    El literal más largo que aparece siempre en una coincidencia de `source`
+    (solo la secuencia principal del patrón; None si no hay o no se sabe)
+    """
+    try:
+        parsed = sre_parse.parse(source, flags)
+        best, run = b'', bytearray()
+        for op, value in parsed:
+            if op is sre_parse.LITERAL:
+                run.append(value)
+                continue
+            if len(run) > len(best):
+                best = bytes(run)
+            run = bytearray()
+        if len(run) > len(best):
+            best = bytes(run)
+        return best or None
+    except Exception:
+        return None
+
+
+def mapped_chunks(f, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Trozos de un archivo abierto en binario, proyectado con mmap, que acaban en salto de línea"""
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Sin mmap (algunos sistemas de archivos especiales): lectura normal
+        yield from stream_chunks(f, chunk_size)
+        return
+    with mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        start = 0
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                newline = mapped.find(b'\n', end)
+                end = size if newline < 0 else newline + 1
+            yield mapped[start:end]
+            start = end
+
+
+def stream_chunks(f, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Trozos que acaban en salto de línea leídos de cualquier flujo binario"""
+    return line_chunks(iter(partial(f.read, chunk_size), b''))
+
+
+def line_chunks(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """Junta bloques de bytes en trozos que acaban en salto de línea (salvo el último)"""
+    pending = b''
+    for block in blocks:
+        block = pending + block
+        cut = block.rfind(b'\n') + 1
+        if cut == 0:
+            pending = block     # Línea más larga que el bloque: se sigue leyendo
+            continue
+        pending = block[cut:]
+        yield block[:cut]
+    if pending:
+        yield pending
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_search.py [GB]  (crea un log de prueba temporal)
+    import sys
+    import tempfile
+    import time
+
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    line = b"Jan 12 10:00:00 servidor sshd[1234]: Accepted publickey for admin from 10.0.0.5 port 52022\n"
+    rare = b"Jan 12 10:00:01 servidor sshd[4321]: Failed password for root from 203.0.113.9 port 40000\n"
+    block = line * (1024 * 1024 // len(line) - 1) + rare
+    fd, path = tempfile.mkstemp(suffix=".log")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(int(size_gb * 1024)):
+                f.write(block)
+        size = os.path.getsize(path)
+        print(f"Archivo de {size / 1024 ** 3:.2f} GB, una línea 'Failed password' por MB")
+        cases = (
+            ("literal", LogSearch("Failed password", case_sensitive=True)),
+            ("literal sin mayúsculas", LogSearch("failed PASSWORD")),
+            ("palabra completa", LogSearch("root", whole_word=True)),
+            ("regex", LogSearch(r"Failed \w+ for \w+ from [\d.]+", regex=True, case_sensitive=True)),
+            ("regex sin mayúsculas", LogSearch(r"failed \w+ for root", regex=True)),
+            ("regex anclada", LogSearch(r"^Jan 12 10:00:01 .*40000$", regex=True)),
+        )
+        for label, search in cases:
+            start = time.perf_counter()
+            hits = sum(len(batch) for batch in search.search_file(path))
+            elapsed = time.perf_counter() - start
+            if label == "regex anclada":
+                # ^ y $ en cada línea, no solo al principio y al final de cada trozo
+                assert hits == int(size_gb * 1024), hits
+            print(f"{label:<24} {elapsed:6.2f} s  {size / elapsed / 1024 ** 2:7.0f} MB/s  {hits:,} coincidencias")
+
+        # Referencia: bucle por líneas en Python como search_in_log
+        limit = min(size, 256 * 1024 * 1024)
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            read = hits = 0
+            for text in f:
+                read += len(text)
+                if "failed password" in text.lower():
+                    hits += 1
+                if read >= limit:
+                    break
+        elapsed = time.perf_counter() - start
+        print(f"{'línea a línea (lower)':<24} {elapsed * size / read:6.2f} s  {read / elapsed / 1024 ** 2:7.0f} MB/s"
+              f"  (estimado con los primeros {read // 1024 ** 2} MB)")
+    finally:
+        os.unlink(path)
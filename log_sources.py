@@ -0,0 +1,489 @@
+"""
+Logs comprimidos y grupos de rotación
+
+Los logs rotados (syslog, syslog.1, syslog.2.gz...) se leen como un solo log
+en orden de tiempo, del más antiguo al actual. Los comprimidos (.gz, .xz,
+.bz2 y .zst si está instalado `zstandard`) se descomprimen como flujo, de
+READ_SIZE en READ_SIZE bytes, sin tener nunca el archivo entero en memoria.
+
+- LogSource: las partes de un log; da trozos acabados en salto de línea
+  para buscar o analizar (mmap en los normales, flujo en los comprimidos).
+- SourceIndex: índice de líneas de un LogSource para el visor. Cada parte se
+  indexa cuando le llega el turno, así que el visor muestra lo ya indexado
+  mientras sigue el resto. Las comprimidas no se descomprimen a disco: se
+  leen con un DecompressedReader, que vuelve a descomprimir la página pedida
+  desde el punto de reanudación más cercano.
+- DecompressedReader: seek()/read() sobre el contenido descomprimido. En los
+  .gz se guarda una copia del descompresor zlib cada CHECKPOINT_BYTES de
+  salida; los demás formatos (su estado no se puede copiar) se reanudan
+  desde el principio de la parte. Los últimos WINDOW_BYTES descomprimidos
+  se guardan para poder retroceder unas páginas sin descomprimir de nuevo.
+"""
+
+import bisect
+import bz2
+import gzip
+import lzma
+import os
+import re
+import zlib
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from log_index import LineIndex
+from log_search import CHUNK_SIZE, line_chunks, mapped_chunks
+
+
+READ_SIZE = 1024 * 1024     # Bytes descomprimidos por lectura
+CHECKPOINT_BYTES = 16 * 1024 * 1024     # Salida entre dos puntos de reanudación de un .gz
+WINDOW_BYTES = 4 * 1024 * 1024          # Últimos bytes descomprimidos que guarda un lector
+_GZIP_MAGIC = b'\x1f\x8b'
+
+COMPRESSORS: Dict[str, Callable[[str], BinaryIO]] = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.bz2': bz2.open,
+}
+try:
+    import zstandard
+
+    def _open_zstd(path: str) -> BinaryIO:
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+
+    COMPRESSORS['.zst'] = _open_zstd
+    _ZSTD_ERRORS: tuple = (zstandard.ZstdError,)
+except ImportError:
+    _ZSTD_ERRORS = ()   # Sin zstandard los .zst no se muestran
+
+# Lo que puede lanzar un archivo comprimido dañado o cortado
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error, lzma.LZMAError) + _ZSTD_ERRORS
+
+# nombre.N (logrotate) o nombre-AAAAMMDD[HH] (logrotate con dateext)
+_ROTATED = re.compile(r'^(?P<base>.+?)(?:\.(?P<number>\d{1,3})|-(?P<date>\d{8}(?:\d{2})?))$')
+
+
+def compression_of(name: str) -> Optional[str]:
+    """Extensión de compresión de `name` si se sabe descomprimir ('.gz'...)"""
+    suffix = os.path.splitext(name)[1].lower()
+    return suffix if suffix in COMPRESSORS else None
+
+
+def strip_compression(name: str) -> str:
+    """'syslog.2.gz' -> 'syslog.2'"""
+    suffix = compression_of(name)
+    return name[:-len(suffix)] if suffix else name
+
+
+def rotation_key(name: str) -> Tuple[str, tuple]:
+    """
+    (nombre base, orden) de un log: 'syslog.2.gz' -> ('syslog', ...). El
+    orden crece del más antiguo al actual (que no lleva número ni fecha).
+    """
+    name = strip_compression(name)
+    match = _ROTATED.match(name)
+    if match is None:
+        return name, (2, 0)
+    if match.group('number') is not None:
+        return match.group('base'), (1, -int(match.group('number')))
+    return match.group('base'), (0, int(match.group('date')))
+
+
+def open_log(path) -> BinaryIO:
+    """Abre un log en binario, descomprimiéndolo al leer si hace falta"""
+    suffix = compression_of(os.fspath(path))
+    if suffix is None:
+        return open(path, 'rb')
+    return COMPRESSORS[suffix](os.fspath(path))
+
+
+class LogSource:
+    """Un log formado por una o varias partes (de la más antigua a la actual)"""
+
+    def __init__(self, parts: Sequence):
+        self.parts = [Path(part) for part in parts]
+        self.errors: List[str] = []     # Partes comprimidas dañadas (se leen hasta el error)
+
+    @property
+    def path(self) -> Path:
+        """La parte actual (la más reciente)"""
+        return self.parts[-1]
+
+    @property
+    def is_plain(self) -> bool:
+        """Un solo archivo sin comprimir (se puede indexar y seguir directamente)"""
+        return len(self.parts) == 1 and compression_of(self.path.name) is None
+
+    def blocks(self, part: Path, size: int = READ_SIZE) -> Iterator[bytes]:
+        """
+        Bloques de unos `size` bytes descomprimidos de una parte. Si está
+        dañada o cortada se entrega lo descomprimido hasta el error (se lee
+        con read1 para no perder el último bloque) y se anota en `errors`.
+        """
+        with open_log(part) as stream:
+            read = getattr(stream, 'read1', stream.read)
+            pending: List[bytes] = []
+            buffered = 0
+            try:
+                while True:
+                    data = read(size - buffered)
+                    if not data:
+                        break
+                    pending.append(data)
+                    buffered += len(data)
+                    if buffered >= size:
+                        yield b''.join(pending)
+                        pending, buffered = [], 0
+            except DECOMPRESSION_ERRORS as e:
+                self.errors.append(f"{part.name}: {e}")
+            if pending:
+                yield b''.join(pending)
+
+    def chunks(self, should_stop: Optional[Callable[[], bool]] = None,
+               chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Trozos acabados en salto de línea de todas las partes seguidas; una
+        parte sin salto de línea final no junta su última línea con la siguiente
+        """
+        self.errors = []
+        for part in self.parts:
+            if should_stop is not None and should_stop():
+                return
+            if compression_of(part.name) is None:
+                with open(part, 'rb') as f:
+                    yield from self._ended(mapped_chunks(f, chunk_size), should_stop)
+            else:
+                yield from self._ended(line_chunks(self.blocks(part)), should_stop)
+            if should_stop is not None and should_stop():
+                return
+
+    @staticmethod
+    def _ended(chunks: Iterator[bytes], should_stop) -> Iterator[bytes]:
+        for chunk in chunks:
+            if not chunk.endswith(b'\n'):
+                chunk += b'\n'
+            yield chunk
+            if should_stop is not None and should_stop():
+                return
+
+
+class DecompressedReader:
+    """
+    Archivo comprimido que se puede leer por offsets de su contenido
+    descomprimido (lo que necesita LineIndex.read_lines), con memoria acotada:
+    puntos de reanudación (solo .gz) más una ventana de WINDOW_BYTES
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.is_gzip = compression_of(self.path.name) == '.gz'
+        # (offset descomprimido, offset comprimido, copia del descompresor zlib)
+        self.checkpoints: List[Tuple[int, int, object]] = []
+        self._position = 0
+        self._blocks: Optional[Iterator[bytes]] = None
+        self._window = bytearray()      # Bytes [_window_start, _window_start + len) ya descomprimidos
+        self._window_start = 0
+
+    def scan(self, size: int = READ_SIZE) -> Iterator[bytes]:
+        """
+        Recorre la parte entera de principio a fin (al indexarla) y, en los
+        .gz, anota los puntos de reanudación. Un error de descompresión llega
+        a quien recorre después de entregar lo descomprimido hasta él.
+        """
+        if self.is_gzip:
+            yield from self._gzip_blocks(0, 0, None, size, self.checkpoints)
+            return
+        with open_log(self.path) as stream:
+            read = getattr(stream, 'read1', stream.read)
+            while True:
+                data = read(size)
+                if not data:
+                    return
+                yield data
+
+    def _gzip_blocks(self, out_offset: int, in_offset: int, state, size: int,
+                     checkpoints: Optional[list] = None) -> Iterator[bytes]:
+        """Bloques de un .gz desde un punto de reanudación (o desde el principio)"""
+        with open(self.path, 'rb') as f:
+            f.seek(in_offset)
+            decompressor = state.copy() if state is not None else zlib.decompressobj(16 + zlib.MAX_WBITS)
+            consumed = in_offset    # Entrada que el descompresor ya ha procesado
+            next_checkpoint = out_offset + CHECKPOINT_BYTES
+            pending = b''
+            while True:
+                if not pending:
+                    pending = f.read(64 * 1024)
+                data = decompressor.decompress(pending, size)
+                if not pending and not data:
+                    # Fin del archivo y sin salida retenida en el descompresor
+                    if not decompressor.eof:
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    return
+                if decompressor.eof:
+                    # Varios miembros gzip seguidos (cat a.gz b.gz); el relleno final se
+                    # ignora. Lo que sigue al miembro está en unused_data (y también
+                    # en unconsumed_tail, que no hay que volver a sumar)
+                    rest = decompressor.unused_data
+                    consumed += len(pending) - len(rest)
+                    pending = b''
+                    if not rest.startswith(_GZIP_MAGIC):
+                        rest += f.read(2 - len(rest)) if len(rest) < 2 else b''
+                    if rest.startswith(_GZIP_MAGIC):
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                        pending = rest
+                    else:
+                        if data:
+                            yield data
+                        return
+                else:
+                    consumed += len(pending) - len(decompressor.unconsumed_tail)
+                    pending = decompressor.unconsumed_tail
+                if data:
+                    out_offset += len(data)
+                    yield data
+                if checkpoints is not None and out_offset >= next_checkpoint and not decompressor.eof:
+                    checkpoints.append((out_offset, consumed, decompressor.copy()))
+                    next_checkpoint = out_offset + CHECKPOINT_BYTES
+
+    # --- Lectura por offsets (hilo del visor) ---
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = WINDOW_BYTES
+        data = self._read_at(self._position, size)
+        self._position += len(data)
+        return data
+
+    def _read_at(self, offset: int, size: int) -> bytes:
+        if self._blocks is None or offset < self._window_start:
+            self._restart(offset)
+        elif offset > self._window_start + len(self._window) and self._checkpoint(offset)[0] > self._window_start + len(self._window):
+            self._restart(offset)   # Más adelante hay un punto de reanudación más cerca
+        # Se descomprime hacia delante hasta cubrir lo pedido (o el final); lo
+        # anterior a `offset` solo se guarda mientras quepa en la ventana
+        while self._window_start + len(self._window) < offset + size:
+            block = self._next_block()
+            if block is None:
+                break
+            self._window += block
+            excess = min(len(self._window) - WINDOW_BYTES, offset - self._window_start)
+            if excess > 0:
+                del self._window[:excess]
+                self._window_start += excess
+        start = offset - self._window_start
+        return bytes(self._window[start:start + size])
+
+    def _next_block(self) -> Optional[bytes]:
+        try:
+            return next(self._blocks, None)
+        except DECOMPRESSION_ERRORS:
+            # Parte dañada: se lee hasta el error (ya anotado al indexar)
+            self._blocks = iter(())
+            return None
+
+    def _checkpoint(self, offset: int) -> tuple:
+        """Último punto de reanudación antes de `offset` (el principio si no hay)"""
+        points = self.checkpoints
+        position = bisect.bisect_right([point[0] for point in points], offset)
+        return points[position - 1] if position else (0, 0, None)
+
+    def _restart(self, offset: int):
+        """Vuelve a descomprimir desde el punto de reanudación anterior a `offset`"""
+        self.close()
+        if self.is_gzip:
+            checkpoint = self._checkpoint(offset)
+            self._window_start = checkpoint[0]
+            self._blocks = self._gzip_blocks(*checkpoint, READ_SIZE)
+        else:
+            self._window_start = 0
+            self._blocks = self._plain_blocks()
+
+    def _plain_blocks(self) -> Iterator[bytes]:
+        with open_log(self.path) as stream:
+            read = getattr(stream, 'read1', stream.read)
+            while True:
+                data = read(READ_SIZE)
+                if not data:
+                    return
+                yield data
+
+    def close(self):
+        if self._blocks is not None and hasattr(self._blocks, 'close'):
+            self._blocks.close()
+        self._blocks = None
+        self._window = bytearray()
+
+
+class SourceIndex:
+    """
+    Índice de líneas de todas las partes de un LogSource
+
+    Las partes normales se indexan con su LineIndex (y su caché en disco);
+    las comprimidas se indexan al descomprimirlas y se leen después con un
+    DecompressedReader (nada se descomprime a disco). Lo usan dos hilos: el
+    que indexa (update) y el que pinta (read_lines); las listas se amplían
+    siempre antes que `starts`.
+    """
+
+    def __init__(self, source: LogSource):
+        self.source = source
+        self.indexes: List[LineIndex] = []
+        self.files: list = []               # Archivo (o DecompressedReader) de cada parte
+        self.starts = array('Q')            # Primera línea de cada parte
+
+    @property
+    def line_count(self) -> int:
+        if not self.starts:
+            return 0
+        last = len(self.starts) - 1
+        return self.starts[last] + self.indexes[last].line_count
+
+    def update(self, progress: Optional[Callable[["SourceIndex"], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """Indexa las partes que falten; False si se ha interrumpido"""
+        if not self.starts:
+            self.source.errors = []
+        report = (lambda _: progress(self)) if progress is not None else None
+        for part in self.source.parts[len(self.starts):]:
+            start = self.line_count
+            if compression_of(part.name) is None:
+                index = LineIndex.load(part)
+                self.files.append(open(part, 'rb'))
+                self.indexes.append(index)
+                self.starts.append(start)
+                finished = index.update(progress=report, should_stop=should_stop)
+                if finished:
+                    try:
+                        index.save()
+                    except OSError:
+                        pass    # Sin caché en disco: la próxima vez se vuelve a indexar
+            else:
+                finished = self._decompress(part, start, report, should_stop)
+            if not finished:
+                return False
+        return True
+
+    def _decompress(self, part: Path, start: int, progress, should_stop) -> bool:
+        reader = DecompressedReader(part)
+        index = LineIndex(part)
+        self.files.append(reader)
+        self.indexes.append(index)
+        self.starts.append(start)
+        # Si la parte está dañada se queda lo descomprimido hasta el error
+        # y se sigue con la siguiente (como al buscar)
+        try:
+            for data in reader.scan():
+                if should_stop is not None and should_stop():
+                    return False
+                index.feed(data)
+                if progress is not None:
+                    progress(index)
+        except DECOMPRESSION_ERRORS as e:
+            self.source.errors.append(f"{part.name}: {e}")
+        return True
+
+    def read_lines(self, first: int, count: int) -> List[bytes]:
+        """Líneas [first, first + count) de todas las partes seguidas"""
+        lines: List[bytes] = []
+        starts = self.starts
+        part = bisect.bisect_right(starts, first) - 1
+        while count > 0 and 0 <= part < len(starts):
+            index = self.indexes[part]
+            skip = first - starts[part]
+            wanted = min(count, index.line_count - skip)
+            if wanted > 0:
+                taken = index.read_lines(self.files[part], skip, wanted)
+                lines.extend(taken)
+                if len(taken) < wanted:
+                    break   # El archivo ha cambiado bajo el índice
+                first += wanted
+                count -= wanted
+            part += 1
+        return lines
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_sources.py [MB]  (grupo de rotación de prueba temporal)
+    import random
+    import shutil
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    from log_search import LogSearch
+
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    line = b"Jan 12 10:00:00 servidor sshd[1234]: Accepted publickey for admin from 10.0.0.5 port 52022\n"
+    chunk = line * (1024 * 1024 // len(line))
+    directory = tempfile.mkdtemp()
+    try:
+        # Comprobación: .gz de varios miembros (cat a.gz b.gz) con lecturas y
+        # puntos de reanudación pequeños, comparado con gzip.open
+        READ_SIZE, CHECKPOINT_BYTES, WINDOW_BYTES = 4096, 64 * 1024, 16 * 1024
+        path = os.path.join(directory, "multi.log.gz")
+        with open(path, "wb") as f:
+            for member in range(5):
+                f.write(gzip.compress(b"".join(b"miembro %d linea %d\n" % (member, n)
+                                               for n in range(20000))))
+                f.write(gzip.compress(b"a" * 2 * 1024 * 1024))
+        with gzip.open(path) as f:
+            expected = f.read()
+        reader = DecompressedReader(path)
+        assert b"".join(reader.scan(READ_SIZE)) == expected, "scan() difiere de gzip.open"
+        for _ in range(200):
+            offset = random.randrange(len(expected))
+            length = random.randrange(1, 3 * READ_SIZE)
+            reader.seek(offset)
+            assert reader.read(length) == expected[offset:offset + length], f"read en {offset} difiere"
+        reader.close()
+        os.remove(path)
+        READ_SIZE, CHECKPOINT_BYTES, WINDOW_BYTES = 1024 * 1024, 16 * 1024 * 1024, 4 * 1024 * 1024
+        print(f"Varios miembros gzip: {len(expected) / 1024 ** 2:.1f} MB iguales a gzip.open")
+
+        parts = []
+        for name, opener in (("app.log.3.bz2", bz2.open), ("app.log.2.xz", lzma.open),
+                             ("app.log.1.gz", gzip.open), ("app.log", open)):
+            path = os.path.join(directory, name)
+            with opener(path, "wb") as f:
+                for _ in range(size_mb // 4):
+                    f.write(chunk)
+            parts.append(path)
+        total = len(parts) * (size_mb // 4) * len(chunk)
+        print(f"Grupo de {len(parts)} partes, {total / 1024 ** 2:.0f} MB sin comprimir")
+        index = SourceIndex(LogSource(parts))
+
+        for label, run in (
+            ("buscar en todas las partes", lambda: sum(len(batch) for batch in
+                                                        LogSearch("Failed").search_chunks(LogSource(parts).chunks()))),
+            ("indexar para el visor", lambda: index.update()),
+        ):
+            tracemalloc.start()
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:<28} {elapsed:6.2f} s  {total / elapsed / 1024 ** 2:6.0f} MB/s  "
+                  f"pico {peak / 1024 ** 2:.1f} MB")
+
+        # Páginas al azar: se descomprimen desde el punto de reanudación más cercano
+        pages = [random.randrange(index.line_count - 100) for _ in range(50)]
+        start = time.perf_counter()
+        for first in pages:
+            index.read_lines(first, 100)
+        print(f"{'página de 100 líneas al azar':<28} {(time.perf_counter() - start) / len(pages) * 1000:6.1f} ms")
+        index.close()
+    finally:
+        shutil.rmtree(directory)
@@ -2,12 +2,22 @@
 Utilidades para búsqueda y lectura de archivos de logs
 """
 
+import json
 import os
 import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 import mimetypes
 
+from log_sources import COMPRESSORS, compression_of, rotation_key, strip_compression
+
+
+SCAN_CACHE_FILE = ".log_scan_cache.json"   # Directorios ya escaneados (en el directorio actual)
+SCAN_WORKERS = 8        # Raíces escaneadas a la vez
+SCAN_CACHE_VERSION = 2  # Súbela si cambia qué nombres cuentan como logs (is_log_name)
+
 
 def get_platform_log_paths() -> List[Path]:
     """Obtiene las rutas de logs según el sistema operativo"""
@@ -67,26 +77,169 @@ def get_platform_log_paths() -> List[Path]:
 
 def is_log_file(filepath: Path) -> bool:
     """Determina si un archivo es un log basándose en la extensión y contenido"""
-    # Extensiones comunes de logs (sin .txt para evitar archivos Python)
-    log_extensions = {'.log', '.out', '.err', '.trace'}
+    return is_log_name(filepath.name)
+
+
+# Extensiones comunes de logs (sin .txt para evitar archivos Python)
+LOG_EXTENSIONS = {'.log', '.out', '.err', '.trace'}
+# Archivos sin extensión que parecen logs (solo nombres exactos)
+COMMON_LOG_NAMES = {'syslog', 'messages', 'auth', 'kern', 'dmesg', 'error', 'access', 'debug'}
+
+
+def is_log_name(name: str) -> bool:
+    """Como is_log_file, pero con el nombre del archivo (sin crear un Path)"""
+    name = name.lower()
     
+    # Logs comprimidos (syslog.2.gz) y rotados (syslog.1, messages-20240101)
+    if compression_of(name):
+        name = strip_compression(name)
+    if _is_plain_log_name(name):
+        return True
+    base, _ = rotation_key(name)
+    return base != name and _is_plain_log_name(base)
+
+
+def _is_plain_log_name(name: str) -> bool:
     # Verificar extensión de log específica
-    if filepath.suffix.lower() in log_extensions:
+    if os.path.splitext(name)[1] in LOG_EXTENSIONS:
         return True
     
-    # Verificar archivos sin extensión que parecen logs (solo nombres exactos)
-    common_log_names = {'syslog', 'messages', 'auth', 'kern', 'dmesg', 'error', 'access', 'debug'}
-    if filepath.name.lower() in common_log_names:
+    if name in COMMON_LOG_NAMES:
         return True
     
     # Archivos numerados de rotación (*.log.1, *.log.2, etc)
-    if '.log.' in filepath.name.lower():
+    if '.log.' in name:
         return True
     
     return False
 
 
-def scan_log_files(directory: Path, max_depth: int = 3, current_depth: int = 0) -> List[Dict]:
+def _log_file_info(path: str, name: str) -> Dict:
+    try:
+        stat = os.stat(path, follow_symlinks=False)
+        return {
+            'path': Path(path),
+            'name': name,
+            'size': stat.st_size,
+            'modified': stat.st_mtime,
+            'readable': os.access(path, os.R_OK)
+        }
+    except (PermissionError, OSError):
+        # Agregar el archivo aunque no tengamos todos los detalles
+        return {
+            'path': Path(path),
+            'name': name,
+            'size': 0,
+            'modified': 0,
+            'readable': False
+        }
+
+
+class LogScanCache:
+    """
+    Contenido de los directorios ya escaneados (logs y subdirectorios)
+
+    Cada entrada va con el mtime del directorio, que cambia al crear, borrar o
+    renombrar algo dentro: si no ha cambiado no hace falta listarlo otra vez,
+    basta con consultar el tamaño y la fecha de sus logs. Se guarda en disco
+    (SCAN_CACHE_FILE) para aprovecharlo también al volver a abrir el visor,
+    junto con la versión del filtro de nombres: si el filtro ha cambiado (o
+    los formatos comprimidos disponibles), la caché guardada no vale.
+    """
+
+    def __init__(self, path: Optional[str] = SCAN_CACHE_FILE):
+        self.path = path
+        self.entries: Dict[str, list] = {}  # directorio -> [mtime_ns, logs, subdirectorios]
+        self.listed = 0                     # Directorios listados en el último escaneo
+        self.reused = 0                     # ... y los que no hacía falta listar
+        self.visited = set()                # Directorios vistos en el último escaneo
+        self._loaded = False
+
+    def load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if (isinstance(data, dict) and data.get('filter') == self.filter_key()
+                    and isinstance(data.get('entries'), dict)):
+                self.entries = data['entries']
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def filter_key() -> list:
+        """Lo que decide qué archivos se guardan como logs en cada entrada"""
+        return [SCAN_CACHE_VERSION, sorted(LOG_EXTENSIONS), sorted(COMMON_LOG_NAMES), sorted(COMPRESSORS)]
+
+    def start_scan(self):
+        self.load()
+        self.listed = self.reused = 0
+        self.visited = set()
+
+    def prune(self, roots: Iterable[str]):
+        """Olvida los directorios bajo `roots` que ya no se han encontrado"""
+        prefixes = tuple(os.path.join(root, '') for root in roots)
+        for path in [path for path in self.entries
+                     if path not in self.visited and path.startswith(prefixes)]:
+            del self.entries[path]
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'filter': self.filter_key(), 'entries': self.entries}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def scan_directory(self, path: str) -> tuple[List[Dict], List[str]]:
+        """(logs, nombres de subdirectorios) de un directorio"""
+        self.visited.add(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            self.reused += 1
+            return [_log_file_info(os.path.join(path, name), name) for name in cached[1]], cached[2]
+        
+        names, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        # El tipo sale de la propia entrada del directorio: sin
+                        # stat() para lo que no es un log
+                        if entry.is_symlink():
+                            continue    # Omitir enlaces simbólicos para evitar loops
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif is_log_name(entry.name) and entry.is_file(follow_symlinks=False):
+                            names.append(entry.name)
+                    except OSError:
+                        continue
+        except (PermissionError, OSError):
+            # Ignorar directorios sin permisos
+            return [], []
+        self.listed += 1
+        # Un cambio en el mismo instante del escaneo podría no cambiar el
+        # mtime: esos directorios se vuelven a listar la próxima vez
+        if time.time_ns() - mtime_ns > 2_000_000_000:
+            self.entries[path] = [mtime_ns, names, subdirs]
+        else:
+            self.entries.pop(path, None)
+        return [_log_file_info(os.path.join(path, name), name) for name in names], subdirs
+
+
+def scan_log_files(directory: Path, max_depth: int = 3, current_depth: int = 0,
+                   cache: Optional[LogScanCache] = None) -> List[Dict]:
     """
     Escanea recursivamente un directorio en busca de archivos de logs
     
@@ -94,54 +247,120 @@ def scan_log_files(directory: Path, max_depth: int = 3, current_depth: int = 0)
         Lista de diccionarios con información de cada log encontrado
     """
     log_files = []
-    
-    if not directory.exists() or not directory.is_dir():
-        return log_files
+    if cache is None:
+        cache = LogScanCache(path=None)
     
     if current_depth >= max_depth:
         return log_files
     
-    try:
-        for item in directory.iterdir():
-            try:
-                # Omitir enlaces simbólicos para evitar loops
-                if item.is_symlink():
-                    continue
-                
-                if item.is_file() and is_log_file(item):
-                    try:
-                        stat = item.stat()
-                        log_files.append({
-                            'path': item,
-                            'name': item.name,
-                            'size': stat.st_size,
-                            'modified': stat.st_mtime,
-                            'readable': os.access(item, os.R_OK)
-                        })
-                    except (PermissionError, OSError):
-                        # Agregar el archivo aunque no tengamos todos los detalles
-                        log_files.append({
-                            'path': item,
-                            'name': item.name,
-                            'size': 0,
-                            'modified': 0,
-                            'readable': False
-                        })
-                
-                elif item.is_dir():
-                    # Recursión en subdirectorios
-                    log_files.extend(scan_log_files(item, max_depth, current_depth + 1))
-                    
-            except (PermissionError, OSError):
-                # Ignorar directorios/archivos sin permisos
-                continue
-                
-    except (PermissionError, OSError):
-        pass
+    pending = [(os.fspath(directory), current_depth)]
+    while pending:
+        path, depth = pending.pop()
+        files, subdirs = cache.scan_directory(path)
+        log_files.extend(files)
+        if depth + 1 < max_depth:
+            pending.extend((os.path.join(path, name), depth + 1) for name in subdirs)
     
     return log_files
 
 
+def group_rotated_logs(log_files: List[Dict]) -> List[Dict]:
+    """
+    Junta cada log con sus rotaciones (syslog, syslog.1, syslog.2.gz) en una
+    sola entrada con la lista de partes en 'parts', de la más antigua a la actual
+    """
+    groups: Dict[tuple, List[tuple]] = {}
+    for info in log_files:
+        base, order = rotation_key(info['name'])
+        groups.setdefault((info['path'].parent, base), []).append((order, info))
+    
+    grouped = []
+    for (_, base), members in groups.items():
+        if len(members) == 1:
+            grouped.append(members[0][1])
+            continue
+        members.sort(key=lambda member: member[0])
+        current = members[-1][1]
+        grouped.append({
+            'path': current['path'],
+            'name': f"{base} (+{len(members) - 1} rotados)",
+            'size': sum(info['size'] for _, info in members),
+            'modified': max(info['modified'] for _, info in members),
+            'readable': all(info['readable'] for _, info in members),
+            'parts': [info['path'] for _, info in members],
+        })
+    return grouped
+
+
+def scan_log_roots(roots: Iterable[Path], max_depth: int = 3,
+                   cache: Optional[LogScanCache] = None) -> List[Dict]:
+    """
+    Escanea varias raíces a la vez (en hilos: el tiempo se va en esperar al
+    disco) y guarda la caché. Un log que aparece bajo dos raíces sale una vez.
+    """
+    if cache is None:
+        cache = LogScanCache()
+    cache.start_scan()
+    roots = [root for root in roots if root.is_dir()]
+    if not roots or max_depth <= 0:
+        return []
+    with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(roots))) as executor:
+        results = list(executor.map(lambda root: scan_log_files(root, max_depth, cache=cache), roots))
+    
+    log_files, seen = [], set()
+    for files in results:
+        for info in files:
+            if info['path'] not in seen:
+                seen.add(info['path'])
+                log_files.append(info)
+    cache.prune(os.fspath(root) for root in roots)
+    cache.save()
+    return log_files
+
+
+TAIL_BLOCK_SIZE = 64 * 1024   # Bytes leídos en cada paso hacia atrás
+
+
+def read_tail_bytes(f, max_lines: int, block_size: int = TAIL_BLOCK_SIZE) -> tuple[List[bytes], bool]:
+    """
+    Últimas `max_lines` líneas de un archivo abierto en binario
+
+    Se lee desde el final en bloques de `block_size` contando saltos de línea
+    sobre los bytes, hasta tener suficientes; así el coste depende de lo que
+    se devuelve y no del tamaño del archivo.
+
+    Returns:
+        (líneas sin el salto final, hay_más_líneas_antes)
+    """
+    end = f.seek(0, os.SEEK_END)
+    if end == 0 or max_lines <= 0:
+        return ([], end > 0)
+    
+    # Un salto de línea al final del archivo no abre una línea nueva: hace
+    # falta un salto más que líneas pedidas para saber dónde empieza la primera
+    f.seek(end - 1)
+    wanted = max_lines + (1 if f.read(1) == b'\n' else 0)
+    position = end
+    blocks = []
+    newlines = 0
+    while position > 0 and newlines <= wanted - 1:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        block = f.read(size)
+        blocks.append(block)
+        newlines += block.count(b'\n')
+    
+    data = b''.join(reversed(blocks))
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+    if position > 0:
+        lines.pop(0)    # Línea empezada antes del primer bloque leído
+    truncated = position > 0 or len(lines) > max_lines
+    return (lines[-max_lines:], truncated)
+
+
 def read_log_file(filepath: Path, max_lines: int = 1000, tail: bool = True) -> tuple[List[str], bool]:
     """
     Lee un archivo de log de forma segura
@@ -158,42 +377,23 @@ def read_log_file(filepath: Path, max_lines: int = 1000, tail: bool = True) -> t
         return (["Error: El archivo no existe"], True)
     
     try:
-        # Intentar detectar la codificación
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        lines = []
-        
-        truncated = False
-        for encoding in encodings:
-            try:
-                with open(filepath, 'r', encoding=encoding, errors='replace') as f:
-                    if tail:
-                        # Leer todas las líneas y tomar las últimas
-                        all_lines = f.readlines()
-                        if len(all_lines) > max_lines:
-                            lines = all_lines[-max_lines:]
-                            truncated = True
-                        else:
-                            lines = all_lines
-                            truncated = False
-                    else:
-                        # Leer solo las primeras líneas
-                        lines = []
-                        for i, line in enumerate(f):
-                            if i >= max_lines:
-                                truncated = True
-                                break
-                            lines.append(line)
-                        else:
-                            truncated = False
-                
-                # Si llegamos aquí, la codificación funcionó
-                break
-                
-            except (UnicodeDecodeError, UnicodeError):
-                continue
+        # Con errors='replace' UTF-8 nunca falla: no hace falta probar otras
+        # codificaciones, y solo se decodifica lo que se devuelve
+        with open(filepath, 'rb') as f:
+            if tail:
+                raw_lines, truncated = read_tail_bytes(f, max_lines)
+            else:
+                # Leer solo las primeras líneas
+                raw_lines = []
+                truncated = False
+                for i, line in enumerate(f):
+                    if i >= max_lines:
+                        truncated = True
+                        break
+                    raw_lines.append(line)
         
         # Limpiar las líneas (remover \n al final)
-        lines = [line.rstrip('\n\r') for line in lines]
+        lines = [line.decode('utf-8', errors='replace').rstrip('\n\r') for line in raw_lines]
         
         return (lines, truncated)
         
@@ -262,3 +462,105 @@ def get_log_summary(filepath: Path) -> Dict:
             'name': filepath.name,
             'error': str(e)
         }
+
+
+def _benchmark_scan(roots: List[Path]):
+    """Escaneo antiguo (Path, un stat por entrada) frente a scandir y la caché"""
+    import tempfile
+
+    def old_scan(directory: Path, depth: int = 0) -> List[Path]:
+        found = []
+        if depth >= 3:
+            return found
+        try:
+            for item in directory.iterdir():
+                try:
+                    if item.is_symlink():
+                        continue
+                    if item.is_file() and is_log_file(item):
+                        item.stat()
+                        os.access(item, os.R_OK)
+                        found.append(item)
+                    elif item.is_dir():
+                        found.extend(old_scan(item, depth + 1))
+                except OSError:
+                    continue
+        except OSError:
+            pass
+        return found
+
+    fd, cache_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    os.unlink(cache_path)
+    try:
+        start = time.perf_counter()
+        old = sum(len(old_scan(root)) for root in roots)
+        print(f"{'iterdir + stat por entrada':<32} {(time.perf_counter() - start) * 1000:8.1f} ms  {old} logs")
+        cache = LogScanCache(cache_path)
+        for label in ("scandir (sin caché)", "scandir (caché en memoria)"):
+            start = time.perf_counter()
+            found = scan_log_roots(roots, max_depth=3, cache=cache)
+            print(f"{label:<32} {(time.perf_counter() - start) * 1000:8.1f} ms  {len(found)} logs, "
+                  f"{cache.listed} directorios leídos, {cache.reused} sin cambios")
+        start = time.perf_counter()
+        found = scan_log_roots(roots, max_depth=3, cache=LogScanCache(cache_path))
+        print(f"{'scandir (caché desde disco)':<32} {(time.perf_counter() - start) * 1000:8.1f} ms  {len(found)} logs")
+    finally:
+        if os.path.exists(cache_path):
+            os.unlink(cache_path)
+
+
+if __name__ == "__main__":
+    # Benchmark: python log_utils.py [GB] [líneas]  (crea un log de prueba temporal)
+    #            python log_utils.py --scan [directorios...]  (por defecto, las rutas de logs del sistema)
+    import sys
+    import tempfile
+    import tracemalloc
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--scan":
+        _benchmark_scan([Path(arg) for arg in sys.argv[2:]] or get_platform_log_paths())
+        sys.exit(0)
+
+    size_gb = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    max_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    # Lectura completa antigua solo hasta este tamaño (necesita todo el archivo en memoria)
+    old_limit = 512 * 1024 * 1024
+
+    line = b"Jan 12 10:00:00 servidor sshd[1234]: Accepted publickey for admin from 10.0.0.5 port 52022\n"
+    chunk = line * (1024 * 1024 // len(line))
+
+    def make_log(size: int) -> str:
+        fd, path = tempfile.mkstemp(suffix=".log")
+        with os.fdopen(fd, "wb") as f:
+            for _ in range(max(1, size // len(chunk))):
+                f.write(chunk)
+        return path
+
+    def measure(label, fn):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<46} {elapsed * 1000:10.1f} ms   pico {peak / 1024 / 1024:8.1f} MB")
+        return result
+
+    def old_tail(path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.readlines()[-max_lines:]
+
+    paths = []
+    try:
+        for size in sorted({min(int(size_gb * 1024 ** 3), old_limit), int(size_gb * 1024 ** 3)}):
+            path = make_log(size)
+            paths.append(path)
+            label = f"{os.path.getsize(path) / 1024 ** 3:.2f} GB"
+            lines, _ = measure(f"{label}: bloques desde el final ({max_lines} líneas)",
+                               lambda: read_log_file(Path(path), max_lines=max_lines))
+            assert len(lines) == max_lines
+            if size <= old_limit:
+                measure(f"{label}: readlines() completo", lambda: old_tail(path))
+    finally:
+        for path in paths:
+            os.unlink(path)
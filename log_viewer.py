@@ -5,18 +5,28 @@ Permite navegar, buscar y visualizar archivos de log de forma multiplataforma
 
 from textual.app import ComposeResult
 from textual.screen import Screen
-from textual.containers import Container, Horizontal, Vertical, VerticalScroll
-from textual.widgets import Header, Footer, Button, Input, Static, Label, DirectoryTree, ListView, ListItem
+from textual.containers import Container, Horizontal, Vertical
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.worker import get_current_worker
+from textual.widgets import Header, Footer, Button, Input, Static, Label, DirectoryTree, ListView, ListItem, Checkbox
 from textual.binding import Binding
 from textual.message import Message
-from rich.text import Text
+from rich.segment import Segment
+from array import array
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
+import time
+import re
 import log_utils
-import subprocess
-import shutil
-import platform
-import os
+from log_follow import FileFollower
+from log_index import LineIndex
+from log_search import LogSearch, MAX_RESULTS as MAX_SEARCH_RESULTS
+from log_sources import LogSource, SourceIndex
 
 
 class LogFileList(ListView):
@@ -51,35 +61,331 @@ class LogFileList(ListView):
             self.append(ListItem(Label(label)))
 
 
-class LogContentViewer(VerticalScroll):
-    """Visor de contenido del log con scroll"""
+class LogContentViewer(ScrollView, can_focus=True):
+    """
+    Visor de logs que solo lee del disco las líneas visibles
+
+    El archivo se indexa en un hilo (log_index.LineIndex) y cada página de
+    PAGE_LINES líneas se lee por su offset cuando hace falta pintarla, así que
+    se puede ir a cualquier parte de un log de varios GB al momento.
+    Los logs comprimidos y los grupos de rotación se leen con un
+    log_sources.SourceIndex, que los descomprime a medida que los indexa.
+    """
+    
+    COMPONENT_CLASSES = {"log-content-viewer--number"}
+    
+    DEFAULT_CSS = """
+    LogContentViewer > .log-content-viewer--number {
+        color: $text-muted;
+    }
+    """
+    
+    PAGE_LINES = 256        # Líneas por página leída
+    MAX_PAGES = 64          # Páginas guardadas en memoria
+    MAX_INDEXES = 16        # Índices recordados (para ampliarlos al volver a abrir)
+    FOLLOW_CONTEXT = 200    # Líneas anteriores mostradas al empezar a seguir
+    MAX_FOLLOW_LINES = 10000    # Líneas que guarda el modo seguimiento
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.current_lines = []
         self.current_file = None
-    
-    def show_log(self, filepath: Path):
-        """Muestra el contenido de un log"""
+        self.source = None          # LogSource del log abierto (sus partes)
+        self.index = None
+        self.line_count = 0
+        self.messages = []          # Líneas fijas a mostrar en lugar del archivo
+        self.numbers = None         # Número de línea de cada una (resultados de búsqueda)
+        self._file = None
+        self._source_index = None   # SourceIndex de un log comprimido o rotado
+        self._pages = OrderedDict()
+        self._text_width = 0
+        self._indexes = OrderedDict()   # ruta -> LineIndex
+        self._moved = False
+        self.following = False
+        self.generation = 0         # Cambia con cada show_results (búsqueda o seguimiento)
+    
+    def show_log(self, filepath: Path, parts: Optional[list] = None):
+        """Muestra el contenido de un log (o de todas sus partes si está rotado)"""
+        self._close()
         self.current_file = filepath
+        self.source = LogSource(parts or [filepath])
+        self.index = None
+        self.line_count = 0
+        self.messages = []
+        self.numbers = None
+        self._moved = False
+        self.border_title = f"{self._title()} · indexando..."
+        self._update_size()
+        self.scroll_home(animate=False)
+        if not self.source.is_plain:
+            self._source_index = SourceIndex(self.source)
+            self.run_worker(partial(self._index_source, filepath, self._source_index),
+                            thread=True, exclusive=True, group="log-index")
+            return
+        try:
+            self._file = open(filepath, 'rb')
+        except PermissionError:
+            self.show_lines(["Error: Sin permisos para leer el archivo"])
+            return
+        except OSError as e:
+            self.show_lines([f"Error al leer el archivo: {str(e)}"])
+            return
+        self.run_worker(partial(self._index_file, filepath), thread=True, exclusive=True, group="log-index")
+    
+    def _title(self) -> str:
+        if self.source is not None and len(self.source.parts) > 1:
+            return f"{self.current_file.name} (+{len(self.source.parts) - 1} rotados)"
+        return self.current_file.name
+    
+    def show_lines(self, lines: list):
+        """Muestra unas líneas fijas (mensajes de error, por ejemplo)"""
+        self._close()
+        self.index = None
+        self.messages = list(lines)
+        self.numbers = None
+        self.line_count = len(self.messages)
+        self.border_title = self.current_file.name if self.current_file else ""
+        self._update_size()
+        self.scroll_home(animate=False)
+    
+    def show_results(self, title: str) -> int:
+        """
+        Pasa a mostrar resultados de búsqueda (llegan con add_results)
+
+        Devuelve la generación que el hilo de trabajo pasa con cada lote: los
+        lotes de una búsqueda anterior que lleguen después se descartan.
+        """
+        self._close()
+        self.generation += 1
+        self.index = None
+        self.messages = []
+        self.numbers = array('Q')
+        self.line_count = 0
+        self.border_title = title
+        self._update_size()
+        self.scroll_home(animate=False)
+        return self.generation
+    
+    def add_results(self, matches: list, generation: int):
+        """Añade coincidencias (número de línea, texto) al final"""
+        if self.numbers is None or generation != self.generation:
+            return
+        for number, text in matches:
+            text = text.expandtabs()
+            self.numbers.append(number)
+            self.messages.append(text)
+            if len(text) > self._text_width:
+                self._text_width = len(text)
+        self.line_count = len(self.messages)
+        self._update_size()
+        self.refresh()
+    
+    def follow(self) -> bool:
+        """Sigue el archivo actual en vivo (como tail -f); False si no se puede"""
+        filepath = self.current_file
+        if filepath is None or not LogSource([filepath]).is_plain:
+            return False    # Un comprimido ya no cambia
+        index = self.index
+        generation = self.show_results(f"{filepath.name} · siguiendo (tail -f)")
+        self.following = True
+        self.run_worker(partial(self._follow_file, filepath, index, generation),
+                        thread=True, exclusive=True, group="log-follow")
+        return True
+    
+    def append_lines(self, lines: list, generation: int):
+        """Añade líneas del modo seguimiento, descartando las más antiguas"""
+        if not self.following or generation != self.generation:
+            return
+        at_end = self.scroll_y >= self.max_scroll_y
+        self.add_results(lines, generation)
+        excess = len(self.messages) - self.MAX_FOLLOW_LINES
+        if excess > 0:
+            # Se descarta de una vez algo más de lo necesario para no copiar en cada línea
+            excess += self.MAX_FOLLOW_LINES // 10
+            del self.messages[:excess]
+            self.numbers = self.numbers[excess:]
+            self.line_count = len(self.messages)
+            self._update_size()
+            if not at_end:
+                self.scroll_to(y=max(0, self.scroll_y - excess), animate=False)
+        if at_end:
+            self.scroll_end(animate=False)
+    
+    def _close(self):
+        self.workers.cancel_group(self, "log-index")
+        self.workers.cancel_group(self, "log-follow")
+        self.following = False
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._source_index is not None:
+            self._source_index.close()
+            self._source_index = None
+        self._pages.clear()
+        self._text_width = 0
+    
+    def on_unmount(self) -> None:
+        self._close()
+    
+    # --- Indexado (hilo de trabajo) ---
+    
+    def _index_file(self, filepath: Path):
+        worker = get_current_worker()
+        key = str(filepath)
+        index = self._indexes.pop(key, None) or LineIndex.load(filepath)
+        last_report = 0.0
         
-        # Limpiar el contenido anterior primero
-        self.remove_children()
-        
-        # Leer el archivo
-        lines, truncated = log_utils.read_log_file(filepath, max_lines=2000, tail=True)
-        self.current_lines = lines
+        def progress(index):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 0.2:
+                last_report = now
+                self.app.call_from_thread(self._indexed, filepath, index, False)
         
-        # Crear texto simple
-        content = f"Archivo: {filepath.name}\nRuta: {filepath.parent}\nLíneas: {len(lines)}\n\n"
-        for i, line in enumerate(lines, 1):
-            content += f"{i:3d}: {line}\n"
+        try:
+            finished = index.update(progress=progress, should_stop=lambda: worker.is_cancelled)
+        except OSError as e:
+            self.app.call_from_thread(self.notify, f"Error al indexar {filepath.name}: {e}", severity="error")
+            return
+        if not finished:
+            return
+        try:
+            index.save()
+        except OSError:
+            pass    # Sin caché en disco: la próxima vez se vuelve a indexar
+        self._indexes[key] = index
+        while len(self._indexes) > self.MAX_INDEXES:
+            self._indexes.popitem(last=False)
+        self.app.call_from_thread(self._indexed, filepath, index, True)
+    
+    def _index_source(self, filepath: Path, index: SourceIndex):
+        worker = get_current_worker()
+        last_report = 0.0
         
-        if truncated:
-            content = f"... (Primeras líneas truncadas)\n{content}"
+        def progress(index):
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= 0.2:
+                last_report = now
+                self.app.call_from_thread(self._indexed, filepath, index, False)
         
-        # Montar
-        self.mount(Static(content))
+        try:
+            finished = index.update(progress=progress, should_stop=lambda: worker.is_cancelled)
+        except (OSError, ValueError) as e:
+            # ValueError: el visor ha cerrado los archivos mientras se indexaba
+            if not worker.is_cancelled:
+                self.app.call_from_thread(self.notify, f"Error al leer {filepath.name}: {e}", severity="error")
+            return
+        if not finished:
+            return
+        for error in index.source.errors:
+            self.app.call_from_thread(self.notify, f"Archivo dañado, se muestra hasta el error: {error}",
+                                      severity="warning")
+        self.app.call_from_thread(self._indexed, filepath, index, True)
+    
+    def _indexed(self, filepath: Path, index, done: bool):
+        """Hay más líneas indexadas: se amplía la zona desplazable"""
+        if filepath != self.current_file or (self._file is None and index is not self._source_index):
+            return
+        # La última página pudo leerse cuando el archivo tenía menos líneas
+        if self.line_count:
+            self._pages.pop((self.line_count - 1) // self.PAGE_LINES, None)
+        self.index = index
+        self.line_count = index.line_count
+        self._update_size()
+        if done:
+            self.border_title = f"{self._title()} · {self.line_count:,} líneas"
+            # Como antes, se abre por el final salvo que ya se haya movido
+            if not self._moved:
+                self.scroll_end(animate=False)
+        else:
+            self.border_title = f"{self._title()} · indexando... {self.line_count:,} líneas"
+        self.refresh()
+    
+    # --- Seguimiento (hilo de trabajo) ---
+    
+    def _follow_file(self, filepath: Path, index, generation: int):
+        worker = get_current_worker()
+        if index is None or index.path != str(filepath):
+            index = self._indexes.get(str(filepath)) or LineIndex.load(filepath)
+        try:
+            # El índice (ya hecho al abrir el archivo) da el número de línea y
+            # el offset desde el que seguir
+            if not index.update(should_stop=lambda: worker.is_cancelled):
+                return
+            end = index.newlines
+            first = max(0, end - self.FOLLOW_CONTEXT)
+            with open(filepath, 'rb') as f:
+                context = index.read_lines(f, first, end - first)
+                offset = index.line_offset(f, end)
+            follower = FileFollower(filepath, offset=offset, line=end)
+        except OSError as e:
+            self.app.call_from_thread(self.notify, f"No se puede seguir {filepath.name}: {e}", severity="error")
+            return
+        lines = [(first + i + 1, raw.decode('utf-8', errors='replace').rstrip('\r')) for i, raw in enumerate(context)]
+        self.app.call_from_thread(self.append_lines, lines, generation)
+        try:
+            while not worker.is_cancelled:
+                follower.wait(1.0)
+                lines = follower.read()
+                if lines and not worker.is_cancelled:
+                    self.app.call_from_thread(self.append_lines, lines, generation)
+        except OSError as e:
+            self.app.call_from_thread(self.notify, f"Seguimiento de {filepath.name} detenido: {e}", severity="error")
+        finally:
+            follower.close()
+    
+    # --- Pintado ---
+    
+    def _number_width(self) -> int:
+        largest = self.numbers[-1] if self.numbers else self.line_count
+        return len(str(max(largest, 1)))
+    
+    def _update_size(self):
+        width = self._number_width() + 2 + self._text_width
+        self.virtual_size = Size(width, self.line_count)
+    
+    def _line(self, number: int) -> str:
+        if self.index is None:
+            return self.messages[number] if number < len(self.messages) else ""
+        page_number = number // self.PAGE_LINES
+        page = self._pages.get(page_number)
+        if page is None:
+            if self._source_index is not None:
+                raw = self.index.read_lines(page_number * self.PAGE_LINES, self.PAGE_LINES)
+            else:
+                raw = self.index.read_lines(self._file, page_number * self.PAGE_LINES, self.PAGE_LINES)
+            page = [line.decode('utf-8', errors='replace').rstrip('\r').expandtabs() for line in raw]
+            self._pages[page_number] = page
+            if len(self._pages) > self.MAX_PAGES:
+                self._pages.popitem(last=False)
+            widest = max(map(len, page), default=0)
+            if widest > self._text_width:
+                self._text_width = widest
+                self.call_after_refresh(self._update_size)
+        else:
+            self._pages.move_to_end(page_number)
+        position = number - page_number * self.PAGE_LINES
+        return page[position] if position < len(page) else ""
+    
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        base = self.rich_style
+        number = scroll_y + y
+        if number >= self.line_count:
+            return Strip.blank(width, base)
+        digits = self._number_width()
+        style = base + self.get_component_rich_style("log-content-viewer--number")
+        label = self.numbers[number] if self.numbers is not None else number + 1
+        # Las marcas de rotación o truncado (número 0) van sin número
+        prefix = f"{label:>{digits}}: " if label else " " * (digits + 2)
+        segments = [Segment(prefix, style), Segment(self._line(number), base)]
+        return Strip(segments).crop(scroll_x, scroll_x + width).extend_cell_length(width, base)
+    
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        if self.index is not None and int(new_value) != int(self.max_scroll_y):
+            self._moved = True
 
 
 class LogViewerScreen(Screen):
@@ -89,6 +395,7 @@ class LogViewerScreen(Screen):
         Binding("q", "quit", "Salir", priority=True),
         Binding("r", "refresh", "Actualizar"),
         Binding("c", "clear_search", "Limpiar búsqueda"),
+        Binding("f", "follow", "Seguir (tail -f)"),
         ("escape", "volver", "Volver"),
     ]
     
@@ -120,6 +427,10 @@ class LogViewerScreen(Screen):
         margin-bottom: 1;
     }
     
+    #search-container Horizontal {
+        height: auto;
+    }
+    
     #directory-selector {
         height: auto;
         margin-bottom: 1;
@@ -136,11 +447,6 @@ class LogViewerScreen(Screen):
         background: $surface;
         overflow-y: scroll;
     }
-
-    LogContentViewer Static {
-        width: 100%;
-        color: $text;
-    }
     
     Input {
         margin-bottom: 1;
@@ -164,7 +470,9 @@ class LogViewerScreen(Screen):
         self.current_directory = None
         self.log_files = []
         self.selected_file = None
+        self.selected_parts = None  # Partes del log si está rotado
         self.loading = False
+        self.scan_cache = log_utils.LogScanCache()
     
     def compose(self) -> ComposeResult:
         """Componer la interfaz"""
@@ -190,6 +498,9 @@ class LogViewerScreen(Screen):
                     with Horizontal():
                         yield Button("Buscar", id="btn-search", variant="primary")
                         yield Button("Limpiar", id="btn-clear", variant="warning")
+                        yield Checkbox("Regex", id="opt-regex")
+                        yield Checkbox("Mayúsculas", id="opt-case")
+                        yield Checkbox("Palabra completa", id="opt-word")
                 
                 yield Label("📄 Contenido del log:", id="content-label")
                 yield LogContentViewer(id="log-content")
@@ -215,26 +526,9 @@ class LogViewerScreen(Screen):
     def scan_common_paths(self):
         """Escanear rutas comunes del sistema"""
         self.update_status("Escaneando rutas de logs del sistema...")
-        
         log_paths = log_utils.get_platform_log_paths()
-        all_logs = []
-        
-        for path in log_paths:
-            logs = log_utils.scan_log_files(path, max_depth=3)
-            all_logs.extend(logs)
-        
-        # Ordenar por fecha de modificación (más recientes primero)
-        all_logs.sort(key=lambda x: x['modified'], reverse=True)
-        
-        self.log_files = all_logs
-        file_list = self.query_one("#file-list", LogFileList)
-        file_list.update_files(all_logs)
-        
-        if all_logs:
-            file_list.focus()
-            self.set_focus(file_list)
-        
-        self.update_status(f"✅ {len(all_logs)} archivos encontrados | Use ↑↓ para navegar y ENTER para abrir")
+        self.run_worker(partial(self._scan_paths, log_paths, 3, ""),
+                        thread=True, exclusive=True, group="log-scan")
     
     def select_custom_directory(self):
         """Permitir seleccionar un directorio personalizado"""
@@ -242,10 +536,24 @@ class LogViewerScreen(Screen):
         # En una implementación completa, se podría usar un selector de directorios
         current_dir = Path.cwd()
         self.update_status(f"Escaneando {current_dir}...")
-        
-        logs = log_utils.scan_log_files(current_dir, max_depth=2)
+        self.run_worker(partial(self._scan_paths, [current_dir], 2, f" en {current_dir.name}"),
+                        thread=True, exclusive=True, group="log-scan")
+    
+    def _scan_paths(self, paths: list, max_depth: int, where: str):
+        """Escanea en un hilo (los directorios sin cambios salen de la caché)"""
+        start = time.monotonic()
+        logs = log_utils.scan_log_roots(paths, max_depth=max_depth, cache=self.scan_cache)
+        logs = log_utils.group_rotated_logs(logs)
+        # Ordenar por fecha de modificación (más recientes primero)
         logs.sort(key=lambda x: x['modified'], reverse=True)
-        
+        elapsed = time.monotonic() - start
+        cache = self.scan_cache
+        self.app.call_from_thread(
+            self._show_files, logs,
+            f"✅ {len(logs)} archivos encontrados{where} en {elapsed:.1f} s "
+            f"({cache.listed} directorios leídos, {cache.reused} sin cambios) | Use ↑↓ y ENTER para abrir")
+    
+    def _show_files(self, logs: list, message: str):
         self.log_files = logs
         file_list = self.query_one("#file-list", LogFileList)
         file_list.update_files(logs)
@@ -253,9 +561,8 @@ class LogViewerScreen(Screen):
         if logs:
             file_list.focus()
             self.set_focus(file_list)
-            self.update_status(f"✅ {len(logs)} archivos encontrados en {current_dir.name} | Use ↑↓ y ENTER para abrir")
-        else:
-            self.update_status(f"✅ {len(logs)} archivos encontrados en {current_dir.name} | Use ↑↓ y ENTER para abrir")
+        
+        self.update_status(message)
     
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         """Cuando se selecciona un archivo de la lista con click o Enter"""
@@ -287,6 +594,11 @@ class LogViewerScreen(Screen):
             except:
                 pass
 
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """ENTER en el cuadro de búsqueda busca"""
+        if event.input.id == "search-input":
+            self.perform_search()
+    
     def perform_search(self):
         """Realizar búsqueda en el log actual"""
         search_input = self.query_one("#search-input", Input)
@@ -300,17 +612,67 @@ class LogViewerScreen(Screen):
             self.update_status("Seleccione primero un archivo de log")
             return
         
-        # Por ahora, solo mostrar mensaje
-        self.update_status(f"Búsqueda: '{query}' (funcionalidad pendiente)")
+        try:
+            search = LogSearch(
+                query,
+                regex=self.query_one("#opt-regex", Checkbox).value,
+                case_sensitive=self.query_one("#opt-case", Checkbox).value,
+                whole_word=self.query_one("#opt-word", Checkbox).value,
+            )
+        except re.error as e:
+            self.update_status(f"❌ Expresión regular no válida: {e}")
+            return
+        
+        content_viewer = self.query_one("#log-content", LogContentViewer)
+        generation = content_viewer.show_results(f"{self.selected_file.name} · '{query}'")
+        self.update_status(f"🔍 Buscando '{query}'...")
+        source = LogSource(self.selected_parts or [self.selected_file])
+        self.run_worker(partial(self._search_file, search, source, generation),
+                        thread=True, exclusive=True, group="log-search")
+    
+    def _search_file(self, search: LogSearch, source: LogSource, generation: int):
+        """Busca en un hilo y va pasando las coincidencias al visor por lotes"""
+        worker = get_current_worker()
+        content_viewer = self.query_one("#log-content", LogContentViewer)
+        start = time.monotonic()
+        found = 0
+        try:
+            stop = lambda: worker.is_cancelled
+            for batch in search.search_chunks(source.chunks(should_stop=stop), should_stop=stop):
+                found += len(batch)
+                self.app.call_from_thread(content_viewer.add_results, batch, generation)
+                self.app.call_from_thread(self._search_status, generation,
+                                          f"🔍 Buscando '{search.query}'... {found:,} coincidencias")
+        except PermissionError:
+            self.app.call_from_thread(self._search_status, generation, "⚠️  Sin permisos para leer el archivo")
+            return
+        except OSError as e:
+            self.app.call_from_thread(self._search_status, generation, f"❌ Error al buscar: {e}")
+            return
+        if worker.is_cancelled:
+            return
+        elapsed = time.monotonic() - start
+        limit = " (límite alcanzado)" if found >= MAX_SEARCH_RESULTS else ""
+        if source.errors:
+            limit += f" ⚠️  dañado: {'; '.join(source.errors)}"
+        self.app.call_from_thread(
+            self._search_status, generation,
+            f"✅ {found:,} coincidencias de '{search.query}' en {elapsed:.1f} s{limit} | 'c' para volver al log")
+
+    def _search_status(self, generation: int, message: str):
+        # Solo si el visor sigue mostrando esta búsqueda (no otra ni el seguimiento)
+        if generation == self.query_one("#log-content", LogContentViewer).generation:
+            self.update_status(message)
     
     def clear_search(self):
         """Limpiar la búsqueda y mostrar todo el log"""
         search_input = self.query_one("#search-input", Input)
         search_input.value = ""
+        self.workers.cancel_group(self, "log-search")
         
         if self.selected_file:
             content_viewer = self.query_one("#log-content", LogContentViewer)
-            content_viewer.show_log(self.selected_file)
+            content_viewer.show_log(self.selected_file, self.selected_parts)
             self.update_status("Búsqueda limpiada")
         else:
             self.update_status("No hay archivo seleccionado")
@@ -347,34 +709,35 @@ class LogViewerScreen(Screen):
         if file_list.index is not None and 0 <= file_list.index < len(self.log_files):
             selected = self.log_files[file_list.index]
             self.selected_file = selected['path']
+            self.selected_parts = selected.get('parts')
             
             # Verificar permisos
             if not selected['readable']:
                 self.update_status(f"⚠️  Sin permisos para leer: {selected['name']}")
                 return
             
-            self.update_status(f"🚀 Abriendo {selected['name']} en terminal externa...")
-            self.open_in_external_terminal(selected['path'])
+            content_viewer = self.query_one("#log-content", LogContentViewer)
+            content_viewer.show_log(selected['path'], self.selected_parts)
+            content_viewer.focus()
+            self.update_status(f"📄 {selected['name']} | ↑↓ RePág AvPág Inicio Fin para moverse | 'f' para seguirlo en vivo")
         else:
             self.update_status(f"[DEBUG] Índice inválido: {file_list.index}, len: {len(self.log_files)}")
 
-    def open_in_external_terminal(self, filepath: Path):
-        """Abre el archivo usando el visor del sistema en la misma terminal"""
-        try:
-            with self.app.suspend():
-                system = platform.system().lower()
-                if system == "windows":
-                    # En Windows usamos 'more'
-                    os.system(f"more \"{filepath}\"")
-                else:
-                    # En Linux/Mac usamos 'less' si está disponible
-                    viewer = "less" if shutil.which("less") else "more"
-                    subprocess.run([viewer, str(filepath)])
-            
-            self.update_status(f"✅ Visualización finalizada")
-            
-        except Exception as e:
-            self.update_status(f"❌ Error al abrir visor: {str(e)}")
+    def action_follow(self):
+        """Seguir en vivo el archivo abierto (o dejar de seguirlo)"""
+        content_viewer = self.query_one("#log-content", LogContentViewer)
+        if content_viewer.following:
+            content_viewer.show_log(self.selected_file, self.selected_parts)
+            self.update_status("⏹️  Seguimiento detenido")
+        elif self.selected_file and content_viewer.current_file == self.selected_file:
+            self.workers.cancel_group(self, "log-search")
+            if not content_viewer.follow():
+                self.update_status("Los archivos comprimidos no cambian: no hay nada que seguir")
+                return
+            content_viewer.focus()
+            self.update_status(f"👀 Siguiendo {self.selected_file.name} | 'f' para dejar de seguir")
+        else:
+            self.update_status("Abra primero un archivo de log")
     
     def update_status(self, message: str):
         """Actualizar la barra de estado"""
@@ -0,0 +1,373 @@
+"""
+Exportador de métricas sin interfaz para los monitores de red
+
+Para servidores en los que nadie mira la TUI: las mismas lecturas que hacen
+network_monitor, interface_monitor, bandwidth_analyzer y netstat_monitor se
+publican como métricas de Prometheus / OpenMetrics, en un puerto HTTP local o
+en un archivo para el textfile collector de node_exporter.
+
+El texto se genera una sola vez por tick del muestreador compartido y se
+guarda ya codificado: cada scrape solo copia bytes. En este modo no se importa
+Textual (ni ninguno de los módulos de las apps).
+
+Uso:
+    python metrics_exporter.py --port 9464
+    python metrics_exporter.py --textfile /var/lib/node_exporter/textfile/cosicas.prom
+    python metrics_exporter.py --port 9464 --monitors network,netstat --interval 5
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import psutil
+
+from conn_churn import ChurnTracker, program_of
+from conn_snapshot import ConnectionSnapshot
+from net_sampler import TelemetrySampler, TelemetrySnapshot, get_sampler
+from sock_diag import ConnectionLister, ProcessTraffic
+
+
+PREFIX = "cosicas"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TOP_CHURNERS = 5    # Remotos y procesos que más conexiones abren
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class MetricFamily:
+    """Una métrica (nombre, tipo, ayuda) con sus muestras"""
+
+    __slots__ = ('name', 'kind', 'help', 'samples')
+
+    def __init__(self, name: str, kind: str, help: str):
+        self.name = f"{PREFIX}_{name}"
+        self.kind = kind            # "gauge" o "counter"
+        self.help = help
+        self.samples: List[Tuple[str, str]] = []
+
+    def add(self, value, **labels):
+        if labels:
+            text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+            self.samples.append((f"{{{text}}}", _number(value)))
+        else:
+            self.samples.append(("", _number(value)))
+
+    def render(self, lines: List[str], openmetrics: bool):
+        """
+        Añade las líneas de la métrica. En OpenMetrics el nombre de un contador
+        no lleva _total (solo sus muestras); en el formato de Prometheus sí.
+        """
+        sample = self.name + "_total" if self.kind == "counter" else self.name
+        family = self.name if openmetrics else sample
+        lines.append(f"# HELP {family} {self.help}")
+        lines.append(f"# TYPE {family} {self.kind}")
+        for labels, value in self.samples:
+            lines.append(f"{sample}{labels} {value}")
+
+
+# --- Colectores (uno por monitor) ---
+
+class NetworkCollector:
+    """Contadores y velocidades por interfaz (network_monitor)"""
+
+    name = "network"
+
+    COUNTERS = (
+        ("transmit_bytes", "bytes_sent", "Bytes enviados"),
+        ("receive_bytes", "bytes_recv", "Bytes recibidos"),
+        ("transmit_packets", "packets_sent", "Paquetes enviados"),
+        ("receive_packets", "packets_recv", "Paquetes recibidos"),
+        ("receive_errors", "errin", "Errores de recepción"),
+        ("transmit_errors", "errout", "Errores de envío"),
+        ("receive_drops", "dropin", "Paquetes descartados al recibir"),
+        ("transmit_drops", "dropout", "Paquetes descartados al enviar"),
+    )
+    RATES = (
+        ("transmit_bytes_per_second", "bytes_sent", "Velocidad de subida (último tick)"),
+        ("receive_bytes_per_second", "bytes_recv", "Velocidad de bajada (último tick)"),
+    )
+
+    def collect(self, snapshot: TelemetrySnapshot) -> List[MetricFamily]:
+        families = []
+        for metric, field, help in self.COUNTERS:
+            family = MetricFamily(f"network_{metric}", "counter", help)
+            for interface, counters in snapshot.counters.items():
+                family.add(getattr(counters, field), interface=interface)
+            families.append(family)
+        for metric, field, help in self.RATES:
+            family = MetricFamily(f"network_{metric}", "gauge", help)
+            for interface, rates in snapshot.rates.items():
+                family.add(getattr(rates, field), interface=interface)
+            families.append(family)
+        return families
+
+
+class InterfaceCollector:
+    """Estado, MTU y velocidad de enlace de cada interfaz (interface_monitor)"""
+
+    name = "interfaces"
+
+    def collect(self, snapshot: TelemetrySnapshot) -> List[MetricFamily]:
+        up = MetricFamily("interface_up", "gauge", "1 si la interfaz está activa")
+        mtu = MetricFamily("interface_mtu_bytes", "gauge", "MTU de la interfaz")
+        speed = MetricFamily("interface_speed_bits_per_second", "gauge", "Velocidad del enlace (si se conoce)")
+        addresses = MetricFamily("interface_addresses", "gauge", "Direcciones asignadas por familia")
+        families_by_name = {socket.AF_INET: "ipv4", socket.AF_INET6: "ipv6"}
+        for interface, stats in psutil.net_if_stats().items():
+            up.add(int(stats.isup), interface=interface)
+            mtu.add(stats.mtu, interface=interface)
+            if stats.speed:
+                speed.add(stats.speed * 1000000, interface=interface)
+        for interface, addrs in psutil.net_if_addrs().items():
+            counts: Dict[str, int] = {}
+            for addr in addrs:
+                family = families_by_name.get(addr.family)
+                if family:
+                    counts[family] = counts.get(family, 0) + 1
+            for family, count in counts.items():
+                addresses.add(count, interface=interface, family=family)
+        return [up, mtu, speed, addresses]
+
+
+class BandwidthCollector:
+    """Tráfico y conexiones por programa (bandwidth_analyzer)"""
+
+    name = "bandwidth"
+
+    def __init__(self):
+        self.traffic = ProcessTraffic()
+        # Bytes acumulados por programa desde el arranque: nombre -> [enviados, recibidos]
+        self.totals: Dict[str, List[int]] = {}
+
+    def collect(self, snapshot: TelemetrySnapshot) -> List[MetricFamily]:
+        connections: Dict[str, int] = {}
+        for proc in self.traffic.sample():
+            name = proc['name']
+            connections[name] = connections.get(name, 0) + proc['connections']
+            totals = self.totals.setdefault(name, [0, 0])
+            totals[0] += proc['bytes_sent']
+            totals[1] += proc['bytes_recv']
+
+        families = []
+        open_sockets = MetricFamily("process_sockets", "gauge", "Sockets abiertos por programa")
+        for name, count in connections.items():
+            open_sockets.add(count, program=name)
+        families.append(open_sockets)
+        if self.traffic.has_bytes:
+            sent = MetricFamily("process_transmit_bytes", "counter", "Bytes TCP enviados por programa")
+            received = MetricFamily("process_receive_bytes", "counter", "Bytes TCP recibidos por programa")
+            for name, (sent_bytes, received_bytes) in self.totals.items():
+                sent.add(sent_bytes, program=name)
+                received.add(received_bytes, program=name)
+            families += (sent, received)
+        return families
+
+
+class NetstatCollector:
+    """Conexiones por protocolo y estado, y su rotación (netstat_monitor)"""
+
+    name = "netstat"
+
+    def __init__(self):
+        self.lister = None
+        if sys.platform.startswith("linux"):
+            self.lister = ConnectionLister()
+        self.churn = ChurnTracker()
+        self.opened = 0
+        self.closed = 0
+
+    def _snapshot(self) -> ConnectionSnapshot:
+        if self.lister is not None:
+            table = self.lister.sample()
+            return ConnectionSnapshot(self.lister.rows(table), (table.sport, table.dport), table.key)
+        rows = []
+        for conn in psutil.net_connections(kind='inet'):
+            proto = "tcp" if conn.type == socket.SOCK_STREAM else "udp"
+            local = f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "*:*"
+            remote = f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "*:*"
+            rows.append((proto, local, remote, conn.status or "UNCONN", str(conn.pid or "")))
+        return ConnectionSnapshot(rows)
+
+    def collect(self, snapshot: TelemetrySnapshot) -> List[MetricFamily]:
+        connections = self._snapshot()
+        self.churn.update(connections)
+        churn = self.churn
+        if churn.intervals:
+            self.opened += churn.opened
+            self.closed += churn.closed
+
+        counts: Dict[Tuple[str, str], int] = {}
+        for key in zip(connections.proto, connections.state):
+            counts[key] = counts.get(key, 0) + 1
+        by_state = MetricFamily("connections", "gauge", "Sockets por protocolo y estado")
+        for (proto, state), count in sorted(counts.items()):
+            by_state.add(count, proto=proto, state=state)
+
+        opened = MetricFamily("connections_opened", "counter", "Conexiones nuevas vistas entre muestras")
+        opened.add(self.opened)
+        closed = MetricFamily("connections_closed", "counter", "Conexiones desaparecidas entre muestras")
+        closed.add(self.closed)
+        time_wait = MetricFamily("connections_time_wait_growth_per_second", "gauge",
+                                 "Crecimiento medio de TIME_WAIT")
+        time_wait.add(churn.time_wait_rate)
+        spike = MetricFamily("connections_syn_recv_spike", "gauge", "1 si hay un pico de SYN_RECV")
+        spike.add(int(churn.syn_spike))
+        remotes = MetricFamily("churn_remote_opens_per_second", "gauge",
+                               f"Los {TOP_CHURNERS} remotos que más conexiones abren")
+        for host, rate in churn.by_remote.top(TOP_CHURNERS):
+            remotes.add(rate, remote=host)
+        processes = MetricFamily("churn_program_opens_per_second", "gauge",
+                                 f"Los {TOP_CHURNERS} programas que más conexiones abren")
+        for name, rate in churn.by_process.top(TOP_CHURNERS):
+            processes.add(rate, program=program_of(name))
+        return [by_state, opened, closed, time_wait, spike, remotes, processes]
+
+
+COLLECTORS = {
+    "network": NetworkCollector,
+    "interfaces": InterfaceCollector,
+    "bandwidth": BandwidthCollector,
+    "netstat": NetstatCollector,
+}
+
+
+class MetricsExporter:
+    """
+    Genera el texto de todas las métricas en cada muestra del muestreador
+
+    `payloads` es la tupla (Prometheus, OpenMetrics) ya codificada; se
+    sustituye entera en cada tick, así que quien la lea nunca ve una a medias.
+    """
+
+    def __init__(self, collectors: Sequence, sampler: Optional[TelemetrySampler] = None):
+        self.collectors = list(collectors)
+        self.sampler = sampler or get_sampler()
+        self.payloads: Tuple[bytes, bytes] = (b"", b"# EOF\n")
+        self.errors: Dict[str, int] = {collector.name: 0 for collector in self.collectors}
+        self.listeners: List[Callable[[bytes], None]] = []
+
+    def start(self):
+        self.sampler.subscribe(self.on_snapshot)
+
+    def stop(self):
+        self.sampler.unsubscribe(self.on_snapshot)
+
+    def on_snapshot(self, snapshot: TelemetrySnapshot):
+        """Recibe una muestra en el hilo del muestreador y renderiza"""
+        families = []
+        duration = MetricFamily("exporter_collect_seconds", "gauge", "Duración de cada colector en el último tick")
+        errors = MetricFamily("exporter_collect_errors", "counter", "Fallos de cada colector")
+        for collector in self.collectors:
+            start = time.perf_counter()
+            try:
+                families += collector.collect(snapshot)
+            except Exception as e:
+                self.errors[collector.name] += 1
+                print(f"Error en el colector {collector.name}: {e}", file=sys.stderr)
+            duration.add(time.perf_counter() - start, collector=collector.name)
+            errors.add(self.errors[collector.name], collector=collector.name)
+        families += (duration, errors)
+
+        payloads = []
+        for openmetrics in (False, True):
+            lines = []
+            for family in families:
+                family.render(lines, openmetrics)
+            if openmetrics:
+                lines.append("# EOF")
+            payloads.append(("\n".join(lines) + "\n").encode())
+        self.payloads = tuple(payloads)
+        for listener in self.listeners:
+            listener(self.payloads[0])
+
+
+class TextfileWriter:
+    """Escribe cada render en un archivo (escritura atómica con rename)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.temp = f"{path}.{os.getpid()}.tmp"
+
+    def __call__(self, payload: bytes):
+        try:
+            with open(self.temp, "wb") as f:
+                f.write(payload)
+            os.replace(self.temp, self.path)
+        except OSError as e:
+            print(f"No se pudo escribir {self.path}: {e}", file=sys.stderr)
+
+
+def make_handler(exporter: MetricsExporter):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            prometheus, openmetrics = exporter.payloads
+            if "application/openmetrics-text" in self.headers.get("Accept", ""):
+                body, content_type = openmetrics, OPENMETRICS_TYPE
+            else:
+                body, content_type = prometheus, PROMETHEUS_TYPE
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass    # Sin una línea por scrape
+
+    return MetricsHandler
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Exporta las métricas de los monitores de red sin interfaz")
+    parser.add_argument("--port", type=int, help="Puerto HTTP en el que servir /metrics")
+    parser.add_argument("--listen", default="127.0.0.1", help="Dirección en la que escuchar (127.0.0.1)")
+    parser.add_argument("--textfile", help="Archivo .prom para el textfile collector de node_exporter")
+    parser.add_argument("--monitors", default=",".join(COLLECTORS),
+                        help=f"Monitores a exportar, separados por comas ({','.join(COLLECTORS)})")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre muestras (1)")
+    args = parser.parse_args(argv)
+
+    if args.port is None and not args.textfile:
+        parser.error("indica --port, --textfile o ambos")
+    names = [name.strip() for name in args.monitors.split(",") if name.strip()]
+    unknown = [name for name in names if name not in COLLECTORS]
+    if unknown:
+        parser.error(f"monitores desconocidos: {', '.join(unknown)}")
+
+    exporter = MetricsExporter([COLLECTORS[name]() for name in names], get_sampler(args.interval))
+    if args.textfile:
+        exporter.listeners.append(TextfileWriter(args.textfile))
+    exporter.start()
+
+    try:
+        if args.port is not None:
+            server = ThreadingHTTPServer((args.listen, args.port), make_handler(exporter))
+            print(f"Métricas en http://{args.listen}:{server.server_address[1]}/metrics")
+            server.serve_forever()
+        else:
+            print(f"Métricas en {args.textfile} cada {args.interval:g} s")
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Histórico de velocidades de red con varias resoluciones
+
+Cada interfaz guarda sus velocidades de subida y bajada en tres anillos de
+tamaño fijo (array de float32):
+
+- 1 segundo durante una hora   (3600 valores)
+- 1 minuto durante un día      (1440 valores)
+- 1 hora durante un mes         (720 valores)
+
+Cada muestra se suma a la cubeta actual de los tres anillos y se guarda la
+media, así que el coste por muestra es constante y la memoria no crece.
+El archivo en disco es el volcado binario de los anillos: cargar un mes de
+histórico es leer el archivo y copiar los arrays. Las series sin muestras
+durante más tiempo del que cubre el anillo más largo (interfaces que ya no
+existen, como veth o tun efímeras) se descartan al guardar y al cargar.
+"""
+
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+
+TIERS = ((1, 3600), (60, 1440), (3600, 720))   # (segundos por valor, valores)
+TOTAL = "(total)"                              # Serie con la suma de interfaces
+
+# Vistas del gráfico: (título, anillo, nº de valores)
+VIEWS = (
+    ("último minuto", 0, 60),
+    ("última hora", 0, 3600),
+    ("últimas 24 h", 1, 1440),
+    ("últimos 30 días", 2, 720),
+)
+
+_MAGIC = b'CNTS'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHI')     # magia, versión, nº anillos, nº series
+_TIER_DEF = struct.Struct('<II')      # resolución, tamaño
+_NAME_LEN = struct.Struct('<H')
+_TIER_STATE = struct.Struct('<qddI')  # cubeta actual, sumas rx/tx, muestras
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+class _Ring:
+    """Anillo de medias por cubeta de una resolución"""
+
+    __slots__ = ('resolution', 'size', 'rx', 'tx', 'bucket', 'sum_rx', 'sum_tx', 'count')
+
+    def __init__(self, resolution: int, size: int):
+        self.resolution = resolution
+        self.size = size
+        self.rx = array('f', bytes(4 * size))
+        self.tx = array('f', bytes(4 * size))
+        self.bucket = -1
+        self.sum_rx = 0.0
+        self.sum_tx = 0.0
+        self.count = 0
+
+    def add(self, ts: float, rx: float, tx: float, elapsed: float = 0.0):
+        """Muestra de velocidad medida durante los `elapsed` segundos anteriores a `ts`"""
+        bucket = int(ts // self.resolution)
+        if bucket != self.bucket:
+            if bucket < self.bucket:
+                return      # El reloj ha ido hacia atrás: se ignora la muestra
+            # Las cubetas saltadas que cubre la muestra (un intervalo que se ha
+            # alargado un poco) llevan su velocidad; las anteriores no tienen datos
+            if self.bucket >= 0:
+                size = self.size
+                covered = int((ts - elapsed) // self.resolution)
+                for skipped in range(max(self.bucket + 1, bucket - size), bucket):
+                    self.rx[skipped % size] = rx if skipped >= covered else 0.0
+                    self.tx[skipped % size] = tx if skipped >= covered else 0.0
+            self.bucket = bucket
+            self.sum_rx = self.sum_tx = 0.0
+            self.count = 0
+        self.sum_rx += rx
+        self.sum_tx += tx
+        self.count += 1
+        # La cubeta en curso guarda siempre la media parcial
+        slot = bucket % self.size
+        self.rx[slot] = self.sum_rx / self.count
+        self.tx[slot] = self.sum_tx / self.count
+
+    def values(self, n: int, now: Optional[float] = None) -> Tuple[List[float], List[float]]:
+        """Últimos `n` valores, del más antiguo al más reciente"""
+        n = min(n, self.size)
+        if self.bucket < 0:
+            return [0.0] * n, [0.0] * n
+        last = self.bucket
+        if now is not None:
+            # Sin muestras recientes las cubetas posteriores cuentan como 0 (la
+            # que acaba de empezar todavía no: su muestra puede llegar tarde)
+            last = max(last, int(now // self.resolution) - 1)
+        rx, tx, size = self.rx, self.tx, self.size
+        out_rx = []
+        out_tx = []
+        for bucket in range(last - n + 1, last + 1):
+            if bucket > self.bucket or bucket <= self.bucket - size:
+                out_rx.append(0.0)
+                out_tx.append(0.0)
+            else:
+                out_rx.append(rx[bucket % size])
+                out_tx.append(tx[bucket % size])
+        return out_rx, out_tx
+
+
+class RateHistory:
+    """Histórico de velocidades por interfaz con persistencia binaria"""
+
+    def __init__(self, tiers=TIERS):
+        self.tiers = tuple(tiers)
+        self.series: Dict[str, List[_Ring]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # Se guarda desde el muestreador y al salir
+
+    def _rings(self, name: str) -> List[_Ring]:
+        rings = self.series.get(name)
+        if rings is None:
+            rings = [_Ring(resolution, size) for resolution, size in self.tiers]
+            self.series[name] = rings
+        return rings
+
+    def add(self, ts: float, name: str, rx: float, tx: float, elapsed: float = 0.0):
+        """Añade una velocidad (bytes/s) de una interfaz medida en los `elapsed` segundos hasta `ts`"""
+        with self._lock:
+            for ring in self._rings(name):
+                ring.add(ts, rx, tx, elapsed)
+
+    def add_snapshot(self, snapshot):
+        """Añade todas las interfaces y el total de una muestra de net_sampler"""
+        if snapshot.elapsed <= 0:
+            return
+        ts, elapsed = snapshot.wall_time, snapshot.elapsed
+        with self._lock:
+            for name, rate in snapshot.rates.items():
+                for ring in self._rings(name):
+                    ring.add(ts, rate.bytes_recv, rate.bytes_sent, elapsed)
+            total = snapshot.total_rates
+            for ring in self._rings(TOTAL):
+                ring.add(ts, total.bytes_recv, total.bytes_sent, elapsed)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Descarta las series sin muestras en todo el anillo más largo; devuelve cuántas"""
+        now = time.time() if now is None else now
+        span = max(resolution * size for resolution, size in self.tiers)
+        with self._lock:
+            stale = [name for name, rings in self.series.items()
+                     if now - max((ring.bucket + 1) * ring.resolution for ring in rings) > span]
+            for name in stale:
+                del self.series[name]
+        return len(stale)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self.series, key=lambda name: (name != TOTAL, name))
+
+    def values(self, name: str, tier: int, n: int, now: Optional[float] = None):
+        """(bajada, subida) de los últimos `n` valores del anillo `tier`"""
+        with self._lock:
+            rings = self.series.get(name)
+            if rings is None:
+                return [], []
+            return rings[tier].values(n, now)
+
+    # --- Persistencia ---
+
+    def save(self, path: str):
+        """Guarda todos los anillos (escritura atómica; un guardado cada vez)"""
+        with self._save_lock:
+            self.expire()
+            self._save(path)
+
+    def _save(self, path: str):
+        with self._lock:
+            parts = [_HEADER.pack(_MAGIC, _VERSION, len(self.tiers), len(self.series))]
+            parts.extend(_TIER_DEF.pack(resolution, size) for resolution, size in self.tiers)
+            for name, rings in self.series.items():
+                encoded = name.encode()
+                parts.append(_NAME_LEN.pack(len(encoded)))
+                parts.append(encoded)
+                for ring in rings:
+                    parts.append(_TIER_STATE.pack(ring.bucket, ring.sum_rx, ring.sum_tx, ring.count))
+                    parts.append(_le_bytes(ring.rx))
+                    parts.append(_le_bytes(ring.tx))
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(b''.join(parts))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RateHistory":
+        """Carga un histórico; si no existe o no es válido devuelve uno vacío"""
+        try:
+            with open(path, 'rb') as f:
+                data = memoryview(f.read())
+            magic, version, ntiers, nseries = _HEADER.unpack_from(data, 0)
+            if magic != _MAGIC or version != _VERSION:
+                return cls()
+            offset = _HEADER.size
+            tiers = []
+            for _ in range(ntiers):
+                tiers.append(_TIER_DEF.unpack_from(data, offset))
+                offset += _TIER_DEF.size
+            history = cls(tiers)
+            for _ in range(nseries):
+                (length,) = _NAME_LEN.unpack_from(data, offset)
+                offset += _NAME_LEN.size
+                name = bytes(data[offset:offset + length]).decode()
+                offset += length
+                rings = []
+                for resolution, size in tiers:
+                    ring = _Ring.__new__(_Ring)
+                    ring.resolution = resolution
+                    ring.size = size
+                    ring.bucket, ring.sum_rx, ring.sum_tx, ring.count = _TIER_STATE.unpack_from(data, offset)
+                    offset += _TIER_STATE.size
+                    ring.rx = _le_array(data[offset:offset + 4 * size])
+                    offset += 4 * size
+                    ring.tx = _le_array(data[offset:offset + 4 * size])
+                    offset += 4 * size
+                    if len(ring.rx) != size or len(ring.tx) != size:
+                        return cls()    # Archivo cortado
+                    rings.append(ring)
+                history.series[name] = rings
+            history.expire()
+            return history
+        except (OSError, struct.error, ValueError, UnicodeDecodeError):
+            return cls()
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == 'little':
+        return values.tobytes()
+    swapped = array(values.typecode, values)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _le_array(data) -> array:
+    values = array('f')
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def sparkline(values: List[float], width: int = 60, peak: Optional[float] = None) -> str:
+    """
+    Gráfico de una línea con bloques Unicode
+
+    Si hay más valores que columnas, cada columna muestra el máximo de su grupo
+    (para que los picos no desaparezcan al reducir).
+    """
+    if not values or width <= 0:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [max(values[int(i * step):max(int((i + 1) * step), int(i * step) + 1)])
+                  for i in range(width)]
+    if peak is None:
+        peak = max(values)
+    if peak <= 0:
+        return SPARK_BLOCKS[0] * len(values)
+    top = len(SPARK_BLOCKS) - 1
+    return "".join(SPARK_BLOCKS[min(top, int(value / peak * top + 0.5))] for value in values)
+
+
+if __name__ == "__main__":
+    # Benchmark: python net_history.py [interfaces]  (histórico de 30 días lleno)
+    import random
+    import tempfile
+
+    interfaces = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    history = RateHistory()
+    now = time.time()
+    for i in range(interfaces):
+        name = TOTAL if i == 0 else f"eth{i}"
+        for ring in history._rings(name):
+            ring.rx = array('f', (random.random() * 1e6 for _ in range(ring.size)))
+            ring.tx = array('f', (random.random() * 1e6 for _ in range(ring.size)))
+            ring.bucket = int(now // ring.resolution)
+            ring.count = 1
+
+    # Una interfaz que desapareció hace más de 30 días no se guarda
+    for ring in history._rings("veth-antigua"):
+        ring.bucket = int((now - 31 * 86400) // ring.resolution)
+
+    path = os.path.join(tempfile.gettempdir(), "net_history_bench.bin")
+    start = time.perf_counter()
+    history.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = RateHistory.load(path)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(path)
+    os.remove(path)
+    assert loaded.values(TOTAL, 2, 720, now) == history.values(TOTAL, 2, 720, now)
+    assert "veth-antigua" not in loaded.names() and len(loaded.names()) == interfaces
+    print(f"{interfaces} series x 30 días: {size / 1024:.0f} KB, "
+          f"guardado en {saved * 1000:.1f} ms, cargado en {elapsed * 1000:.1f} ms")
@@ -0,0 +1,382 @@
+"""
+Muestreo compartido de contadores de red para los monitores
+
+Un único hilo lee los contadores de todas las interfaces a ritmo fijo (reloj
+monotónico), calcula deltas y velocidades una sola vez, guarda el histórico de
+velocidades en anillos de tamaño fijo por interfaz y entrega a los suscriptores
+una instantánea inmutable. Los monitores solo tienen que pintarla.
+
+No depende de Textual: los suscriptores de una App deben pasar la instantánea
+a su hilo con call_from_thread.
+"""
+
+import os
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import psutil
+
+
+class NicCounters(NamedTuple):
+    """Contadores acumulados (mismos campos y orden que psutil.net_io_counters)"""
+    bytes_sent: int = 0
+    bytes_recv: int = 0
+    packets_sent: int = 0
+    packets_recv: int = 0
+    errin: int = 0
+    errout: int = 0
+    dropin: int = 0
+    dropout: int = 0
+
+
+class NicRates(NamedTuple):
+    """Velocidades por segundo entre dos muestras"""
+    bytes_sent: float = 0.0
+    bytes_recv: float = 0.0
+    packets_sent: float = 0.0
+    packets_recv: float = 0.0
+
+
+def psutil_counters() -> Dict[str, NicCounters]:
+    """Contadores por interfaz leídos con psutil"""
+    return {name: NicCounters(*io[:8]) for name, io in psutil.net_io_counters(pernic=True).items()}
+
+
+class ProcNetDev:
+    """
+    Lector de /proc/net/dev sin reabrir el archivo
+
+    El descriptor queda abierto y cada lectura es un pread desde el principio
+    a un búfer reutilizado. De cada línea solo se convierten a entero las 8
+    columnas necesarias, y las líneas que no han cambiado desde la lectura
+    anterior (interfaces sin tráfico) reutilizan el resultado previo.
+    """
+
+    PATH = "/proc/net/dev"
+
+    def __init__(self, path: str = PATH, buffer_size: int = 1 << 16):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buffer = bytearray(buffer_size)
+        self._lines: Dict[bytes, tuple] = {}
+
+    def _read(self) -> bytes:
+        # procfs no informa del tamaño y entrega el contenido por trozos:
+        # se lee hasta fin de archivo, agrandando el búfer si se llena
+        offset = 0
+        while True:
+            if offset == len(self.buffer):
+                self.buffer.extend(bytes(len(self.buffer)))
+            if hasattr(os, "preadv"):
+                n = os.preadv(self.fd, [memoryview(self.buffer)[offset:]], offset)
+            else:
+                data = os.pread(self.fd, len(self.buffer) - offset, offset)
+                n = len(data)
+                self.buffer[offset:offset + n] = data
+            if n == 0:
+                return bytes(memoryview(self.buffer)[:offset])
+            offset += n
+
+    def __call__(self) -> Dict[str, NicCounters]:
+        result = {}
+        previous = self._lines
+        lines = {}
+        # Las dos primeras líneas son la cabecera
+        for line in self._read().split(b'\n')[2:]:
+            if not line:
+                continue
+            parsed = previous.get(line)
+            if parsed is None:
+                name, _, rest = line.rpartition(b':')
+                f = rest.split()
+                parsed = (name.strip().decode(), NicCounters(
+                    int(f[8]), int(f[0]), int(f[9]), int(f[1]),
+                    int(f[2]), int(f[10]), int(f[3]), int(f[11]),
+                ))
+            lines[line] = parsed
+            result[parsed[0]] = parsed[1]
+        self._lines = lines
+        return result
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def default_source() -> Callable[[], Dict[str, NicCounters]]:
+    """/proc/net/dev en Linux, psutil en el resto de sistemas"""
+    if os.path.exists(ProcNetDev.PATH):
+        try:
+            return ProcNetDev()
+        except OSError:
+            pass
+    return psutil_counters
+
+
+def _sum_counters(counters) -> NicCounters:
+    return NicCounters(*(sum(column) for column in zip(*counters))) if counters else NicCounters()
+
+
+class TelemetrySnapshot:
+    """Resultado de una muestra (no se modifica una vez publicado)"""
+
+    __slots__ = ('timestamp', 'wall_time', 'elapsed', 'counters', 'rates', 'total', 'total_rates')
+
+    def __init__(self, timestamp: float, wall_time: float, elapsed: float,
+                 counters: Dict[str, NicCounters], rates: Dict[str, NicRates]):
+        self.timestamp = timestamp      # time.monotonic() de la muestra
+        self.wall_time = wall_time      # time.time() de la muestra
+        self.elapsed = elapsed          # segundos desde la muestra anterior (0 en la primera)
+        self.counters = counters
+        self.rates = rates
+        self.total = _sum_counters(list(counters.values()))
+        self.total_rates = NicRates(*(sum(column) for column in zip(*rates.values()))) if rates else NicRates()
+
+
+class TelemetrySampler:
+    """
+    Hilo de muestreo con histórico en anillos por interfaz
+
+    `source` es una función que devuelve {interfaz: NicCounters}; por defecto
+    se usa default_source(). Los suscriptores se llaman desde el hilo de muestreo.
+    """
+
+    def __init__(self, interval: float = 1.0, history: int = 300,
+                 source: Optional[Callable[[], Dict[str, NicCounters]]] = None):
+        self.interval = interval
+        self.history = history
+        self.source = source or default_source()
+        self.latest: Optional[TelemetrySnapshot] = None
+        self._subscribers: List[Callable[[TelemetrySnapshot], None]] = []
+        self._holders = 0       # Usuarios que solo leen `latest` (acquire/release)
+        self._lock = threading.Lock()
+        # sample() también puede llamarse desde la interfaz (snapshot())
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Histórico: por interfaz, anillo de velocidades de envío y recepción
+        self._rx: Dict[str, array] = {}
+        self._tx: Dict[str, array] = {}
+        self._total_rx = array('d', bytes(8 * history))
+        self._total_tx = array('d', bytes(8 * history))
+        self._pos = 0           # siguiente posición a escribir
+        self._count = 0         # muestras guardadas (hasta `history`)
+
+    # --- Suscripción ---
+
+    def subscribe(self, callback: Callable[[TelemetrySnapshot], None]):
+        """Añade un suscriptor y arranca el hilo si no estaba en marcha"""
+        with self._lock:
+            self._subscribers.append(callback)
+        self.start()
+
+    def unsubscribe(self, callback: Callable[[TelemetrySnapshot], None]):
+        """Quita un suscriptor; sin suscriptores el hilo se detiene"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+            empty = not self._subscribers and not self._holders
+        if empty:
+            self.stop()
+
+    def acquire(self):
+        """Mantiene el hilo en marcha para quien solo lee `latest` (sin suscribirse)"""
+        with self._lock:
+            self._holders += 1
+        self.start()
+
+    def release(self):
+        """Deja de mantener el hilo; sin suscriptores ni usuarios se detiene"""
+        with self._lock:
+            self._holders = max(self._holders - 1, 0)
+            empty = not self._subscribers and not self._holders
+        if empty:
+            self.stop()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive() and not self._stop.is_set():
+                return
+            # Cada hilo tiene su evento: uno que se está parando (stop() no
+            # espera) termina aunque justo después se arranque otro
+            self._stop = threading.Event()
+            # Tras una parada la muestra anterior es vieja: no sirve para velocidades
+            self.latest = None
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="net-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        # Sin join: un suscriptor podría estar esperando al hilo que llama a stop()
+        with self._lock:
+            self._stop.set()
+
+    # --- Muestreo ---
+
+    def _run(self, stop: threading.Event):
+        next_tick = time.monotonic()
+        while not stop.is_set():
+            try:
+                snapshot = self.sample()
+            except Exception:
+                snapshot = None
+            if snapshot is not None:
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for callback in subscribers:
+                    try:
+                        callback(snapshot)
+                    except Exception:
+                        pass
+            # Ritmo fijo: si una vuelta se retrasa se saltan ticks en vez de acumularlos
+            next_tick += self.interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now + self.interval - (now - next_tick) % self.interval
+            stop.wait(next_tick - now)
+
+    def sample(self) -> TelemetrySnapshot:
+        """Toma una muestra, actualiza el histórico y la publica como `latest`"""
+        with self._sample_lock:
+            return self._sample()
+
+    def _sample(self) -> TelemetrySnapshot:
+        counters = self.source()
+        now = time.monotonic()
+        previous = self.latest
+        rates: Dict[str, NicRates] = {}
+        elapsed = 0.0
+        if previous is not None:
+            elapsed = now - previous.timestamp
+        if elapsed > 0:
+            old_counters = previous.counters
+            for name, current in counters.items():
+                old = old_counters.get(name)
+                if old is None:
+                    continue
+                # Un contador que retrocede (interfaz reiniciada) cuenta como 0
+                rates[name] = NicRates(
+                    max(current.bytes_sent - old.bytes_sent, 0) / elapsed,
+                    max(current.bytes_recv - old.bytes_recv, 0) / elapsed,
+                    max(current.packets_sent - old.packets_sent, 0) / elapsed,
+                    max(current.packets_recv - old.packets_recv, 0) / elapsed,
+                )
+        snapshot = TelemetrySnapshot(now, time.time(), elapsed, counters, rates)
+        if elapsed > 0:
+            self._record(snapshot)
+        self.latest = snapshot
+        return snapshot
+
+    def snapshot(self) -> TelemetrySnapshot:
+        """La última muestra, o una nueva (sin velocidades) si aún no hay ninguna"""
+        return self.latest or self.sample()
+
+    def _record(self, snapshot: TelemetrySnapshot):
+        with self._lock:
+            pos = self._pos
+            for name in snapshot.counters:
+                if name not in self._rx:
+                    self._rx[name] = array('d', bytes(8 * self.history))
+                    self._tx[name] = array('d', bytes(8 * self.history))
+            # Las interfaces que desaparecen (veth de contenedores) no se guardan
+            for name in [name for name in self._rx if name not in snapshot.counters]:
+                del self._rx[name]
+                del self._tx[name]
+            for name, rx in self._rx.items():
+                rate = snapshot.rates.get(name)
+                rx[pos] = rate.bytes_recv if rate else 0.0
+                self._tx[name][pos] = rate.bytes_sent if rate else 0.0
+            self._total_rx[pos] = snapshot.total_rates.bytes_recv
+            self._total_tx[pos] = snapshot.total_rates.bytes_sent
+            self._pos = (pos + 1) % self.history
+            self._count = min(self._count + 1, self.history)
+
+    def _ordered(self, ring: array, n: int) -> List[float]:
+        n = min(n, self._count)
+        start = (self._pos - n) % self.history
+        if start + n <= self.history:
+            return ring[start:start + n].tolist()
+        return ring[start:].tolist() + ring[:self._pos].tolist()
+
+    def rate_history(self, interface: Optional[str] = None, n: int = 60):
+        """
+        Últimas `n` velocidades (bytes/s) de recepción y envío, de la más
+        antigua a la más reciente. Sin interfaz devuelve el total.
+        """
+        with self._lock:
+            if interface is None:
+                return self._ordered(self._total_rx, n), self._ordered(self._total_tx, n)
+            if interface not in self._rx:
+                return [], []
+            return self._ordered(self._rx[interface], n), self._ordered(self._tx[interface], n)
+
+
+_shared: Optional[TelemetrySampler] = None
+
+
+def get_sampler(interval: float = 1.0) -> TelemetrySampler:
+    """Muestreador compartido por todos los monitores del proceso"""
+    global _shared
+    if _shared is None:
+        _shared = TelemetrySampler(interval=interval)
+    return _shared
+
+
+def _create_veths(pairs: int, prefix: str = "cosbench") -> bool:
+    """Crea `pairs` pares veth para el benchmark (requiere root e iproute2)"""
+    import subprocess
+    commands = "".join(f"link add {prefix}{i}a type veth peer name {prefix}{i}b\n" for i in range(pairs))
+    result = subprocess.run(["ip", "-batch", "-"], input=commands, text=True, capture_output=True)
+    return result.returncode == 0
+
+
+def _delete_veths(pairs: int, prefix: str = "cosbench"):
+    import subprocess
+    commands = "".join(f"link del {prefix}{i}a\n" for i in range(pairs))
+    subprocess.run(["ip", "-force", "-batch", "-"], input=commands, text=True, capture_output=True)
+
+
+def benchmark(rounds: int = 200) -> Dict[str, float]:
+    """Milisegundos por lectura de todas las interfaces con cada backend"""
+    reader = ProcNetDev()
+
+    def cold():
+        # Sin reutilizar líneas: el coste si todas las interfaces tienen tráfico
+        reader._lines = {}
+        return reader()
+
+    results = {}
+    for name, source in (("psutil", lambda: psutil.net_io_counters(pernic=True)),
+                         ("/proc/net/dev", reader),
+                         ("/proc (sin caché)", cold)):
+        source()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            source()
+        results[name] = (time.perf_counter() - start) / rounds * 1000
+    reader.close()
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark: python net_sampler.py [interfaces]  (crea pares veth si es root)
+    import sys
+
+    wanted = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    pairs = 0
+    if os.path.exists(ProcNetDev.PATH) and hasattr(os, "geteuid") and os.geteuid() == 0:
+        pairs = max(0, (wanted - len(psutil_counters()) + 1) // 2)
+        if pairs and not _create_veths(pairs):
+            print("No se han podido crear las interfaces veth; se mide con las existentes")
+            _delete_veths(pairs)
+            pairs = 0
+    try:
+        count = len(psutil_counters())
+        print(f"Interfaces: {count}")
+        for name, ms in benchmark().items():
+            print(f"  {name:>18}: {ms:8.3f} ms por lectura")
+    finally:
+        if pairs:
+            _delete_veths(pairs)
@@ -1,14 +1,153 @@
 """
 Monitor de Conexiones (NetStat Monitor)
-Muestra conexiones de red en tiempo real usando 'ss'
+Muestra conexiones de red en tiempo real (en Linux con sock_diag o /proc/net,
+en Windows y macOS con 'netstat')
 """
 
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, ScrollableContainer
-from textual.widgets import Header, Footer, Button, Static, DataTable, Input, Label
+from textual.widgets import Header, Footer, Button, Static, Input, Label
 from textual.binding import Binding
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.worker import get_current_worker
+from rich.segment import Segment
 import subprocess
 import time
+from conn_snapshot import COLUMNS, FILTER_HELP, ConnectionSnapshot
+from conn_churn import ChurnTracker
+from sock_diag import ConnectionLister
+
+
+class ConnectionView(ScrollView, can_focus=True):
+    """Lista de conexiones que solo pinta las filas visibles"""
+
+    COMPONENT_CLASSES = {
+        "connection-view--header",
+        "connection-view--cursor",
+        "connection-view--even",
+    }
+
+    DEFAULT_CSS = """
+    ConnectionView {
+        background: $surface;
+    }
+    ConnectionView > .connection-view--header {
+        background: $panel;
+        color: $text;
+        text-style: bold;
+    }
+    ConnectionView > .connection-view--cursor {
+        background: $accent;
+        color: $text;
+    }
+    ConnectionView > .connection-view--even {
+        background: $surface-lighten-1;
+    }
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Arriba", show=False),
+        Binding("down", "cursor_down", "Abajo", show=False),
+        Binding("pageup", "page_cursor_up", "Página arriba", show=False),
+        Binding("pagedown", "page_cursor_down", "Página abajo", show=False),
+        Binding("home", "cursor_home", "Inicio", show=False),
+        Binding("end", "cursor_end", "Final", show=False),
+    ]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.snapshot = ConnectionSnapshot()
+        self.rows = range(0)    # Posiciones de la instantánea a mostrar, en orden
+        self.cursor = 0
+
+    def show(self, snapshot: ConnectionSnapshot, rows):
+        """Cambia las filas mostradas manteniendo la conexión seleccionada"""
+        selected = self.selected_row()
+        self.snapshot = snapshot
+        self.rows = rows
+        if selected is not None:
+            index = snapshot.find(selected)
+            if index is not None:
+                try:
+                    self.cursor = rows.index(index)
+                except ValueError:
+                    pass
+        self.cursor = max(0, min(self.cursor, len(rows) - 1))
+        width = sum(snapshot.widths) + 2 * (len(snapshot.widths) - 1)
+        self.virtual_size = Size(width, len(rows) + 1)     # +1: cabecera
+        self._follow_cursor()
+        self.refresh()
+
+    def selected_row(self):
+        if not self.rows:
+            return None
+        return self.snapshot.row(self.rows[self.cursor])
+
+    def _format(self, values) -> str:
+        return "  ".join(value.ljust(width) for value, width in zip(values, self.snapshot.widths))
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        base = self.rich_style
+        if y == 0:
+            # La cabecera no se desplaza en vertical
+            text = self._format(COLUMNS)
+            style = base + self.get_component_rich_style("connection-view--header")
+        else:
+            position = scroll_y + y - 1
+            if position >= len(self.rows):
+                return Strip.blank(width, base)
+            text = self._format(self.snapshot.row(self.rows[position]))
+            if position == self.cursor:
+                style = base + self.get_component_rich_style("connection-view--cursor")
+            elif position % 2:
+                style = base + self.get_component_rich_style("connection-view--even")
+            else:
+                style = base
+        return Strip([Segment(text.ljust(scroll_x + width), style)]).crop(scroll_x, scroll_x + width)
+
+    def _follow_cursor(self):
+        visible = max(1, self.size.height - 1)
+        if self.cursor < self.scroll_y:
+            self.scroll_to(y=self.cursor, animate=False)
+        elif self.cursor >= self.scroll_y + visible:
+            self.scroll_to(y=self.cursor - visible + 1, animate=False)
+
+    def move_cursor(self, position: int):
+        self.cursor = max(0, min(position, len(self.rows) - 1))
+        self._follow_cursor()
+        self.refresh()
+
+    def action_cursor_up(self):
+        self.move_cursor(self.cursor - 1)
+
+    def action_cursor_down(self):
+        self.move_cursor(self.cursor + 1)
+
+    def action_page_cursor_up(self):
+        self.move_cursor(self.cursor - max(1, self.size.height - 1))
+
+    def action_page_cursor_down(self):
+        self.move_cursor(self.cursor + max(1, self.size.height - 1))
+
+    def action_cursor_home(self):
+        self.move_cursor(0)
+
+    def action_cursor_end(self):
+        self.move_cursor(len(self.rows) - 1)
+
+    def on_click(self, event) -> None:
+        # Posición dentro del contenido (sin borde ni relleno); None si el
+        # clic cae en el borde o la barra de desplazamiento. La línea 0 es la
+        # cabecera, que no corresponde a ninguna fila
+        offset = event.get_content_offset(self)
+        if offset is None or offset.y == 0:
+            return
+        self.move_cursor(int(self.scroll_y) + offset.y - 1)
+
 
 class NetStatMonitorApp(App):
     """Aplicación de Monitor de Conexiones"""
@@ -23,10 +162,23 @@ class NetStatMonitorApp(App):
         padding: 1 2;
     }
     
-    DataTable {
+    ConnectionView {
         height: 1fr;
         border: solid $primary;
     }
+
+    #summary {
+        height: 1;
+        padding: 0 1;
+        color: $text-muted;
+    }
+
+    #churn {
+        height: auto;
+        padding: 0 1;
+        margin-bottom: 1;
+        border: solid $secondary;
+    }
     
     #status-bar {
         height: auto;
@@ -44,12 +196,20 @@ class NetStatMonitorApp(App):
         Binding("q", "quit", "Salir"),
         Binding("r", "refresh_connections", "Recargar"),
         Binding("space", "toggle_auto_refresh", "Pausar/Reanudar"),
+        Binding("o", "cycle_sort", "Ordenar"),
+        Binding("c", "toggle_churn", "Rotación"),
     ]
     
     def __init__(self):
         super().__init__()
         self.update_active = True
         self.timer = None
+        self.lister = None  # ConnectionLister (Linux), se crea en el primer refresco
+        self.snapshot = ConnectionSnapshot()
+        self.filter_query = ""
+        self.sort_column = None     # None: orden del sistema
+        self.churn = ChurnTracker()
+        self.collecting = False     # Enumeración en curso (no se lanza otra)
         
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -61,15 +221,15 @@ class NetStatMonitorApp(App):
                 yield Button("🔄 Recargar", id="btn-refresh", variant="primary")
                 yield Button("⏸️ Pausar", id="btn-pause", variant="warning")
                 yield Label("  Filtro: ")
-                yield Input(placeholder="Buscar...", id="filter-input", classes="filter-input")
-            
-            yield DataTable(zebra_stripes=True)
+                yield Input(placeholder=FILTER_HELP, id="filter-input", classes="filter-input")
+
+            yield Static("", id="summary")
+            yield Static("[dim]Midiendo la rotación de conexiones...[/]", id="churn")
+            yield ConnectionView()
         
         yield Footer()
         
     def on_mount(self):
-        table = self.query_one(DataTable)
-        table.add_columns("Proto", "Local Address", "Remote Address", "State", "PID/Program")
         self.refresh_connections()
         self.timer = self.set_interval(2.0, self.refresh_connections)
 
@@ -85,6 +245,35 @@ class NetStatMonitorApp(App):
     def action_toggle_auto_refresh(self):
         self.toggle_update_active()
 
+    def action_cycle_sort(self):
+        # Orden del sistema -> cada columna -> orden del sistema
+        if self.sort_column is None:
+            self.sort_column = 0
+        elif self.sort_column + 1 < len(COLUMNS):
+            self.sort_column += 1
+        else:
+            self.sort_column = None
+        self.apply_filter()
+
+    def action_toggle_churn(self):
+        panel = self.query_one("#churn", Static)
+        panel.display = not panel.display
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "filter-input":
+            self.filter_query = event.value
+            self.apply_filter()
+
+    def apply_filter(self):
+        """Aplica filtro y orden sobre la instantánea actual (con sus índices)"""
+        snapshot = self.snapshot
+        rows = snapshot.select(self.filter_query, self.sort_column)
+        self.query_one(ConnectionView).show(snapshot, rows)
+        summary = f"{len(rows):,} de {len(snapshot):,} conexiones"
+        if self.sort_column is not None:
+            summary += f" · ordenadas por {COLUMNS[self.sort_column]}"
+        self.query_one("#summary", Static).update(summary)
+
     def toggle_update_active(self):
         self.update_active = not self.update_active
         btn = self.query_one("#btn-pause", Button)
@@ -115,17 +304,71 @@ class NetStatMonitorApp(App):
                 self.notify(f"Sistema no soportado: {system}", severity="error")
                 
         except Exception as e:
-            with open("netstat_debug.log", "a") as f:
-                import traceback
-                f.write(f"Error in refresh_connections: {e}\n")
-                traceback.print_exc(file=f)
-            self.notify(f"Error al obtener conexiones: {e}", severity="error")
+            self._report_error(e)
+
+    def _report_error(self, e):
+        with open("netstat_debug.log", "a") as f:
+            import traceback
+            f.write(f"Error in refresh_connections: {e}\n")
+            traceback.print_exception(type(e), e, e.__traceback__, file=f)
+        self.notify(f"Error al obtener conexiones: {e}", severity="error")
 
     def _refresh_linux(self):
-        # Use ss -tunap
-        cmd = ['ss', '-tunap']
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        self._parse_ss_output(result.stdout)
+        # La enumeración (sock_diag o /proc/net) se hace en un hilo aparte; si
+        # la anterior aún no ha terminado (/proc/net con muchas conexiones) se
+        # salta este tick en vez de lanzar otra sobre el mismo lister y churn
+        if self.collecting:
+            return
+        self.collecting = True
+        self.run_worker(self._collect_linux, thread=True, group="connections")
+
+    def _collect_linux(self):
+        worker = get_current_worker()
+        try:
+            if self.lister is None:
+                self.lister = ConnectionLister()
+            table = self.lister.sample()
+            snapshot = ConnectionSnapshot(self.lister.rows(table), (table.sport, table.dport), table.key)
+            self.churn.update(snapshot)
+            # El texto para búsquedas y el filtro actual se preparan aquí y quedan
+            # en la caché de la instantánea
+            snapshot.text()
+            snapshot.select(self.filter_query, self.sort_column)
+        except Exception as e:
+            if not worker.is_cancelled:
+                self.call_from_thread(self._report_error, e)
+            return
+        finally:
+            self.collecting = False
+        if not worker.is_cancelled:
+            self.call_from_thread(self._show_snapshot, snapshot)
+
+    def _show_snapshot(self, snapshot):
+        self.snapshot = snapshot
+        self.apply_filter()
+        self.update_churn_panel()
+
+    def update_churn_panel(self):
+        """Panel de rotación: ritmos, TIME_WAIT, SYN_RECV y los que más abren"""
+        churn = self.churn
+        if not churn.intervals:
+            return
+        syn = f"SYN_RECV: {churn.syn_recv:,}"
+        if churn.syn_spike:
+            syn = f"[bold red]{syn} ¡pico! (media {churn.syn_recv_avg:.0f})[/]"
+        trend = f"{churn.time_wait_rate:+.1f}/s"
+        if churn.time_wait_rate > 0:
+            trend = f"[yellow]{trend}[/]"
+        lines = [
+            f"[bold cyan]🔁 Rotación[/] (media de ~{churn.half_life:.0f} s)   "
+            f"Nuevas: [green]{churn.opened_rate:.1f}/s[/]   Cerradas: {churn.closed_rate:.1f}/s   "
+            f"TIME_WAIT: {churn.time_wait:,} ({trend})   {syn}",
+            "Remotos:  " + ("   ".join(f"{host} [green]{rate:.1f}/s[/]" for host, rate in churn.by_remote.top(5))
+                            or "[dim]sin conexiones nuevas[/]"),
+            "Procesos: " + ("   ".join(f"{name} [green]{rate:.1f}/s[/]" for name, rate in churn.by_process.top(5))
+                            or "[dim]sin conexiones nuevas[/]"),
+        ]
+        self.query_one("#churn", Static).update("\n".join(lines))
 
     def _refresh_windows(self):
         # Use netstat -ano
@@ -140,47 +383,10 @@ class NetStatMonitorApp(App):
         result = subprocess.run(cmd, capture_output=True, text=True)
         self._parse_netstat_macos(result.stdout)
 
-    def _parse_ss_output(self, output):
-        table = self.query_one(DataTable)
-        table.clear()
-        filter_text = self.query_one("#filter-input", Input).value.lower()
-        
-        lines = output.split('\n')
-        start_idx = 1
-        if len(lines) > 0 and "State" in lines[0]: start_idx = 1
-        
-        for line in lines[start_idx:]:
-            if not line.strip(): continue
-            parts = line.split()
-            if len(parts) < 6: continue
-            
-            try:
-                proto = parts[0]
-                state = parts[1]
-                local_addr = parts[4]
-                remote_addr = parts[5]
-                
-                process_info = ""
-                if "users:" in line:
-                    try:
-                        p_start = line.index("users:((") + 8
-                        p_end = line.index("))", p_start)
-                        process_info = line[p_start:p_end]
-                    except:
-                        process_info = parts[-1] if "users:" in parts[-1] else ""
-                
-                self._add_row_filtered(table, filter_text, proto, local_addr, remote_addr, state, process_info)
-            except Exception as e:
-                # Ignore malformed lines to prevent crash
-                continue
-
     def _parse_netstat_windows(self, output):
         # Proto  Local Address          Foreign Address        State           PID
         # TCP    0.0.0.0:135            0.0.0.0:0              LISTENING       984
-        table = self.query_one(DataTable)
-        table.clear()
-        filter_text = self.query_one("#filter-input", Input).value.lower()
-        
+        rows = []
         lines = output.split('\n')
         for line in lines:
             if not line.strip() or "Active Connections" in line or "Proto" in line: continue
@@ -198,15 +404,15 @@ class NetStatMonitorApp(App):
                 pid = state
                 state = "UDP"
             
-            self._add_row_filtered(table, filter_text, proto, local_addr, remote_addr, state, f"PID: {pid}")
+            rows.append((proto, local_addr, remote_addr, state, f"PID: {pid}"))
+        snapshot = ConnectionSnapshot(rows)
+        self.churn.update(snapshot)
+        self._show_snapshot(snapshot)
 
     def _parse_netstat_macos(self, output):
         # Proto Recv-Q Send-Q  Local Address          Foreign Address        (state)     rhiwat shiwat    pid   epid  state    options
         # tcp4       0      0  127.0.0.1.53068        127.0.0.1.53069        ESTABLISHED 131072 131072   6789      0 0x0102 0x00000004
-        table = self.query_one(DataTable)
-        table.clear()
-        filter_text = self.query_one("#filter-input", Input).value.lower()
-        
+        rows = []
         lines = output.split('\n')
         for line in lines:
             if not line.strip() or "Proto" in line: continue
@@ -219,14 +425,10 @@ class NetStatMonitorApp(App):
             state = parts[5]
             pid = parts[8] if len(parts) > 8 else "" # Rough guess for pid column in -anv
             
-            self._add_row_filtered(table, filter_text, proto, local_addr, remote_addr, state, f"PID: {pid}")
-
-    def _add_row_filtered(self, table, filter_text, proto, local, remote, state, proc):
-        row = [proto, local, remote, state, proc]
-        if filter_text:
-            if not any(filter_text in str(c).lower() for c in row):
-                return
-        table.add_row(*row)
+            rows.append((proto, local_addr, remote_addr, state, f"PID: {pid}"))
+        snapshot = ConnectionSnapshot(rows)
+        self.churn.update(snapshot)
+        self._show_snapshot(snapshot)
 
 def main():
     app = NetStatMonitorApp()
@@ -12,6 +12,7 @@ import netifaces
 import ipaddress
 from datetime import datetime
 from functools import partial
+from table_utils import sync_table
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 from platform_utils import get_ping_fast_command
@@ -412,7 +413,6 @@ class NetworkChangeDetectorApp(App):
     def update_devices_table(self) -> None:
         """Actualiza la tabla de dispositivos"""
         table = self.query_one("#devices-table", DataTable)
-        table.clear()
         
         # Ordenar por estado (online primero) y luego por IP
         sorted_devices = sorted(
@@ -420,9 +420,10 @@ class NetworkChangeDetectorApp(App):
             key=lambda x: (x[1]['status'] != 'online', x[0])
         )
         
+        rows = {}
         for ip, info in sorted_devices:
             status_icon = "🟢" if info['status'] == 'online' else "🔴"
-            table.add_row(
+            rows[ip] = (
                 status_icon,
                 ip,
                 info['hostname'][:30],
@@ -430,6 +431,7 @@ class NetworkChangeDetectorApp(App):
                 info['first_seen'],
                 info['last_seen']
             )
+        sync_table(table, rows, ordered=True)
     
     def add_event(self, message: str, event_type: str) -> None:
         """Agrega un evento a la lista"""
@@ -9,6 +9,9 @@ from textual.binding import Binding
 import psutil
 import socket
 from datetime import datetime
+from net_sampler import get_sampler
+from net_history import RateHistory, TOTAL, VIEWS, sparkline
+from table_utils import sync_table
 import time
 
 
@@ -34,40 +37,44 @@ class StatCard(Static):
 
 
 class NetworkSpeedWidget(Static):
-    """Widget para mostrar velocidad de red"""
+    """Widget para mostrar velocidad de red con su histórico"""
     
-    def __init__(self):
-        super().__init__()
-        self.last_sent = 0
-        self.last_recv = 0
-        self.last_time = time.time()
-        self.update_speed()
+    SPARK_WIDTH = 60
     
-    def update_speed(self):
-        """Actualiza la velocidad de red"""
+    def __init__(self, history: RateHistory = None):
+        super().__init__()
+        self.history = history or RateHistory()
+        self.view = 0               # Índice en net_history.VIEWS
+        self.interface = TOTAL      # Serie mostrada
+        self.last_snapshot = None
+        self.update_speed(None)
+    
+    def update_speed(self, snapshot):
+        """Actualiza la velocidad de red con una muestra del muestreador"""
         try:
-            net_io = psutil.net_io_counters()
-            current_time = time.time()
-            time_delta = current_time - self.last_time
-            
-            if self.last_sent > 0 and time_delta > 0:
-                sent_speed = (net_io.bytes_sent - self.last_sent) / time_delta
-                recv_speed = (net_io.bytes_recv - self.last_recv) / time_delta
-                
-                # Convertir a unidades legibles
-                upload_str = self.format_bytes(sent_speed) + "/s"
-                download_str = self.format_bytes(recv_speed) + "/s"
+            if snapshot is not None:
+                self.last_snapshot = snapshot
+            snapshot = self.last_snapshot
+            rates = None
+            if snapshot is not None and snapshot.elapsed > 0:
+                if self.interface == TOTAL:
+                    rates = snapshot.total_rates
+                else:
+                    rates = snapshot.rates.get(self.interface)
+            if rates is not None:
+                upload_str = self.format_bytes(rates.bytes_sent) + "/s"
+                download_str = self.format_bytes(rates.bytes_recv) + "/s"
             else:
                 upload_str = "0 B/s"
                 download_str = "0 B/s"
             
-            self.last_sent = net_io.bytes_sent
-            self.last_recv = net_io.bytes_recv
-            self.last_time = current_time
+            title, tier, count = VIEWS[self.view]
+            recv_values, sent_values = self.history.values(self.interface, tier, count, time.time())
+            peak = max(recv_values + sent_values, default=0)
             
-            content = f"[bold]🔄 VELOCIDAD DE RED[/]\n\n"
-            content += f"⬆️  Subida:   [green]{upload_str:>12}[/]\n"
-            content += f"⬇️  Bajada:   [cyan]{download_str:>12}[/]\n"
+            content = f"[bold]🔄 VELOCIDAD DE RED[/] — {self.interface} · {title} (máx. {self.format_bytes(peak)}/s)\n\n"
+            content += f"⬆️  Subida:   [green]{upload_str:>12}[/]  [green]{sparkline(sent_values, self.SPARK_WIDTH, peak)}[/]\n"
+            content += f"⬇️  Bajada:   [cyan]{download_str:>12}[/]  [cyan]{sparkline(recv_values, self.SPARK_WIDTH, peak)}[/]\n"
             
             self.update(content)
             
@@ -172,11 +179,26 @@ class NetworkMonitorApp(App):
         Binding("q", "quit", "Salir"),
         Binding("r", "refresh", "Refrescar"),
         Binding("p", "toggle_pause", "Pausar/Reanudar"),
+        Binding("h", "history_view", "Histórico"),
+        Binding("i", "history_interface", "Interfaz"),
     ]
     
+    HISTORY_FILE = ".network_history.bin"
+    SAVE_INTERVAL = 60
+    # Enumeración de conexiones (en un hilo) y filas mostradas
+    CONNECTIONS_INTERVAL = 2
+    MAX_CONNECTION_ROWS = 50
+    
     def __init__(self):
         super().__init__()
         self.paused = False
+        self.sampler = get_sampler()
+        self.history = RateHistory.load(self.HISTORY_FILE)
+        self.last_save = time.monotonic()
+        # Última enumeración de conexiones, compartida por la tarjeta y la tabla
+        self.connection_count = None
+        self.connection_rows = {}
+        self.collecting = False
     
     def compose(self) -> ComposeResult:
         """Compone la interfaz de usuario"""
@@ -193,7 +215,7 @@ class NetworkMonitorApp(App):
                 yield StatCard("Conexiones", "0", "🔗")
                 yield StatCard("Interfaces", "0", "📡")
             
-            yield NetworkSpeedWidget()
+            yield NetworkSpeedWidget(self.history)
             
             with Vertical(id="connections-section"):
                 yield Static("[bold]🔗 CONEXIONES ACTIVAS[/]", id="conn-title")
@@ -210,10 +232,64 @@ class NetworkMonitorApp(App):
         """Se ejecuta cuando la aplicación se monta"""
         # Actualizar inmediatamente al montar
         self.call_after_refresh(self.update_all)
-        # Configurar actualizaciones periódicas
-        self.set_interval(1, self.update_stats)
+        # Configurar actualizaciones periódicas (los contadores llegan del muestreador)
+        self.sampler.subscribe(self.on_snapshot)
         self.set_interval(1, self.update_clock)
-        self.set_interval(2, self.update_connections)
+        self.set_interval(self.CONNECTIONS_INTERVAL, self.refresh_connections)
+    
+    def on_unmount(self) -> None:
+        self.sampler.unsubscribe(self.on_snapshot)
+        self.save_history()
+    
+    def on_snapshot(self, snapshot) -> None:
+        """Recibe una muestra en el hilo del muestreador"""
+        # El histórico se alimenta aquí aunque la vista esté en pausa
+        self.history.add_snapshot(snapshot)
+        if snapshot.timestamp - self.last_save >= self.SAVE_INTERVAL:
+            self.last_save = snapshot.timestamp
+            self.save_history()
+        self.call_from_thread(self.render_snapshot, snapshot)
+    
+    def save_history(self) -> None:
+        """Guarda el histórico de velocidades en disco"""
+        try:
+            self.history.save(self.HISTORY_FILE)
+        except OSError:
+            pass
+    
+    def action_history_view(self) -> None:
+        """Cambia el periodo del gráfico de velocidad"""
+        widget = self.query_one(NetworkSpeedWidget)
+        widget.view = (widget.view + 1) % len(VIEWS)
+        widget.update_speed(None)
+        self.notify(f"Histórico: {VIEWS[widget.view][0]}", severity="information")
+    
+    def action_history_interface(self) -> None:
+        """Cambia la interfaz mostrada en el gráfico (o el total)"""
+        widget = self.query_one(NetworkSpeedWidget)
+        names = self.history.names() or [TOTAL]
+        index = names.index(widget.interface) + 1 if widget.interface in names else 0
+        widget.interface = names[index % len(names)]
+        widget.update_speed(None)
+        self.notify(f"Interfaz: {widget.interface}", severity="information")
+    
+    def render_snapshot(self, snapshot) -> None:
+        """Pinta totales, interfaces y velocidad de una muestra"""
+        if self.paused:
+            return
+        
+        try:
+            stats = list(self.query(StatCard))
+            if len(stats) >= 4:
+                stats[0].set_value(self.format_bytes(snapshot.total.bytes_sent))
+                stats[1].set_value(self.format_bytes(snapshot.total.bytes_recv))
+                stats[3].set_value(str(len(snapshot.counters)))
+            
+            speed_widgets = self.query(NetworkSpeedWidget)
+            if speed_widgets:
+                speed_widgets[0].update_speed(snapshot)
+        except:
+            pass
     
     def update_clock(self) -> None:
         """Actualiza el reloj"""
@@ -223,81 +299,76 @@ class NetworkMonitorApp(App):
         except:
             pass
     
-    def update_stats(self) -> None:
-        """Actualiza las estadísticas generales"""
-        if self.paused:
+    def refresh_connections(self) -> None:
+        """Lanza la enumeración de conexiones en un hilo (si no hay otra en curso)"""
+        if self.paused or self.collecting:
             return
-        
+        self.collecting = True
+        self.run_worker(self.collect_connections, thread=True)
+    
+    def collect_connections(self) -> None:
+        """Enumera las conexiones una vez por tick (hilo de trabajo)"""
         try:
-            # Estadísticas de red
-            net_io = psutil.net_io_counters()
-            
-            # Total enviado/recibido
-            stats = list(self.query(StatCard))
-            if len(stats) >= 4:
-                stats[0].set_value(self.format_bytes(net_io.bytes_sent))
-                stats[1].set_value(self.format_bytes(net_io.bytes_recv))
-                
-                # Número de conexiones
-                try:
-                    connections = psutil.net_connections()
-                    stats[2].set_value(str(len(connections)))
-                except:
-                    stats[2].set_value("N/A")
-                
-                # Número de interfaces
-                interfaces = psutil.net_if_stats()
-                stats[3].set_value(str(len(interfaces)))
-            
-            # Actualizar velocidad
+            connections = psutil.net_connections(kind='inet')
+        except Exception:
+            self.collecting = False
+            self.call_from_thread(self.apply_connections, None, {})
+            return
+        
+        rows = {}
+        # Limitar a las primeras 50 conexiones
+        for conn in connections[:self.MAX_CONNECTION_ROWS]:
             try:
-                speed_widgets = self.query(NetworkSpeedWidget)
-                if speed_widgets:
-                    speed_widgets[0].update_speed()
+                proto = "TCP" if conn.type == socket.SOCK_STREAM else "UDP"
+                local = f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "N/A"
+                remote = f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "N/A"
+                status = conn.status if conn.status else "N/A"
+                pid = str(conn.pid) if conn.pid else "N/A"
+                rows[f"{proto}|{local}|{remote}|{pid}"] = (proto, local, remote, status, pid)
             except:
                 pass
-            
+        self.collecting = False
+        self.call_from_thread(self.apply_connections, len(connections), rows)
+    
+    def apply_connections(self, count, rows) -> None:
+        """Guarda la enumeración y la pinta en la tarjeta y en la tabla"""
+        self.connection_count = count
+        self.connection_rows = rows
+        if self.paused:
+            return
+        self.update_stats()
+        self.update_connections()
+    
+    def update_stats(self) -> None:
+        """Actualiza el número de conexiones"""
+        try:
+            stats = list(self.query(StatCard))
+            if len(stats) >= 4:
+                count = self.connection_count
+                stats[2].set_value(str(count) if count is not None else "N/A")
         except Exception as e:
             # Error silencioso para no molestar al usuario
             pass
     
     def update_connections(self) -> None:
-        """Actualiza la tabla de conexiones"""
-        if self.paused:
-            return
-        
+        """Actualiza la tabla de conexiones con la última enumeración"""
         try:
             # Verificar si existe la tabla antes de actualizar
             tables = self.query(ConnectionsTable)
             if not tables:
                 return  # No hay tabla que actualizar (puede estar mostrando estadísticas)
             
-            table = tables[0]
-            table.clear()
-            
-            connections = psutil.net_connections(kind='inet')
-            
-            # Limitar a las primeras 50 conexiones
-            for conn in connections[:50]:
-                try:
-                    proto = "TCP" if conn.type == socket.SOCK_STREAM else "UDP"
-                    local = f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "N/A"
-                    remote = f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "N/A"
-                    status = conn.status if conn.status else "N/A"
-                    pid = str(conn.pid) if conn.pid else "N/A"
-                    
-                    table.add_row(proto, local, remote, status, pid)
-                except:
-                    pass
-                    
+            sync_table(tables[0], self.connection_rows)
         except Exception as e:
             # No mostrar error si simplemente no existe la tabla
             pass
     
     def update_all(self) -> None:
         """Actualiza todos los componentes"""
+        self.render_snapshot(self.sampler.snapshot())
         self.update_stats()
         self.update_connections()
+        self.refresh_connections()
     
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Maneja eventos de botones"""
@@ -349,7 +420,7 @@ class NetworkMonitorApp(App):
     def show_detailed_stats(self) -> None:
         """Muestra estadísticas detalladas en la sección de conexiones"""
         try:
-            net_io = psutil.net_io_counters()
+            net_io = self.sampler.snapshot().total
             net_if = psutil.net_if_stats()
             
             stats_text = "[bold cyan]═══ ESTADÍSTICAS DETALLADAS DE RED ═══[/]\n\n"
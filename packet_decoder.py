@@ -0,0 +1,305 @@
+"""
+Decodificador de paquetes L2/L3/L4 (Ethernet, VLAN, ARP, IPv4, IPv6, TCP, UDP, ICMP)
+
+Todas las cabeceras se leen con objetos struct.Struct precompilados y
+unpack_from sobre el buffer original (bytes o memoryview), sin copiar ni
+trocear cabeceras. Uso como script:
+
+    python packet_decoder.py [captura.pcap]   -> benchmark en paquetes/s
+    python packet_decoder.py --fuzz           -> prueba con datos aleatorios
+"""
+
+import socket
+import struct
+import sys
+import time
+
+from pcap_utils import LINKTYPE_ETHERNET, LINKTYPE_RAW
+
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_IPV6 = 0x86DD
+ETH_P_VLAN = (0x8100, 0x88A8, 0x9100)
+
+IPPROTO_ICMP = 1
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+IPPROTO_ICMPV6 = 58
+
+# Cabeceras de extensión IPv6 que se pueden saltar para llegar a L4
+_IPV6_EXT_HEADERS = {0, 43, 44, 51, 60}
+
+_ETH = struct.Struct('!6s6sH')
+_VLAN = struct.Struct('!HH')
+_ARP = struct.Struct('!HHBBH6s4s6s4s')
+_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_IPV6 = struct.Struct('!IHBB16s16s')
+_IPV6_EXT = struct.Struct('!BB')
+_IPV6_FRAG = struct.Struct('!BBH')
+_TCP = struct.Struct('!HHIIBBH')
+_UDP = struct.Struct('!HHHH')
+_ICMP = struct.Struct('!BB')
+
+PROTO_NAMES = {IPPROTO_ICMP: "ICMP", IPPROTO_TCP: "TCP", IPPROTO_UDP: "UDP", IPPROTO_ICMPV6: "ICMPv6"}
+
+TCP_FLAG_NAMES = (
+    (0x01, "FIN"), (0x02, "SYN"), (0x04, "RST"), (0x08, "PSH"),
+    (0x10, "ACK"), (0x20, "URG"), (0x40, "ECE"), (0x80, "CWR"),
+)
+
+ICMP_TYPES = {
+    0: "Echo reply", 3: "Destino inalcanzable", 4: "Source quench", 5: "Redirect",
+    8: "Echo request", 11: "TTL excedido", 12: "Problema de parámetros",
+    13: "Timestamp", 14: "Timestamp reply",
+}
+
+ICMPV6_TYPES = {
+    1: "Destino inalcanzable", 2: "Paquete demasiado grande", 3: "Tiempo excedido",
+    4: "Problema de parámetros", 128: "Echo request", 129: "Echo reply",
+    133: "Router solicitation", 134: "Router advertisement",
+    135: "Neighbor solicitation", 136: "Neighbor advertisement", 137: "Redirect",
+}
+
+# Cache de nombres de flags TCP (solo hay 256 combinaciones)
+_FLAG_STRINGS = [
+    ",".join(name for bit, name in TCP_FLAG_NAMES if value & bit)
+    for value in range(256)
+]
+
+
+class DecodeError(ValueError):
+    """El paquete está truncado o mal formado"""
+
+
+class Packet:
+    """Resultado de decodificar un paquete"""
+
+    __slots__ = (
+        'length', 'l3', 'vlan', 'proto', 'src', 'dst', 'sport', 'dport',
+        'tcp_flags', 'icmp_type', 'icmp_code', 'arp_op',
+    )
+
+    def __init__(self, length: int):
+        self.length = length
+        self.l3 = ""          # "IPv4", "IPv6", "ARP" o el ethertype en hex
+        self.vlan = None      # Lista de VLAN IDs (802.1Q / QinQ)
+        self.proto = 0        # Número de protocolo IP
+        self.src = ""
+        self.dst = ""
+        self.sport = 0
+        self.dport = 0
+        self.tcp_flags = 0
+        self.icmp_type = -1
+        self.icmp_code = -1
+        self.arp_op = 0
+
+    @property
+    def proto_name(self) -> str:
+        if self.l3 in ("IPv4", "IPv6"):
+            return PROTO_NAMES.get(self.proto, str(self.proto))
+        return self.l3
+
+    @property
+    def flags_str(self) -> str:
+        return _FLAG_STRINGS[self.tcp_flags]
+
+    def info(self) -> str:
+        """Descripción corta para la tabla"""
+        if self.l3 == "ARP":
+            if self.arp_op == 1:
+                return f"¿Quién tiene {self.dst}? Pregunta {self.src}"
+            if self.arp_op == 2:
+                return f"{self.src} responde (ARP reply)"
+            return f"ARP op {self.arp_op}"
+
+        parts = []
+        if self.vlan:
+            parts.append("VLAN " + "/".join(str(v) for v in self.vlan))
+        if self.proto == IPPROTO_TCP:
+            parts.append(f"{self.sport} → {self.dport} [{self.flags_str}]")
+        elif self.proto == IPPROTO_UDP:
+            parts.append(f"{self.sport} → {self.dport}")
+        elif self.proto == IPPROTO_ICMP and self.icmp_type >= 0:
+            parts.append(f"{ICMP_TYPES.get(self.icmp_type, f'Tipo {self.icmp_type}')} (código {self.icmp_code})")
+        elif self.proto == IPPROTO_ICMPV6 and self.icmp_type >= 0:
+            parts.append(f"{ICMPV6_TYPES.get(self.icmp_type, f'Tipo {self.icmp_type}')} (código {self.icmp_code})")
+        elif not parts:
+            parts.append(f"{self.l3} Packet")
+        return " ".join(parts)
+
+
+def decode(buf, linktype: int = LINKTYPE_ETHERNET) -> Packet:
+    """
+    Decodifica un paquete capturado
+
+    Args:
+        buf: bytes, bytearray o memoryview con el paquete completo
+        linktype: tipo de enlace de la captura (Ethernet o IP sin cabecera)
+
+    Raises:
+        DecodeError: si el paquete está truncado o mal formado
+    """
+    try:
+        pkt = Packet(len(buf))
+        if linktype == LINKTYPE_RAW:
+            version = buf[0] >> 4
+            if version == 4:
+                _decode_ipv4(buf, 0, pkt)
+            elif version == 6:
+                _decode_ipv6(buf, 0, pkt)
+            else:
+                raise DecodeError(f"Versión IP desconocida: {version}")
+            return pkt
+
+        _, _, ethertype = _ETH.unpack_from(buf, 0)
+        offset = 14
+        while ethertype in ETH_P_VLAN:
+            tci, ethertype = _VLAN.unpack_from(buf, offset)
+            if pkt.vlan is None:
+                pkt.vlan = []
+            pkt.vlan.append(tci & 0x0FFF)
+            offset += 4
+
+        if ethertype == ETH_P_IP:
+            _decode_ipv4(buf, offset, pkt)
+        elif ethertype == ETH_P_IPV6:
+            _decode_ipv6(buf, offset, pkt)
+        elif ethertype == ETH_P_ARP:
+            _decode_arp(buf, offset, pkt)
+        else:
+            pkt.l3 = f"0x{ethertype:04x}"
+        return pkt
+    except (struct.error, IndexError) as e:
+        raise DecodeError(str(e)) from None
+
+
+def _decode_ipv4(buf, offset: int, pkt: Packet):
+    ver_ihl, _, total_len, _, frag, _, proto, _, src, dst = _IPV4.unpack_from(buf, offset)
+    ihl = (ver_ihl & 0x0F) * 4
+    if ver_ihl >> 4 != 4 or ihl < 20:
+        raise DecodeError("Cabecera IPv4 inválida")
+    pkt.l3 = "IPv4"
+    pkt.proto = proto
+    pkt.src = socket.inet_ntoa(src)
+    pkt.dst = socket.inet_ntoa(dst)
+    # Solo el primer fragmento lleva la cabecera L4
+    if frag & 0x1FFF == 0:
+        _decode_l4(buf, offset + ihl, proto, pkt)
+
+
+def _decode_ipv6(buf, offset: int, pkt: Packet):
+    ver_tc_flow, _, next_header, _, src, dst = _IPV6.unpack_from(buf, offset)
+    if ver_tc_flow >> 28 != 6:
+        raise DecodeError("Cabecera IPv6 inválida")
+    pkt.l3 = "IPv6"
+    pkt.src = socket.inet_ntop(socket.AF_INET6, src)
+    pkt.dst = socket.inet_ntop(socket.AF_INET6, dst)
+    offset += 40
+
+    # Saltar cabeceras de extensión (como mucho unas pocas)
+    for _ in range(8):
+        if next_header not in _IPV6_EXT_HEADERS:
+            break
+        nh, ext_len = _IPV6_EXT.unpack_from(buf, offset)
+        if next_header == 44:
+            # Fragmento: solo el primero contiene L4
+            _, _, frag = _IPV6_FRAG.unpack_from(buf, offset)
+            if frag & 0xFFF8:
+                pkt.proto = nh
+                return
+            offset += 8
+        elif next_header == 51:
+            offset += (ext_len + 2) * 4
+        else:
+            offset += (ext_len + 1) * 8
+        next_header = nh
+
+    pkt.proto = next_header
+    _decode_l4(buf, offset, next_header, pkt)
+
+
+def _decode_l4(buf, offset: int, proto: int, pkt: Packet):
+    if proto == IPPROTO_TCP:
+        pkt.sport, pkt.dport, _, _, _, pkt.tcp_flags, _ = _TCP.unpack_from(buf, offset)
+    elif proto == IPPROTO_UDP:
+        pkt.sport, pkt.dport, _, _ = _UDP.unpack_from(buf, offset)
+    elif proto == IPPROTO_ICMP or proto == IPPROTO_ICMPV6:
+        pkt.icmp_type, pkt.icmp_code = _ICMP.unpack_from(buf, offset)
+
+
+def _decode_arp(buf, offset: int, pkt: Packet):
+    htype, ptype, hlen, plen, op, _sha, spa, _tha, tpa = _ARP.unpack_from(buf, offset)
+    pkt.l3 = "ARP"
+    pkt.arp_op = op
+    if htype == 1 and ptype == ETH_P_IP and hlen == 6 and plen == 4:
+        pkt.src = socket.inet_ntoa(spa)
+        pkt.dst = socket.inet_ntoa(tpa)
+
+
+def _sample_frames():
+    """Tramas sintéticas variadas para el benchmark"""
+    eth = b'\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb'
+    ipv4_tcp = eth + b'\x08\x00' + _IPV4.pack(0x45, 0, 40, 0, 0, 64, 6, 0, b'\x0a\x00\x00\x01', b'\x0a\x00\x00\x02') \
+        + _TCP.pack(40000, 443, 1, 0, 0x50, 0x12, 1024) + b'\x00' * 6
+    ipv4_udp = eth + b'\x81\x00' + _VLAN.pack(10, ETH_P_IP) \
+        + _IPV4.pack(0x45, 0, 28, 0, 0, 64, 17, 0, b'\xc0\xa8\x01\x01', b'\x08\x08\x08\x08') + _UDP.pack(5353, 53, 8, 0)
+    ipv6_icmp = eth + b'\x86\xdd' + _IPV6.pack(6 << 28, 8, 58, 64, b'\xfe\x80' + b'\x00' * 13 + b'\x01',
+                                                b'\xff\x02' + b'\x00' * 13 + b'\x01') + _ICMP.pack(128, 0) + b'\x00' * 6
+    arp = eth + b'\x08\x06' + _ARP.pack(1, ETH_P_IP, 6, 4, 1, b'\x00' * 6, b'\x0a\x00\x00\x01', b'\x00' * 6, b'\x0a\x00\x00\x02')
+    return [ipv4_tcp, ipv4_udp, ipv6_icmp, arp]
+
+
+def benchmark(frames, linktype: int = LINKTYPE_ETHERNET, repeat: int = 1) -> float:
+    """Decodifica `frames` `repeat` veces y devuelve paquetes por segundo"""
+    start = time.perf_counter()
+    count = 0
+    for _ in range(repeat):
+        for frame in frames:
+            try:
+                decode(frame, linktype)
+            except DecodeError:
+                pass
+            count += 1
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed > 0 else 0.0
+
+
+def fuzz(iterations: int = 100000, seed: int = 0) -> int:
+    """
+    Decodifica tramas válidas mutadas/truncadas al azar
+
+    Cualquier excepción distinta de DecodeError se propaga. Devuelve el
+    número de tramas rechazadas como mal formadas.
+    """
+    import random
+    rng = random.Random(seed)
+    samples = _sample_frames()
+    rejected = 0
+    for _ in range(iterations):
+        frame = bytearray(rng.choice(samples))
+        for _ in range(rng.randint(0, 4)):
+            frame[rng.randrange(len(frame))] = rng.randrange(256)
+        frame = frame[:rng.randint(0, len(frame))]
+        for linktype in (LINKTYPE_ETHERNET, LINKTYPE_RAW):
+            try:
+                decode(memoryview(frame), linktype)
+            except DecodeError:
+                rejected += 1
+    return rejected
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--fuzz":
+        rejected = fuzz()
+        print(f"Fuzz OK: {rejected} tramas rechazadas como mal formadas")
+    elif len(sys.argv) > 1:
+        from pcap_utils import PcapReader
+        with PcapReader(sys.argv[1]) as reader:
+            frames = [frame for _, frame in reader]
+            pps = benchmark(frames, reader.linktype)
+            print(f"{len(frames)} paquetes de {sys.argv[1]}: {pps:,.0f} paquetes/s")
+            del frames
+    else:
+        pps = benchmark(_sample_frames(), repeat=100000)
+        print(f"Tramas sintéticas: {pps:,.0f} paquetes/s")
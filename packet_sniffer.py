@@ -5,17 +5,34 @@ Requiere permisos de ROOT/ADMINISTRADOR
 
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Header, Footer, Button, Static, DataTable, Label
+from textual.widgets import Header, Footer, Button, Static, DataTable, Label, Input, TabbedContent, TabPane, Checkbox
 from textual.binding import Binding
 from textual.worker import Worker
+from textual.message import Message
+from pathlib import Path
+import pcap_utils
+import packet_decoder
+from flow_tracker import FlowTracker
+from traffic_stats import TrafficStats, SIZE_LABELS
+from sniffer_pipeline import CapturePipeline
+from capture_profiler import CaptureProfiler, format_report
 import socket
-import struct
 import textwrap
+import json
 import time
 import os
 import sys
 import threading
 
+
+class PacketBatch(Message):
+    """Lote de filas enviado desde el hilo de captura sin bloquearlo"""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+
+
 class PacketSnifferApp(App):
     """Aplicación de Sniffer de Paquetes"""
     
@@ -48,20 +65,80 @@ class PacketSnifferApp(App):
         width: 1fr;
         content-align: center middle;
     }
+    
+    #input-pcap {
+        width: 40;
+    }
+    
+    #stats-tables {
+        height: 1fr;
+    }
+    
+    #stats-tables DataTable {
+        width: 1fr;
+    }
+    
+    #size-hist {
+        height: auto;
+        padding: 0 1;
+        border: solid $accent;
+    }
+    
+    #debug-panel {
+        height: 1fr;
+        padding: 1;
+        border: solid $accent;
+    }
     """
     
     BINDINGS = [
         Binding("q", "quit", "Salir"),
         Binding("s", "toggle_capture", "Iniciar/Parar"),
         Binding("c", "clear_table", "Limpiar"),
+        Binding("d", "toggle_profiling", "Medir tiempos"),
+        Binding("j", "dump_counters", "Volcar contadores"),
     ]
     
-    def __init__(self):
+    # Paquetes acumulados antes de enviarlos a la interfaz
+    UI_BATCH_SIZE = 200
+    UI_BATCH_INTERVAL = 0.2
+    # Refresco de las vistas agregadas (segundos) y nº de filas
+    FLOWS_INTERVAL = 1.0
+    TOP_FLOWS = 50
+    TOP_HOSTS = 15
+    # Filas máximas en la lista de paquetes (se vacía al superarlas)
+    MAX_PACKET_ROWS = 5000
+    # Lotes pendientes de pintar; con más, los nuevos se descartan
+    MAX_UI_PENDING = 4
+    COUNTERS_FILE = "sniffer_counters.json"
+    
+    def __init__(self, offline_file=None, rotate_bytes=0, rotate_seconds=0):
         super().__init__()
         self.capturing = False
         self.packet_count = 0
+        self.packets_per_second = 0.0
+        self.flow_count = 0
         self.sniffer_socket = None
         self.worker = None
+        self.offline_file = offline_file
+        self.pcap_writer = None
+        self.linktype = pcap_utils.LINKTYPE_ETHERNET
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.flow_tracker = FlowTracker()
+        self.traffic_stats = TrafficStats()
+        # La lista paquete a paquete solo se alimenta con su pestaña visible
+        self.show_packets = False
+        self._last_publish = 0.0
+        self._last_packet_ts = 0.0
+        self._clear_pending = False
+        self.pipeline = None
+        self.pipeline_timer = None
+        self.profiler = CaptureProfiler()
+        self.counters = self.profiler.to_dict()
+        # Lotes enviados (hilo de captura) y pintados (hilo de la interfaz)
+        self._ui_sent = 0
+        self._ui_done = 0
         
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -70,21 +147,45 @@ class PacketSnifferApp(App):
             yield Button("▶️ Iniciar", id="btn-start", variant="success")
             yield Button("⏹️ Detener", id="btn-stop", variant="error", disabled=True)
             yield Button("🗑️ Limpiar", id="btn-clear")
+            yield Input(placeholder="Archivo .pcap/.pcapng (opcional)", id="input-pcap")
+            yield Button("📂 Leer pcap", id="btn-offline")
+            yield Checkbox("Multiproceso", id="chk-pipeline", disabled=not sys.platform.startswith("linux"))
             yield Label("   Total Paquetes: 0", id="lbl-count", classes="stat-box")
             
-        yield DataTable(cursor_type="row")
+        with TabbedContent(initial="tab-stats"):
+            with TabPane("Estadísticas", id="tab-stats"):
+                with Horizontal(id="stats-tables"):
+                    yield DataTable(cursor_type="row", id="proto-table")
+                    yield DataTable(cursor_type="row", id="src-table")
+                    yield DataTable(cursor_type="row", id="dst-table")
+                yield Static("Tamaño de paquete: sin datos", id="size-hist")
+            with TabPane("Paquetes", id="tab-packets"):
+                yield DataTable(cursor_type="row", id="packets-table")
+            with TabPane("Conversaciones (top por bytes)", id="tab-flows"):
+                yield DataTable(cursor_type="row", id="flows-table")
+            with TabPane("Depuración", id="tab-debug"):
+                yield Static(format_report(self.counters), id="debug-panel")
         yield Static("Listo (Requiere ROOT/Sudo)", id="status")
         yield Footer()
         
     def on_mount(self):
-        table = self.query_one(DataTable)
+        table = self.query_one("#packets-table", DataTable)
         table.add_columns("Hora", "Protocolo", "Origen", "Destino", "Longitud", "Info")
+        flows = self.query_one("#flows-table", DataTable)
+        flows.add_columns("Protocolo", "Origen", "Destino", "Paquetes", "Bytes", "Duración", "Estado TCP")
+        self.query_one("#proto-table", DataTable).add_columns("Protocolo", "Paquetes/s", "Bytes/s", "Total")
+        self.query_one("#src-table", DataTable).add_columns("Top origen", "Bytes")
+        self.query_one("#dst-table", DataTable).add_columns("Top destino", "Bytes")
         
         # Check permissions
         if os.name != 'nt' and os.geteuid() != 0:
             self.notify("⚠️ Se requieren permisos de ROOT para capturar paquetes", severity="error", timeout=10)
             self.query_one("#status", Static).update("⚠️ ERROR: No tienes permisos de root. Ejecuta con sudo.")
             self.query_one("#btn-start", Button).disabled = True
+        
+        if self.offline_file:
+            self.query_one("#input-pcap", Input).value = str(self.offline_file)
+            self.start_offline(self.offline_file)
 
     def action_toggle_capture(self):
         if self.capturing:
@@ -93,9 +194,37 @@ class PacketSnifferApp(App):
             self.start_capture()
             
     def action_clear_table(self):
-        self.query_one(DataTable).clear()
+        for table in self.query(DataTable):
+            table.clear()
+        self.query_one("#size-hist", Static).update("Tamaño de paquete: sin datos")
+        # Flujos y estadísticas pertenecen al hilo de captura mientras está activo
+        if self.capturing:
+            self._clear_pending = True
+        else:
+            self.flow_tracker.clear()
+            self.traffic_stats.clear()
+            self.profiler.reset()
         self.packet_count = 0
-        self.query_one("#lbl-count", Label).update(f"   Total Paquetes: {self.packet_count}")
+        self.packets_per_second = 0.0
+        self.flow_count = 0
+        self.update_count_label()
+
+    def action_toggle_profiling(self):
+        self.profiler.enabled = not self.profiler.enabled
+        estado = "activada" if self.profiler.enabled else "desactivada"
+        self.notify(f"Medición de tiempos por etapa {estado}")
+
+    def action_dump_counters(self):
+        """Guarda los últimos contadores publicados en JSON"""
+        try:
+            with open(self.COUNTERS_FILE, 'w') as f:
+                json.dump(self.counters, f, indent=2)
+            self.notify(f"Contadores guardados en {self.COUNTERS_FILE}")
+        except OSError as e:
+            self.notify(f"Error al guardar contadores: {e}", severity="error")
+
+    def on_tabbed_content_tab_activated(self, event: TabbedContent.TabActivated) -> None:
+        self.show_packets = event.pane.id == "tab-packets"
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "btn-start":
@@ -104,10 +233,20 @@ class PacketSnifferApp(App):
             self.stop_capture()
         elif event.button.id == "btn-clear":
             self.action_clear_table()
+        elif event.button.id == "btn-offline":
+            path = self.query_one("#input-pcap", Input).value.strip()
+            if path:
+                self.start_offline(path)
+            else:
+                self.notify("Indica la ruta de un archivo pcap", severity="warning")
 
     def start_capture(self):
         if self.capturing: return
         
+        if self.query_one("#chk-pipeline", Checkbox).value:
+            self.start_pipeline()
+            return
+        
         try:
             # Setup socket
             if os.name == 'nt':
@@ -117,10 +256,22 @@ class PacketSnifferApp(App):
                 self.sniffer_socket.bind((self.get_local_ip(), 0))
                 self.sniffer_socket.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
                 self.sniffer_socket.ioctl(socket.SIO_RCVALL, socket.RCVALL_ON)
+                # El socket entrega paquetes IP sin cabecera Ethernet
+                self.linktype = pcap_utils.LINKTYPE_RAW
             else:
                 # Linux/Unix
                 self.sniffer_socket = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.ntohs(3))
+                self.linktype = pcap_utils.LINKTYPE_ETHERNET
+            
+            # Guardar la captura si se ha indicado un archivo
+            path = self.query_one("#input-pcap", Input).value.strip()
+            if path:
+                self.pcap_writer = pcap_utils.PcapWriter(
+                    path, linktype=self.linktype,
+                    rotate_bytes=self.rotate_bytes, rotate_seconds=self.rotate_seconds
+                )
             
+            self.profiler.reset()
             self.capturing = True
             self.query_one("#btn-start", Button).disabled = True
             self.query_one("#btn-stop", Button).disabled = False
@@ -135,8 +286,51 @@ class PacketSnifferApp(App):
         except Exception as e:
             self.notify(f"Error al iniciar socket: {e}", severity="error")
 
+    def start_pipeline(self):
+        """Captura y decodificación en procesos separados (solo agregados en la interfaz)"""
+        if self.query_one("#input-pcap", Input).value.strip():
+            self.notify("El modo multiproceso no guarda la captura en pcap", severity="warning")
+        
+        decoders = max(1, (os.cpu_count() or 2) - 1)
+        try:
+            self.pipeline = CapturePipeline(decoders=decoders, top_n=self.TOP_FLOWS)
+            self.pipeline.start()
+        except Exception as e:
+            self.pipeline = None
+            self.notify(f"Error al iniciar el pipeline: {e}", severity="error")
+            return
+        
+        self.capturing = True
+        self.query_one("#btn-start", Button).disabled = True
+        self.query_one("#btn-stop", Button).disabled = False
+        self.query_one("#status", Static).update(f"🦈 Capturando con {decoders} decodificador(es) en paralelo...")
+        self.query_one(TabbedContent).active = "tab-flows"
+        self.pipeline_timer = self.set_interval(self.FLOWS_INTERVAL, self.poll_pipeline)
+        self.notify("Captura multiproceso iniciada")
+
+    def poll_pipeline(self, force=False):
+        """Lee los agregados publicados por los decodificadores"""
+        if not self.pipeline or (not self.pipeline.poll() and not force):
+            return
+        totals, top = self.pipeline.summary()
+        self.update_stats_panel(totals['stats'])
+        counters = self.profiler.to_dict(totals['decoded'])
+        counters.update(received=totals['received'], decode_errors=totals['errors'],
+                        ring_dropped=totals['dropped'])
+        self.update_debug_panel(counters)
+        self.update_flows_table(top, totals['flow_count'])
+        self.query_one("#status", Static).update(
+            f"🦈 Multiproceso: {totals['received']:,} capturados, "
+            f"{totals['dropped']:,} descartados, {totals['errors']:,} errores de decodificación"
+        )
+
     def stop_capture(self):
         self.capturing = False
+        if self.pipeline:
+            self.pipeline_timer.stop()
+            self.pipeline.stop()
+            self.poll_pipeline(force=True)
+            self.pipeline = None
         if self.sniffer_socket:
             if os.name == 'nt':
                 try:
@@ -144,67 +338,266 @@ class PacketSnifferApp(App):
                 except: pass
             self.sniffer_socket.close()
             self.sniffer_socket = None
+        
+        if self.pcap_writer:
+            self.pcap_writer.close()
+            self.notify(f"Captura guardada: {self.pcap_writer.packets_written} paquetes en {len(self.pcap_writer.files_written)} archivo(s)")
+            self.pcap_writer = None
             
         self.query_one("#btn-start", Button).disabled = False
         self.query_one("#btn-stop", Button).disabled = True
         self.query_one("#status", Static).update("⏹️ Captura detenida")
         self.notify("Captura detenida")
 
+    def start_offline(self, path):
+        """Reproduce un archivo pcap/pcapng por el mismo decodificador"""
+        if self.capturing:
+            self.notify("Detén la captura antes de leer un archivo", severity="warning")
+            return
+        
+        try:
+            reader = pcap_utils.PcapReader(path)
+        except (OSError, ValueError) as e:
+            self.notify(f"Error al abrir captura: {e}", severity="error")
+            return
+        
+        self.profiler.reset()
+        self.capturing = True
+        self.linktype = reader.linktype
+        self.query_one("#btn-start", Button).disabled = True
+        self.query_one("#btn-stop", Button).disabled = False
+        self.query_one("#status", Static).update(f"📂 Leyendo {Path(path).name}...")
+        self.run_worker(lambda: self.offline_loop(reader), thread=True)
+
+    def offline_loop(self, reader):
+        start = time.perf_counter()
+        count = 0
+        batch = []
+        prof = self.profiler
+        clock = time.perf_counter_ns
+        try:
+            for ts, frame in reader:
+                if not self.capturing:
+                    break
+                count += 1
+                # pcapng: cada interfaz puede tener su propio tipo de enlace
+                self.linktype = reader.linktype
+                if prof.enabled:
+                    t0 = clock()
+                    row = self.parse_packet(frame, ts)
+                    prof.add_time("decode", clock() - t0)
+                else:
+                    row = self.parse_packet(frame, ts)
+                if row:
+                    batch.append(row)
+                    if len(batch) >= self.UI_BATCH_SIZE:
+                        self._send_batch(batch)
+                        batch = []
+                if not count & 0x3FF:
+                    self._maybe_publish()
+        finally:
+            reader.close()
+        
+        if batch:
+            self._send_batch(batch)
+        self._maybe_publish(force=True)
+        elapsed = time.perf_counter() - start
+        pps = count / elapsed if elapsed > 0 else 0
+        self.app.call_from_thread(self.finish_offline, count, pps)
+
+    def finish_offline(self, count, pps):
+        self.capturing = False
+        if os.name == 'nt' or os.geteuid() == 0:
+            self.query_one("#btn-start", Button).disabled = False
+        self.query_one("#btn-stop", Button).disabled = True
+        self.query_one("#status", Static).update(f"📂 Archivo procesado: {count} paquetes ({pps:,.0f} paquetes/s)")
+
     def capture_loop(self):
+        batch = []
+        last_flush = time.monotonic()
+        prof = self.profiler
+        clock = time.perf_counter_ns
         while self.capturing and self.sniffer_socket:
             try:
+                # Con la medición desactivada el coste es una comprobación por paquete
+                timing = prof.enabled
+                if timing:
+                    t0 = clock()
                 raw_data, addr = self.sniffer_socket.recvfrom(65535)
-                self.parse_packet(raw_data)
+                ts = time.time()
+                if timing:
+                    t1 = clock()
+                    prof.add_time("recv", t1 - t0)
+                if self.pcap_writer:
+                    self.pcap_writer.write(raw_data, ts)
+                    if timing:
+                        t2 = clock()
+                        prof.add_time("pcap", t2 - t1)
+                        t1 = t2
+                row = self.parse_packet(raw_data, ts)
+                if timing:
+                    prof.add_time("decode", clock() - t1)
+                if row:
+                    batch.append(row)
+                
+                # Enviar a la interfaz por lotes para no saturar el bucle de eventos
+                now = time.monotonic()
+                if batch and (len(batch) >= self.UI_BATCH_SIZE or now - last_flush >= self.UI_BATCH_INTERVAL):
+                    self._send_batch(batch)
+                    batch = []
+                    last_flush = now
+                self._maybe_publish()
             except Exception as e:
                 if self.capturing:
                     self.app.call_from_thread(self.notify, f"Error captura: {e}", severity="error")
                 break
+        
+        if batch:
+            self._send_batch(batch)
+
+    def _send_batch(self, rows):
+        """
+        Envía un lote a la tabla sin esperar a que se pinte
+
+        Si la interfaz va retrasada más de MAX_UI_PENDING lotes, el lote se
+        descarta (y se cuenta) en lugar de frenar la captura.
+        """
+        if self._ui_sent - self._ui_done >= self.MAX_UI_PENDING:
+            self.profiler.ui_dropped += len(rows)
+            return
+        self._ui_sent += 1
+        self.post_message(PacketBatch(rows))
+
+    def on_packet_batch(self, message: PacketBatch) -> None:
+        prof = self.profiler
+        if prof.enabled:
+            t0 = time.perf_counter_ns()
+            self.add_packets_to_table(message.rows)
+            prof.add_time("ui", time.perf_counter_ns() - t0)
+        else:
+            self.add_packets_to_table(message.rows)
+        self._ui_done += 1
+
+    def _maybe_publish(self, force=False):
+        """Envía conversaciones y estadísticas a la interfaz (como mucho 1 vez/s)"""
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.FLOWS_INTERVAL:
+            return
+        self._last_publish = now
+        prof = self.profiler
+        t0 = time.perf_counter_ns()
+        
+        if self._clear_pending:
+            self.flow_tracker.clear()
+            self.traffic_stats.clear()
+            prof.reset()
+            self._clear_pending = False
+        # Expirar según el reloj de los paquetes (sirve también en modo offline)
+        self.flow_tracker.expire(self._last_packet_ts)
+        top = self.flow_tracker.top_talkers(self.TOP_FLOWS)
+        stats = self.traffic_stats.snapshot(self.TOP_HOSTS, now=self._last_packet_ts or None)
+        self.app.call_from_thread(self.update_flows_table, top, len(self.flow_tracker))
+        self.app.call_from_thread(self.update_stats_panel, stats)
+        prof.read_kernel_stats(self.sniffer_socket)
+        if prof.enabled:
+            prof.add_time("publish", time.perf_counter_ns() - t0)
+        self.app.call_from_thread(self.update_debug_panel, prof.to_dict(self.traffic_stats.total_packets))
 
-    def parse_packet(self, raw_data):
+    def parse_packet(self, raw_data, ts=None):
+        """Decodifica un paquete y devuelve la fila para la tabla (o None)"""
         try:
-            # Ethernet Header (First 14 bytes)
-            eth_len = 14
-            eth_header = raw_data[:eth_len]
-            eth = struct.unpack('!6s6sH', eth_header)
-            eth_protocol = socket.ntohs(eth[2])
-            
-            # Parse IP packets (Protocol 8)
-            if eth_protocol == 8:
-                # IP Header
-                ip_header = raw_data[eth_len:20+eth_len]
-                iph = struct.unpack('!BBHHHBBH4s4s', ip_header)
-                
-                version_ihl = iph[0]
-                ihl = version_ihl & 0xF
-                iph_length = ihl * 4
-                
-                protocol = iph[6]
-                s_addr = socket.inet_ntoa(iph[8])
-                d_addr = socket.inet_ntoa(iph[9])
-                
-                # Protocol names
-                proto_map = {1: "ICMP", 6: "TCP", 17: "UDP"}
-                proto_name = proto_map.get(protocol, str(protocol))
-                
-                # Add to table (thread safe)
-                timestamp = time.strftime("%H:%M:%S")
-                self.app.call_from_thread(
-                    self.add_packet_to_table,
-                    timestamp, proto_name, s_addr, d_addr, str(len(raw_data)), "IPv4 Packet"
-                )
-                
-        except Exception:
-            pass
+            pkt = packet_decoder.decode(raw_data, self.linktype)
+        except packet_decoder.DecodeError as e:
+            self.profiler.record_error(e)
+            return None
+        
+        if ts is None:
+            ts = time.time()
+        self._last_packet_ts = ts
+        proto_name = pkt.proto_name
+        self.traffic_stats.add(ts, proto_name, pkt.src, pkt.dst, pkt.length)
+        if pkt.l3 in ("IPv4", "IPv6"):
+            self.flow_tracker.update(pkt.proto, pkt.src, pkt.sport, pkt.dst, pkt.dport,
+                                     pkt.length, ts, pkt.tcp_flags)
+        if not self.show_packets:
+            return None
+        
+        src, dst = pkt.src, pkt.dst
+        if pkt.sport or pkt.dport:
+            if pkt.l3 == "IPv6":
+                src, dst = f"[{src}]:{pkt.sport}", f"[{dst}]:{pkt.dport}"
+            else:
+                src, dst = f"{src}:{pkt.sport}", f"{dst}:{pkt.dport}"
+        
+        timestamp = time.strftime("%H:%M:%S", time.localtime(ts))
+        return (timestamp, proto_name, src, dst, str(pkt.length), pkt.info())
 
-    def add_packet_to_table(self, *args):
-        table = self.query_one(DataTable)
-        table.add_row(*args)
-        self.packet_count += 1
-        self.query_one("#lbl-count", Label).update(f"   Total Paquetes: {self.packet_count}")
+    def add_packets_to_table(self, rows):
+        table = self.query_one("#packets-table", DataTable)
+        if table.row_count + len(rows) > self.MAX_PACKET_ROWS:
+            table.clear()
+        for row in rows:
+            table.add_row(*row)
         
         # Auto scroll
-        if self.packet_count % 5 == 0:
-            table.scroll_end(animate=False)
+        table.scroll_end(animate=False)
+
+    def update_count_label(self):
+        self.query_one("#lbl-count", Label).update(
+            f"   Total Paquetes: {self.packet_count}  |  {self.packets_per_second:,.0f} paq/s  |  Flujos: {self.flow_count}"
+        )
+
+    def update_stats_panel(self, stats):
+        """Pinta las estadísticas deslizantes (protocolos, hosts y tamaños)"""
+        self.packet_count = stats['total_packets']
+        self.packets_per_second = sum(pps for pps, _, _ in stats['rates'].values())
+        self.update_count_label()
+        
+        proto_table = self.query_one("#proto-table", DataTable)
+        proto_table.clear()
+        for name, (pps, bps, total) in sorted(stats['rates'].items(), key=lambda item: item[1][1], reverse=True):
+            proto_table.add_row(name, f"{pps:,.1f}", self.format_bytes(bps) + "/s", f"{total:,}")
+        
+        for table_id, hosts in (("#src-table", stats['src_hosts']), ("#dst-table", stats['dst_hosts'])):
+            table = self.query_one(table_id, DataTable)
+            table.clear()
+            for host, nbytes in hosts:
+                table.add_row(host, self.format_bytes(nbytes))
+        
+        sizes = stats['sizes']
+        peak = max(sizes) or 1
+        lines = ["[bold]Tamaño de paquete (último minuto)[/]"]
+        for label, count in zip(SIZE_LABELS, sizes):
+            bar = "█" * int(30 * count / peak)
+            lines.append(f"{label:>10} │{bar:<30} {count:,}")
+        self.query_one("#size-hist", Static).update("\n".join(lines))
+
+    def update_debug_panel(self, counters):
+        """Pinta los contadores de captura (ver capture_profiler)"""
+        self.counters = counters
+        self.query_one("#debug-panel", Static).update(format_report(counters))
+
+    def update_flows_table(self, top, total_flows):
+        table = self.query_one("#flows-table", DataTable)
+        table.clear()
+        for proto, src, sport, dst, dport, packets, nbytes, first, last, state in top:
+            proto_name = packet_decoder.PROTO_NAMES.get(proto, str(proto))
+            if sport or dport:
+                src, dst = f"{src}:{sport}", f"{dst}:{dport}"
+            table.add_row(proto_name, src, dst, f"{packets:,}", self.format_bytes(nbytes),
+                          f"{last - first:.1f}s", state or "-")
+        self.flow_count = total_flows
+        self.update_count_label()
+
+    @staticmethod
+    def format_bytes(bytes_value: float) -> str:
+        """Formatea bytes a unidades legibles"""
+        value = float(bytes_value)
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if value < 1024.0:
+                return f"{value:.2f} {unit}"
+            value /= 1024.0
+        return f"{value:.2f} TB"
 
     def get_local_ip(self):
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -218,7 +611,9 @@ class PacketSnifferApp(App):
         return IP
 
 def main():
-    app = PacketSnifferApp()
+    # Modo offline: python packet_sniffer.py captura.pcap
+    offline_file = sys.argv[1] if len(sys.argv) > 1 else None
+    app = PacketSnifferApp(offline_file=offline_file)
     app.run()
 
 if __name__ == "__main__":
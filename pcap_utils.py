@@ -0,0 +1,311 @@
+"""
+Utilidades para escribir y leer capturas en formato pcap / pcapng
+"""
+
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+
+# Tipos de enlace (http://www.tcpdump.org/linktypes.html)
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+
+PCAP_MAGIC_US = 0xA1B2C3D4
+PCAP_MAGIC_NS = 0xA1B23C4D
+
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+# Cabeceras precompiladas (little endian al escribir)
+_PCAP_GLOBAL = struct.Struct('<IHHiIII')
+_PCAP_RECORD = struct.Struct('<IIII')
+_PCAPNG_SHB = struct.Struct('<IIIHHqI')
+_PCAPNG_IDB = struct.Struct('<IIHHII')
+_PCAPNG_EPB = struct.Struct('<IIIIIII')
+_PCAPNG_TRAILER = struct.Struct('<I')
+
+# Longitud mínima de cada bloque pcapng (cabecera fija + longitud final)
+_PCAPNG_MIN_LEN = {PCAPNG_SHB: 28, PCAPNG_IDB: 20, PCAPNG_EPB: 32, PCAPNG_SPB: 16}
+
+
+class PcapWriter:
+    """
+    Escritor de capturas pcap/pcapng con escritura por lotes y rotación
+
+    Los paquetes se acumulan en un buffer en memoria y se vuelcan al disco
+    cuando superan `buffer_size` bytes, de modo que cada paquete no cuesta
+    una llamada al sistema. Con `rotate_bytes` o `rotate_seconds` se abre un
+    archivo nuevo (nombre_001.pcap, nombre_002.pcap...) al superar el límite.
+    """
+
+    def __init__(self, path, fmt: Optional[str] = None, linktype: int = LINKTYPE_ETHERNET,
+                 snaplen: int = 65535, buffer_size: int = 1 << 20,
+                 rotate_bytes: int = 0, rotate_seconds: float = 0):
+        self.path = Path(path)
+        if fmt is None:
+            fmt = "pcapng" if self.path.suffix.lower() == ".pcapng" else "pcap"
+        if fmt not in ("pcap", "pcapng"):
+            raise ValueError(f"Formato no soportado: {fmt}")
+        self.fmt = fmt
+        self.linktype = linktype
+        self.snaplen = snaplen
+        self.buffer_size = buffer_size
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+
+        self.packets_written = 0
+        self.files_written = []
+        self._file_index = 0
+        self._fd = None
+        self._buf = bytearray()
+        self._file_bytes = 0
+        self._file_started = 0.0
+        self._open_next()
+
+    def _current_path(self) -> Path:
+        """Ruta del archivo actual (con sufijo numérico si hay rotación)"""
+        if not (self.rotate_bytes or self.rotate_seconds):
+            return self.path
+        return self.path.with_name(f"{self.path.stem}_{self._file_index:03d}{self.path.suffix}")
+
+    def _open_next(self):
+        """Cierra el archivo actual (si lo hay) y abre el siguiente"""
+        if self._fd is not None:
+            self.flush()
+            os.close(self._fd)
+        self._file_index += 1
+        current = self._current_path()
+        self._fd = os.open(current, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.files_written.append(current)
+        self._file_bytes = 0
+        self._file_started = time.monotonic()
+        self._buf += self._file_header()
+
+    def _file_header(self) -> bytes:
+        if self.fmt == "pcap":
+            return _PCAP_GLOBAL.pack(PCAP_MAGIC_US, 2, 4, 0, 0, self.snaplen, self.linktype)
+
+        # Section Header Block sin opciones (longitud de sección desconocida = -1)
+        shb = _PCAPNG_SHB.pack(PCAPNG_SHB, 28, PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1, 28)
+        # Interface Description Block sin opciones (resolución por defecto: µs)
+        idb = _PCAPNG_IDB.pack(PCAPNG_IDB, 20, self.linktype, 0, self.snaplen, 20)
+        return shb + idb
+
+    def write(self, data, ts: Optional[float] = None):
+        """Añade un paquete al buffer; vuelca al disco si es necesario"""
+        if self._fd is None:
+            raise ValueError("El escritor pcap está cerrado")
+        if ts is None:
+            ts = time.time()
+
+        if (self.rotate_seconds and time.monotonic() - self._file_started >= self.rotate_seconds) or \
+           (self.rotate_bytes and self._file_bytes >= self.rotate_bytes):
+            self._open_next()
+
+        orig_len = len(data)
+        cap_len = min(orig_len, self.snaplen)
+        sec = int(ts)
+        usec = int((ts - sec) * 1_000_000)
+
+        if self.fmt == "pcap":
+            self._buf += _PCAP_RECORD.pack(sec, usec, cap_len, orig_len)
+            self._buf += data[:cap_len]
+            written = _PCAP_RECORD.size + cap_len
+        else:
+            padding = (-cap_len) & 3
+            block_len = _PCAPNG_EPB.size + cap_len + padding + _PCAPNG_TRAILER.size
+            stamp = sec * 1_000_000 + usec
+            self._buf += _PCAPNG_EPB.pack(PCAPNG_EPB, block_len, 0,
+                                          stamp >> 32, stamp & 0xFFFFFFFF, cap_len, orig_len)
+            self._buf += data[:cap_len]
+            self._buf += b'\x00' * padding
+            self._buf += _PCAPNG_TRAILER.pack(block_len)
+            written = block_len
+
+        self._file_bytes += written
+        self.packets_written += 1
+        if len(self._buf) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Vuelca el buffer pendiente al disco"""
+        if self._fd is None or not self._buf:
+            return
+        view = memoryview(self._buf)
+        while view:
+            n = os.write(self._fd, view)
+            view = view[n:]
+        view.release()
+        self._buf.clear()
+
+    def close(self):
+        """Vuelca lo pendiente y cierra el archivo"""
+        if self._fd is None:
+            return
+        self.flush()
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PcapReader:
+    """
+    Lector de capturas pcap/pcapng mediante mmap
+
+    Los paquetes se devuelven como memoryview sobre el archivo mapeado, sin
+    copias. Las vistas solo son válidas mientras el lector siga abierto.
+    En pcapng cada interfaz puede tener su tipo de enlace: `linktype` es el
+    de la primera interfaz al abrir y, durante la iteración, el de la
+    interfaz del último paquete devuelto. Un bloque mal formado termina la
+    lectura como si fuera el final del archivo.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.linktype = LINKTYPE_ETHERNET
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < 24:
+            self._file.close()
+            raise ValueError("Archivo demasiado pequeño para ser una captura")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic_le = struct.unpack_from('<I', self._view, 0)[0]
+        magic_be = struct.unpack_from('>I', self._view, 0)[0]
+        if magic_le == PCAPNG_SHB:
+            self.fmt = "pcapng"
+            for block_type, endian, offset, _ in self._pcapng_blocks():
+                if block_type == PCAPNG_IDB:
+                    self.linktype = struct.unpack_from(endian + 'H', self._view, offset + 8)[0]
+                    break
+                if block_type in (PCAPNG_EPB, PCAPNG_SPB):
+                    break
+        elif PCAP_MAGIC_US in (magic_le, magic_be) or PCAP_MAGIC_NS in (magic_le, magic_be):
+            self.fmt = "pcap"
+            self._endian = '<' if magic_le in (PCAP_MAGIC_US, PCAP_MAGIC_NS) else '>'
+            magic = magic_le if self._endian == '<' else magic_be
+            self._ts_div = 1_000_000_000 if magic == PCAP_MAGIC_NS else 1_000_000
+            self.linktype = struct.unpack_from(self._endian + 'I', self._view, 20)[0] & 0x0FFFFFFF
+        else:
+            self.close()
+            raise ValueError("Formato de captura no reconocido")
+
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        if self.fmt == "pcap":
+            return self._iter_pcap()
+        return self._iter_pcapng()
+
+    def _iter_pcap(self):
+        view = self._view
+        record = struct.Struct(self._endian + 'IIII')
+        unpack_from = record.unpack_from
+        div = self._ts_div
+        offset = 24
+        end = len(view)
+        while offset + 16 <= end:
+            sec, frac, cap_len, _orig = unpack_from(view, offset)
+            offset += 16
+            if offset + cap_len > end:
+                break  # Último paquete truncado
+            yield sec + frac / div, view[offset:offset + cap_len]
+            offset += cap_len
+
+    def _pcapng_blocks(self):
+        """Recorre los bloques pcapng: (tipo, endianness, offset, longitud)"""
+        view = self._view
+        end = len(view)
+        offset = 0
+        endian = '<'
+        header = struct.Struct('<II')
+        while offset + 12 <= end:
+            block_type = struct.unpack_from(endian + 'I', view, offset)[0]
+            if block_type == PCAPNG_SHB:
+                bom = struct.unpack_from('<I', view, offset + 8)[0]
+                endian = '<' if bom == PCAPNG_BYTE_ORDER_MAGIC else '>'
+                header = struct.Struct(endian + 'II')
+            _, block_len = header.unpack_from(view, offset)
+            if block_len < _PCAPNG_MIN_LEN.get(block_type, 12) or offset + block_len > end:
+                break  # Bloque truncado o mal formado
+            yield block_type, endian, offset, block_len
+            offset += block_len
+
+    def _iter_pcapng(self):
+        view = self._view
+        epb = struct.Struct('<IIIII')
+        spb = struct.Struct('<I')
+        interfaces = []  # (linktype, divisor) por interfaz de la sección actual
+
+        for block_type, endian, offset, block_len in self._pcapng_blocks():
+            body = offset + 8
+            if block_type == PCAPNG_SHB:
+                epb = struct.Struct(endian + 'IIIII')
+                spb = struct.Struct(endian + 'I')
+                interfaces = []
+            elif block_type == PCAPNG_IDB:
+                linktype = struct.unpack_from(endian + 'H', view, body)[0]
+                interfaces.append((linktype, self._idb_divisor(view, body + 8, offset + block_len - 4, endian)))
+            elif block_type == PCAPNG_EPB:
+                iface, ts_high, ts_low, cap_len, _orig = epb.unpack_from(view, body)
+                if iface >= len(interfaces):
+                    continue  # Paquete de una interfaz no declarada
+                self.linktype, div = interfaces[iface]
+                cap_len = min(cap_len, block_len - 32)
+                data = body + 20
+                yield ((ts_high << 32) | ts_low) / div, view[data:data + cap_len]
+            elif block_type == PCAPNG_SPB:
+                if not interfaces:
+                    continue
+                self.linktype = interfaces[0][0]
+                orig_len = spb.unpack_from(view, body)[0]
+                cap_len = min(orig_len, block_len - 16)
+                yield 0.0, view[body + 4:body + 4 + cap_len]
+
+    @staticmethod
+    def _idb_divisor(view, offset: int, end: int, endian: str) -> int:
+        """Lee la opción if_tsresol de un IDB (por defecto microsegundos)"""
+        opt = struct.Struct(endian + 'HH')
+        while offset + 4 <= end:
+            code, length = opt.unpack_from(view, offset)
+            if code == 0:
+                break
+            if offset + 4 + length > end:
+                break
+            if code == 9 and length >= 1:
+                resol = view[offset + 4]
+                return 2 ** (resol & 0x7F) if resol & 0x80 else 10 ** resol
+            offset += 4 + length + ((-length) & 3)
+        return 1_000_000
+
+    def close(self):
+        """Libera el mapeo de memoria y cierra el archivo"""
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, '_mm', None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Aún hay vistas de paquetes vivas; se liberará con el GC
+                pass
+            self._mm = None
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
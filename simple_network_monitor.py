@@ -1,13 +1,19 @@
 """
 Muestra consumo de datos y procesos que más usan la red
+
+Cada tick usa una sola muestra del muestreador compartido para los totales y
+una sola enumeración de sockets de todo el sistema (sock_diag.ProcessTraffic),
+agrupada por PID, para la tabla de procesos.
 """
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical
 from textual.widgets import Header, Footer, Static, Button, DataTable, ProgressBar
 from textual.binding import Binding
-import psutil
 import time
-from datetime import datetime
+from typing import Dict, List
+from net_sampler import get_sampler
+from sock_diag import ProcessTraffic
+from table_utils import sync_table
 
 class SimpleNetworkMonitor(App):
     """Monitor simple de uso de red"""
@@ -54,9 +60,12 @@ class SimpleNetworkMonitor(App):
         self.start_time = time.time()
         self.start_bytes_sent = 0
         self.start_bytes_recv = 0
-        self.last_bytes_sent = 0
-        self.last_bytes_recv = 0
         self.update_timer = None
+        self.sampler = get_sampler()
+        self.traffic = None         # Se crea en el primer hilo de trabajo
+        self.collecting = False
+        # Bytes de la sesión por programa: nombre -> [enviados, recibidos]
+        self.process_totals: Dict[str, List[int]] = {}
     
     def compose(self) -> ComposeResult:
         yield Header(show_clock=True)
@@ -78,14 +87,19 @@ class SimpleNetworkMonitor(App):
         table.cursor_type = "row"
         
         # Inicializar contadores
-        net_io = psutil.net_io_counters()
+        net_io = self.sampler.snapshot().total
         self.start_bytes_sent = net_io.bytes_sent
         self.start_bytes_recv = net_io.bytes_recv
-        self.last_bytes_sent = net_io.bytes_sent
-        self.last_bytes_recv = net_io.bytes_recv
         
-        # Iniciar actualización automática
-        self.set_interval(1.0, self.update_stats)
+        # Las muestras llegan del muestreador compartido (una por segundo)
+        self.sampler.subscribe(self.on_snapshot)
+    
+    def on_unmount(self) -> None:
+        self.sampler.unsubscribe(self.on_snapshot)
+    
+    def on_snapshot(self, snapshot) -> None:
+        """Recibe una muestra en el hilo del muestreador"""
+        self.call_from_thread(self.update_stats, snapshot)
     
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Manejar clic en botones"""
@@ -95,12 +109,11 @@ class SimpleNetworkMonitor(App):
     def action_reset(self) -> None:
         """Reiniciar contadores"""
         self.start_time = time.time()
-        net_io = psutil.net_io_counters()
-        self.start_bytes_sent = net_io.bytes_sent
-        self.start_bytes_recv = net_io.bytes_recv
-        self.last_bytes_sent = net_io.bytes_sent
-        self.last_bytes_recv = net_io.bytes_recv
-        self.update_stats()
+        snapshot = self.sampler.snapshot()
+        self.start_bytes_sent = snapshot.total.bytes_sent
+        self.start_bytes_recv = snapshot.total.bytes_recv
+        self.process_totals.clear()
+        self.update_stats(snapshot)
     
     def format_bytes(self, bytes_val: int) -> str:
         """Formatear bytes en unidades legibles"""
@@ -119,28 +132,20 @@ class SimpleNetworkMonitor(App):
             bytes_per_sec /= 1024.0
         return f"{bytes_per_sec:.2f} TB/s"
     
-    def update_stats(self) -> None:
-        """Actualizar estadísticas"""
+    def update_stats(self, snapshot) -> None:
+        """Actualizar estadísticas con una muestra del muestreador"""
         stats_widget = self.query_one("#stats", Static)
-        table = self.query_one("#processes-table", DataTable)
         
-        # Obtener estadísticas actuales
-        net_io = psutil.net_io_counters()
+        net_io = snapshot.total
         
         # Calcular totales desde inicio
         total_sent = net_io.bytes_sent - self.start_bytes_sent
         total_recv = net_io.bytes_recv - self.start_bytes_recv
         total = total_sent + total_recv
         
-        # Calcular velocidad actual
-        bytes_sent_diff = net_io.bytes_sent - self.last_bytes_sent
-        bytes_recv_diff = net_io.bytes_recv - self.last_bytes_recv
-        
-        upload_speed = bytes_sent_diff  # bytes por segundo
-        download_speed = bytes_recv_diff
-        
-        self.last_bytes_sent = net_io.bytes_sent
-        self.last_bytes_recv = net_io.bytes_recv
+        # Velocidad actual (ya calculada por el muestreador)
+        upload_speed = snapshot.total_rates.bytes_sent
+        download_speed = snapshot.total_rates.bytes_recv
         
         # Tiempo transcurrido
         elapsed = time.time() - self.start_time
@@ -156,7 +161,7 @@ class SimpleNetworkMonitor(App):
 [bold green]📤 SUBIDA:[/]
   Velocidad actual: [cyan]{self.format_speed(upload_speed)}[/]
   Total sesión: [green]{self.format_bytes(total_sent)}[/]
-  Paquetes: {net_io.packets_sent - psutil.net_io_counters().packets_sent + net_io.packets_sent:,}
+  Paquetes: {net_io.packets_sent:,}
 
 [bold blue]📥 BAJADA:[/]
   Velocidad actual: [cyan]{self.format_speed(download_speed)}[/]
@@ -171,58 +176,136 @@ class SimpleNetworkMonitor(App):
         
         stats_widget.update(stats_text)
         
-        # Actualizar tabla de procesos
-        table.clear()
-        
+        # La tabla de procesos se lee en un hilo para no frenar la interfaz
+        self.update_processes()
+    
+    def update_processes(self) -> None:
+        """Lanza la lectura de procesos en un hilo (si no hay otra en curso)"""
+        if self.collecting:
+            return
+        self.collecting = True
+        self.run_worker(self.collect_processes, thread=True)
+    
+    def collect_processes(self) -> None:
+        """Una enumeración de sockets para todo el sistema (hilo de trabajo)"""
         try:
-            # Obtener procesos con conexiones de red
-            processes_net = {}
-            
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    connections = proc.net_connections()
-                    if connections:
-                        io = proc.io_counters()
-                        pid = proc.info['pid']
-                        name = proc.info['name']
-                        
-                        # Acumular I/O de red (aproximación)
-                        if name not in processes_net:
-                            processes_net[name] = {
-                                'pid': pid,
-                                'read': io.read_bytes,
-                                'write': io.write_bytes,
-                                'total': io.read_bytes + io.write_bytes
-                            }
-                        else:
-                            processes_net[name]['read'] += io.read_bytes
-                            processes_net[name]['write'] += io.write_bytes
-                            processes_net[name]['total'] += io.read_bytes + io.write_bytes
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            # Ordenar por total y tomar top 5
-            top_processes = sorted(
-                processes_net.items(),
-                key=lambda x: x[1]['total'],
-                reverse=True
-            )[:5]
-            
-            for name, data in top_processes:
-                table.add_row(
-                    name[:20],
-                    str(data['pid']),
-                    self.format_bytes(data['write']),
-                    self.format_bytes(data['read']),
-                    self.format_bytes(data['total'])
-                )
-            
-            if not top_processes:
-                table.add_row("-", "-", "-", "-", "[dim]No hay procesos con tráfico de red[/]")
-                
+            if self.traffic is None:
+                self.traffic = ProcessTraffic()
+            processes_data = self.traffic.sample()
         except Exception as e:
-            table.add_row("-", "-", "-", "-", f"[red]Error: {str(e)}[/]")
+            self.collecting = False
+            self.call_from_thread(self.show_processes, None, str(e))
+            return
+        self.collecting = False
+        self.call_from_thread(self.show_processes, processes_data)
+    
+    def show_processes(self, processes_data, error: str = "") -> None:
+        """Suma el tráfico por programa y pinta los 5 que más han usado la red"""
+        table = self.query_one("#processes-table", DataTable)
+        if processes_data is None:
+            sync_table(table, {"-": ("-", "-", "-", "-", f"[red]Error: {error}[/]")})
+            return
+        
+        # Agrupar por nombre: los workers de un mismo programa se suman
+        programs = {}
+        for proc in processes_data:
+            entry = programs.setdefault(proc['name'], [proc['pid'], 0, 0])
+            entry[1] += 1
+            entry[2] += proc['connections']
+            totals = self.process_totals.setdefault(proc['name'], [0, 0])
+            totals[0] += proc['bytes_sent']
+            totals[1] += proc['bytes_recv']
+        
+        has_bytes = self.traffic.has_bytes
+        if has_bytes:
+            ranking = lambda name: sum(self.process_totals[name])
+        else:
+            ranking = lambda name: programs[name][2]
+        top_processes = sorted(programs, key=ranking, reverse=True)[:5]
+        
+        rows = {}
+        for name in top_processes:
+            pid, count, connections = programs[name]
+            sent, recv = self.process_totals[name]
+            rows[name] = (
+                name[:20],
+                f"{pid} (+{count - 1})" if count > 1 else str(pid),
+                self.format_bytes(sent) if has_bytes else "N/D",
+                self.format_bytes(recv) if has_bytes else "N/D",
+                self.format_bytes(sent + recv) if has_bytes else f"{connections} conexiones",
+            )
+        if not rows:
+            rows["-"] = ("-", "-", "-", "-", "[dim]No hay procesos con tráfico de red[/]")
+        sync_table(table, rows, ordered=True)
+
+
+def old_process_scan() -> Dict[str, dict]:
+    """Recorrido anterior (un net_connections() por proceso), solo para comparar"""
+    import psutil
+    processes_net = {}
+    for proc in psutil.process_iter(['pid', 'name']):
+        try:
+            if proc.net_connections():
+                io = proc.io_counters()
+                entry = processes_net.setdefault(proc.info['name'], {'pid': proc.info['pid'], 'total': 0})
+                entry['total'] += io.read_bytes + io.write_bytes
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return processes_net
+
+
+def benchmark(counts: List[int]) -> None:
+    """CPU por tick de la tabla de procesos con cada vez más procesos con sockets"""
+    import os
+    import signal
+    import socket
+    
+    children = []
+    
+    def spawn(count: int):
+        # Procesos hijos en espera, cada uno con un socket UDP propio
+        while len(children) < count:
+            ready_r, ready_w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(ready_r)
+                held = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                held.bind(("127.0.0.1", 0))
+                os.write(ready_w, b"1")
+                signal.pause()
+                os._exit(0)
+            os.close(ready_w)
+            os.read(ready_r, 1)
+            os.close(ready_r)
+            children.append(pid)
+    
+    def per_tick(fn, ticks: int = 3) -> float:
+        fn()    # Primera vuelta fuera de la medida (nombres y mapa de inodos)
+        start = time.process_time()
+        for _ in range(ticks):
+            fn()
+        return (time.process_time() - start) / ticks * 1000
+    
+    try:
+        traffic = ProcessTraffic()
+        for count in counts:
+            spawn(count)
+            new = per_tick(traffic.sample)
+            old = per_tick(old_process_scan)
+            print(f"{count:>6} procesos con sockets: una enumeración {new:8.1f} ms CPU/tick, "
+                  f"net_connections() por proceso {old:8.1f} ms CPU/tick")
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
 
 if __name__ == "__main__":
-    app = SimpleNetworkMonitor()
-    app.run()
+    import sys
+    
+    # Benchmark: python simple_network_monitor.py --benchmark [procesos...]
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        benchmark([int(arg) for arg in sys.argv[2:]] or [100, 300, 1000])
+    else:
+        app = SimpleNetworkMonitor()
+        app.run()
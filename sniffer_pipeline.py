@@ -0,0 +1,499 @@
+"""
+Pipeline multiproceso de captura y decodificación para tasas altas de paquetes
+
+    proceso de captura --(anillos en memoria compartida)--> N decodificadores
+    decodificadores --(agregados cada segundo, multiprocessing.Queue)--> interfaz
+
+El proceso de captura recibe las tramas directamente dentro de la memoria
+compartida (recvfrom_into). Abre un socket por anillo, todos en un grupo
+PACKET_FANOUT_HASH: el kernel reparte las tramas con un hash simétrico del
+flujo, así que las dos direcciones de una conexión van siempre al mismo
+decodificador. Cada decodificador agrega sus flujos completos con FlowTracker
+y publica solo resúmenes, así que la interfaz nunca ve paquetes
+individuales. Solo Linux (AF_PACKET).
+
+Benchmark (requiere root para el par veth):
+
+    python sniffer_pipeline.py [decodificadores] [segundos]
+"""
+
+import multiprocessing as mp
+import os
+import select
+import socket
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import packet_decoder
+from flow_tracker import FlowTracker
+from traffic_stats import TrafficStats, merge_stats_snapshots
+from pcap_utils import LINKTYPE_ETHERNET
+
+
+# Índices de escritura/lectura (uint64) en líneas de caché distintas. Se
+# acceden con memoryview.cast('Q') para que cada actualización sea una única
+# escritura de 8 bytes: struct.pack_into pone el destino a cero antes de
+# escribir y el otro proceso podría leer un índice 0 a medias.
+_WRITE_INDEX = 0
+_READ_INDEX = 8
+_HEADER_SIZE = 128
+# Cabecera de cada hueco: longitud capturada, longitud real y marca de tiempo
+_SLOT = struct.Struct('=IId')
+_SLOT_HEADER = 16
+
+# Reparto por flujo en el kernel (linux/if_packet.h)
+SOL_PACKET = 263
+PACKET_FANOUT = 18
+PACKET_FANOUT_HASH = 0
+PACKET_FANOUT_FLAG_DEFRAG = 0x8000  # Los fragmentos IP se juntan antes del hash
+
+
+class FrameRing:
+    """
+    Anillo de tramas en memoria compartida con un único productor y un único
+    consumidor. Cada hueco tiene tamaño fijo; las tramas más largas se
+    recortan, pero se guarda su longitud real para contar los bytes.
+    """
+
+    def __init__(self, name: Optional[str] = None, slots: int = 16384, slot_size: int = 2048):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stride = _SLOT_HEADER + slot_size
+        size = _HEADER_SIZE + slots * self.stride
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.buf = self.shm.buf
+        self.name = self.shm.name
+        self._index = self.buf[:_HEADER_SIZE].cast('Q')
+        self._write = self._index[_WRITE_INDEX]
+        self._read = self._index[_READ_INDEX]
+
+    # --- Productor ---
+
+    def reserve(self) -> Optional[memoryview]:
+        """Devuelve el hueco libre donde escribir la siguiente trama, o None si está lleno"""
+        if self._write - self._index[_READ_INDEX] >= self.slots:
+            return None
+        offset = _HEADER_SIZE + (self._write % self.slots) * self.stride + _SLOT_HEADER
+        return self.buf[offset:offset + self.slot_size]
+
+    def commit(self, length: int, ts: float, wire_length: int = 0):
+        """Publica la trama escrita en el hueco reservado (`length` bytes de `wire_length`)"""
+        offset = _HEADER_SIZE + (self._write % self.slots) * self.stride
+        _SLOT.pack_into(self.buf, offset, length, max(length, wire_length), ts)
+        self._write += 1
+        # El índice se publica después de los datos
+        self._index[_WRITE_INDEX] = self._write
+
+    def push(self, frame, ts: float) -> bool:
+        """Copia una trama al anillo (para generadores y pruebas)"""
+        slot = self.reserve()
+        if slot is None:
+            return False
+        length = min(len(frame), self.slot_size)
+        slot[:length] = frame[:length]
+        slot.release()
+        self.commit(length, ts, len(frame))
+        return True
+
+    # --- Consumidor ---
+
+    def read_batch(self, max_frames: int = 512) -> List[Tuple[float, memoryview, int]]:
+        """
+        Devuelve hasta `max_frames` tramas pendientes (marca de tiempo, vista
+        sobre la memoria compartida, longitud real). Los huecos se liberan con
+        release_batch().
+        """
+        end = min(self._index[_WRITE_INDEX], self._read + max_frames)
+        frames = []
+        buf = self.buf
+        for index in range(self._read, end):
+            offset = _HEADER_SIZE + (index % self.slots) * self.stride
+            length, wire_length, ts = _SLOT.unpack_from(buf, offset)
+            start = offset + _SLOT_HEADER
+            frames.append((ts, buf[start:start + length], wire_length))
+        self._pending = end
+        return frames
+
+    def release_batch(self, frames: List[Tuple[float, memoryview, int]]):
+        for _, view, _ in frames:
+            view.release()
+        self._read = self._pending
+        self._index[_READ_INDEX] = self._read
+
+    def close(self):
+        self._index.release()
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _fanout_sockets(interface: Optional[str], count: int) -> List[socket.socket]:
+    """Un socket AF_PACKET por anillo en el mismo grupo de reparto por flujo"""
+    group = os.getpid() & 0xFFFF
+    sockets = []
+    try:
+        for _ in range(count):
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.ntohs(3))
+            sockets.append(sock)
+            # Buffer del kernel amplio para absorber ráfagas mientras se vacían los anillos
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024 * 1024)
+            if interface:
+                sock.bind((interface, 0))
+            if count > 1:
+                mode = PACKET_FANOUT_HASH | PACKET_FANOUT_FLAG_DEFRAG
+                sock.setsockopt(SOL_PACKET, PACKET_FANOUT, struct.pack("=I", group | (mode << 16)))
+            sock.setblocking(False)
+    except OSError:
+        for sock in sockets:
+            sock.close()
+        raise
+    return sockets
+
+
+def _capture_main(ring_names, slots, slot_size, interface, stop_event, counters):
+    """Proceso de captura: cada socket del grupo de reparto llena su anillo"""
+    rings = [FrameRing(name, slots, slot_size) for name in ring_names]
+    sockets: List[socket.socket] = []
+    scratch = bytearray(65535)
+    received = dropped = 0
+    try:
+        sockets = _fanout_sockets(interface, len(rings))
+        ring_of = {sock.fileno(): (sock, ring) for sock, ring in zip(sockets, rings)}
+        while not stop_event.is_set():
+            ready, _, _ = select.select(list(ring_of), [], [], 0.5)
+            if not ready:
+                # Sin tráfico: publicar los contadores igualmente
+                counters[0] = received
+                counters[1] = dropped
+                continue
+            for fd in ready:
+                sock, ring = ring_of[fd]
+                # Se vacía el socket por tandas para no dejar esperando a los demás
+                for _ in range(256):
+                    slot = ring.reserve()
+                    try:
+                        if slot is None:
+                            # Anillo lleno: se consume la trama para no bloquear al kernel
+                            sock.recv_into(scratch)
+                            dropped += 1
+                            continue
+                        # Con MSG_TRUNC devuelve la longitud real aunque la trama
+                        # (GRO, jumbo) no quepa en el hueco y se recorte
+                        wire_length, _ = sock.recvfrom_into(slot, 0, socket.MSG_TRUNC)
+                    except BlockingIOError:
+                        break
+                    finally:
+                        if slot is not None:
+                            slot.release()
+                    ring.commit(min(wire_length, slot_size), time.time(), wire_length)
+                    received += 1
+                    if (received & 0x3FF) == 0:
+                        counters[0] = received
+                        counters[1] = dropped
+    finally:
+        counters[0] = received
+        counters[1] = dropped
+        for sock in sockets:
+            sock.close()
+        for ring in rings:
+            ring.close()
+
+
+def flow_shard(pkt, count: int) -> int:
+    """
+    Decodificador de un paquete ya decodificado con un hash simétrico de su
+    5-tupla (las dos direcciones van al mismo); el equivalente en Python del
+    reparto del kernel, para inyectar tramas en los anillos
+    """
+    a, b = (str(pkt.src), pkt.sport or 0), (str(pkt.dst), pkt.dport or 0)
+    return hash((pkt.proto, a, b) if a <= b else (pkt.proto, b, a)) % count
+
+
+def _decoder_main(index, ring_name, slots, slot_size, linktype, stop_event, out_queue,
+                  interval, top_n):
+    """Proceso decodificador: decodifica su anillo y publica agregados"""
+    ring = FrameRing(ring_name, slots, slot_size)
+    tracker = FlowTracker()
+    stats = TrafficStats()
+    decode = packet_decoder.decode
+    DecodeError = packet_decoder.DecodeError
+    frames_in = decoded = errors = total_bytes = 0
+    protocols: Dict[str, int] = {}
+    last_ts = 0.0
+    next_publish = time.monotonic() + interval
+
+    def snapshot():
+        return {
+            'decoder': index,
+            'frames': frames_in,
+            'decoded': decoded,
+            'errors': errors,
+            'bytes': total_bytes,
+            'protocols': dict(protocols),
+            'flow_count': len(tracker),
+            'flows': tracker.top_talkers(top_n),
+            'stats': stats.snapshot(now=last_ts or None),
+        }
+
+    try:
+        while not stop_event.is_set():
+            batch = ring.read_batch()
+            for ts, frame, wire_length in batch:
+                frames_in += 1
+                try:
+                    pkt = decode(frame, linktype)
+                except DecodeError:
+                    errors += 1
+                    continue
+                decoded += 1
+                # Los bytes son los de la trama entera, no los que caben en el hueco
+                total_bytes += wire_length
+                last_ts = ts
+                name = pkt.proto_name
+                protocols[name] = protocols.get(name, 0) + 1
+                stats.add(ts, name, pkt.src, pkt.dst, wire_length)
+                if pkt.l3 == "IPv4" or pkt.l3 == "IPv6":
+                    tracker.update(pkt.proto, pkt.src, pkt.sport, pkt.dst, pkt.dport,
+                                   wire_length, ts, pkt.tcp_flags)
+            ring.release_batch(batch)
+            if not batch:
+                time.sleep(0.001)
+
+            now = time.monotonic()
+            if now >= next_publish:
+                next_publish = now + interval
+                if last_ts:
+                    tracker.expire(last_ts)
+                out_queue.put(snapshot())
+        # Último agregado al parar
+        out_queue.put(snapshot())
+    finally:
+        ring.close()
+
+
+def merge_snapshots(snapshots: Dict[int, dict], top_n: int = 50) -> Tuple[dict, List[Tuple]]:
+    """
+    Combina el último agregado de cada decodificador
+
+    Cada flujo está entero en un solo decodificador (reparto por hash del
+    flujo), así que los recuentos se suman y el top global sale de juntar
+    los top de cada uno.
+
+    Returns:
+        (totales, top de flujos con el formato de FlowRecord.as_tuple)
+    """
+    totals = {'frames': 0, 'decoded': 0, 'errors': 0, 'bytes': 0, 'flow_count': 0, 'protocols': {}}
+    flows: List[Tuple] = []
+    for snap in snapshots.values():
+        for key in ('frames', 'decoded', 'errors', 'bytes', 'flow_count'):
+            totals[key] += snap[key]
+        for name, count in snap['protocols'].items():
+            totals['protocols'][name] = totals['protocols'].get(name, 0) + count
+        flows.extend(snap['flows'])
+    top = sorted(flows, key=lambda f: f[6], reverse=True)[:top_n]
+    totals['stats'] = merge_stats_snapshots([snap['stats'] for snap in snapshots.values()])
+    return totals, [tuple(f) for f in top]
+
+
+class CapturePipeline:
+    """Orquesta el proceso de captura y los decodificadores"""
+
+    def __init__(self, interface: Optional[str] = None, decoders: int = 2,
+                 slots: int = 16384, slot_size: int = 2048,
+                 linktype: int = LINKTYPE_ETHERNET, interval: float = 1.0, top_n: int = 50):
+        self.interface = interface
+        self.decoders = max(1, decoders)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.linktype = linktype
+        self.interval = interval
+        self.top_n = top_n
+        # spawn: no se hereda el estado (hilos, terminal) del proceso de la interfaz
+        self._ctx = mp.get_context("spawn")
+        self.rings: List[FrameRing] = []
+        self.processes = []
+        self.snapshots: Dict[int, dict] = {}
+        self.stop_event = None
+        self.queue = None
+        self.counters = None
+
+    def start(self, capture: bool = True):
+        """Arranca los decodificadores y, si `capture`, el proceso de captura"""
+        # Textual sustituye sys.stdout/sys.stderr por objetos sin descriptor
+        # real y multiprocessing necesita descriptores válidos al lanzar procesos
+        saved = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        try:
+            self._start_processes(capture)
+        finally:
+            sys.stdout, sys.stderr = saved
+
+    def _start_processes(self, capture: bool):
+        ctx = self._ctx
+        self.stop_event = ctx.Event()
+        self.queue = ctx.Queue()
+        self.counters = ctx.Array('Q', 2, lock=False)
+        self.rings = [FrameRing(None, self.slots, self.slot_size) for _ in range(self.decoders)]
+
+        for index, ring in enumerate(self.rings):
+            proc = ctx.Process(
+                target=_decoder_main,
+                args=(index, ring.name, self.slots, self.slot_size, self.linktype,
+                      self.stop_event, self.queue, self.interval, self.top_n),
+                daemon=True,
+            )
+            proc.start()
+            self.processes.append(proc)
+
+        if capture:
+            proc = ctx.Process(
+                target=_capture_main,
+                args=([ring.name for ring in self.rings], self.slots, self.slot_size,
+                      self.interface, self.stop_event, self.counters),
+                daemon=True,
+            )
+            proc.start()
+            self.processes.append(proc)
+
+    def poll(self) -> bool:
+        """Recoge los agregados pendientes sin bloquear; True si hubo novedades"""
+        updated = False
+        while True:
+            try:
+                snap = self.queue.get_nowait()
+            except Exception:
+                break
+            self.snapshots[snap['decoder']] = snap
+            updated = True
+        return updated
+
+    def summary(self) -> Tuple[dict, List[Tuple]]:
+        """Totales combinados más los contadores del proceso de captura"""
+        totals, top = merge_snapshots(self.snapshots, self.top_n)
+        totals['received'] = self.counters[0] if self.counters is not None else 0
+        totals['dropped'] = self.counters[1] if self.counters is not None else 0
+        return totals, top
+
+    def stop(self):
+        if self.stop_event is None:
+            return
+        self.stop_event.set()
+        # Un proceso no termina hasta que se lee lo que ha puesto en la cola:
+        # se vacía mientras se espera y solo después se hace join
+        deadline = time.monotonic() + 5
+        while any(proc.is_alive() for proc in self.processes) and time.monotonic() < deadline:
+            self.poll()
+            time.sleep(0.05)
+        self.poll()
+        for proc in self.processes:
+            proc.join(timeout=0.1)
+            if proc.is_alive():
+                proc.terminate()
+        self.poll()
+        for ring in self.rings:
+            ring.close()
+        self.processes = []
+        self.rings = []
+        self.stop_event = None
+
+
+def _generator_main(interface, duration, stop_event, sent_counter):
+    """Generador de tráfico: envía tramas sintéticas por AF_PACKET lo más rápido posible"""
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW)
+    sock.bind((interface, 0))
+    frames = packet_decoder._sample_frames()
+    send = sock.send
+    sent = 0
+    deadline = time.monotonic() + duration
+    while not stop_event.is_set() and time.monotonic() < deadline:
+        for _ in range(256):
+            for frame in frames:
+                try:
+                    send(frame)
+                except OSError:
+                    # Cola de la interfaz llena; se descarta y se sigue
+                    continue
+                sent += 1
+    sent_counter.value = sent
+    sock.close()
+
+
+def benchmark_veth(decoders: int = 2, duration: float = 5.0):
+    """Mide paquetes/s decodificados con tráfico real por un par veth (requiere root)"""
+    import subprocess
+
+    veth_tx, veth_rx = "cosveth0", "cosveth1"
+    subprocess.run(["ip", "link", "add", veth_tx, "type", "veth", "peer", "name", veth_rx], check=True)
+    try:
+        for iface in (veth_tx, veth_rx):
+            subprocess.run(["ip", "link", "set", iface, "up"], check=True)
+
+        pipeline = CapturePipeline(interface=veth_rx, decoders=decoders, interval=0.5)
+        pipeline.start()
+        time.sleep(1.0)  # Dar tiempo a que arranquen los procesos
+
+        ctx = pipeline._ctx
+        gen_stop = ctx.Event()
+        sent = ctx.Value('Q', 0)
+        generator = ctx.Process(target=_generator_main, args=(veth_tx, duration, gen_stop, sent))
+        start = time.perf_counter()
+        generator.start()
+        generator.join()
+        elapsed = time.perf_counter() - start
+        time.sleep(1.0)  # Vaciar los anillos
+        pipeline.stop()
+        totals, _ = pipeline.summary()
+
+        print(f"Enviados:      {sent.value:,} ({sent.value / elapsed:,.0f} paquetes/s)")
+        print(f"Capturados:    {totals['received']:,} (descartados por anillo lleno: {totals['dropped']:,})")
+        print(f"Decodificados: {totals['decoded']:,} ({totals['decoded'] / elapsed:,.0f} paquetes/s)")
+    finally:
+        subprocess.run(["ip", "link", "del", veth_tx])
+
+
+def benchmark_rings(decoders: int = 2, duration: float = 5.0):
+    """Sin root: inyecta tramas sintéticas directamente en los anillos"""
+    pipeline = CapturePipeline(decoders=decoders, interval=0.5)
+    pipeline.start(capture=False)
+    time.sleep(1.0)
+    frames = packet_decoder._sample_frames()
+    # Cada trama va al anillo de su flujo, como con el reparto del kernel
+    shards = [pipeline.rings[flow_shard(packet_decoder.decode(frame, LINKTYPE_ETHERNET), decoders)]
+              for frame in frames]
+    pushed = dropped = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        for _ in range(1024):
+            index = pushed & 3
+            if shards[index].push(frames[index], 0.0):
+                pushed += 1
+            else:
+                dropped += 1
+    elapsed = time.perf_counter() - start
+    time.sleep(1.0)
+    pipeline.stop()
+    totals, _ = pipeline.summary()
+    print(f"Inyectados:    {pushed:,} ({pushed / elapsed:,.0f} paquetes/s, anillo lleno: {dropped:,})")
+    print(f"Decodificados: {totals['decoded']:,} ({totals['decoded'] / elapsed:,.0f} paquetes/s)")
+
+
+if __name__ == "__main__":
+    decoders = int(sys.argv[1]) if len(sys.argv) > 1 else max(1, (os.cpu_count() or 2) - 1)
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    print(f"Decodificadores: {decoders}, duración: {duration}s")
+    if sys.platform.startswith("linux") and os.geteuid() == 0:
+        benchmark_veth(decoders, duration)
+    else:
+        print("Sin root: benchmark sin veth (tramas inyectadas en los anillos)")
+        benchmark_rings(decoders, duration)
@@ -0,0 +1,608 @@
+"""
+Sockets del sistema vía netlink sock_diag (Linux)
+
+- dump(): una sola petición por familia y protocolo devuelve todos los sockets
+  (con bytes enviados/recibidos de TCP si se pide INET_DIAG_INFO), guardados
+  por columnas en arrays compactos (SocketTable).
+- InodePidMap: relaciona inodos de socket con PIDs leyendo /proc/<pid>/fd; se
+  refresca de forma incremental (solo procesos nuevos, y el resto únicamente
+  si aparece un inodo desconocido).
+- ProcessTraffic: velocidad de red por proceso con una enumeración por tick.
+- ConnectionLister: lista de conexiones con su proceso para netstat_monitor
+  (sock_diag o, si no está disponible, /proc/net/{tcp,udp}{,6}).
+"""
+
+import os
+import socket
+import struct
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import psutil
+
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x01
+NLM_F_DUMP = 0x300
+INET_DIAG_INFO = 2
+
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+
+# Estados TCP del kernel (include/net/tcp_states.h)
+TCP_STATES = {
+    1: "ESTABLISHED", 2: "SYN_SENT", 3: "SYN_RECV", 4: "FIN_WAIT1", 5: "FIN_WAIT2",
+    6: "TIME_WAIT", 7: "CLOSE", 8: "CLOSE_WAIT", 9: "LAST_ACK", 10: "LISTEN", 11: "CLOSING",
+}
+PROTO_NAMES = {IPPROTO_TCP: "tcp", IPPROTO_UDP: "udp"}
+
+_NLMSGHDR = struct.Struct('=IHHII')
+# inet_diag_req_v2: familia, protocolo, extensiones, relleno, estados, inet_diag_sockid
+_DIAG_REQ = struct.Struct('=BBBBI48x')
+# nlmsghdr (longitud y tipo) seguido de inet_diag_msg: familia, estado, timer,
+# retrans, puertos (orden de red), origen, destino, interfaz, cookie, expires,
+# rqueue, wqueue, uid, inodo
+_NL_DIAG_MSG = struct.Struct('=IH10xBBBBHH16s16sI8xIIIII')
+_RTATTR = struct.Struct('=HH')
+# inet_diag_sockid sin interfaz ni cookie: puertos, origen y destino. En UDP
+# la clave se alarga un byte (el primero de la interfaz) para que nunca
+# coincida con la de un socket TCP con los mismos extremos
+_SOCKID_START = 20
+_KEY_END = {IPPROTO_TCP: 56, IPPROTO_UDP: 57}
+# tcp_info: bytes_acked y bytes_received (desplazamiento 120 y 128, Linux >= 4.2)
+_TCP_BYTES = struct.Struct('=QQ')
+_TCP_BYTES_OFFSET = 120
+
+_ntohs = socket.ntohs
+
+_PROC_NET_FILES = {
+    (IPPROTO_TCP, socket.AF_INET): "tcp", (IPPROTO_TCP, socket.AF_INET6): "tcp6",
+    (IPPROTO_UDP, socket.AF_INET): "udp", (IPPROTO_UDP, socket.AF_INET6): "udp6",
+}
+# /proc/net escribe las IPs como palabras de 32 bits en el orden del host
+_WORDS = {4: struct.Struct('=I'), 16: struct.Struct('=4I')}
+
+
+class SocketTable:
+    """Sockets guardados por columnas (una posición por socket)"""
+
+    __slots__ = ('family', 'proto', 'state', 'sport', 'dport', 'inode', 'uid',
+                 'rqueue', 'wqueue', 'bytes_acked', 'bytes_received', 'src', 'dst', 'key')
+
+    def __init__(self):
+        self.family = array('B')
+        self.proto = array('B')
+        self.state = array('B')
+        self.sport = array('H')
+        self.dport = array('H')
+        self.inode = array('Q')
+        self.uid = array('I')
+        self.rqueue = array('I')
+        self.wqueue = array('I')
+        self.bytes_acked = array('Q')       # Enviados y confirmados (solo TCP)
+        self.bytes_received = array('Q')    # Recibidos (solo TCP)
+        self.src = bytearray()              # 16 bytes por socket
+        self.dst = bytearray()
+        # Identidad del socket en bytes (extremos, puertos y protocolo) para
+        # comparar tablas sucesivas con operaciones de conjuntos
+        self.key: List[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self.inode)
+
+    def append(self, family, proto, state, sport, dport, src, dst, inode,
+               uid=0, rqueue=0, wqueue=0, bytes_acked=0, bytes_received=0, key=b''):
+        self.family.append(family)
+        self.proto.append(proto)
+        self.state.append(state)
+        self.sport.append(sport)
+        self.dport.append(dport)
+        self.src += src
+        self.dst += dst
+        self.inode.append(inode)
+        self.uid.append(uid)
+        self.rqueue.append(rqueue)
+        self.wqueue.append(wqueue)
+        self.bytes_acked.append(bytes_acked)
+        self.bytes_received.append(bytes_received)
+        self.key.append(key)
+
+    def extend_rows(self, rows: List[tuple]):
+        """Añade de golpe filas con los campos en el orden de append()"""
+        if not rows:
+            return
+        (family, proto, state, sport, dport, src, dst, inode, uid, rqueue, wqueue,
+         bytes_acked, bytes_received, key) = zip(*rows)
+        self.family.extend(family)
+        self.proto.extend(proto)
+        self.state.extend(state)
+        self.sport.extend(sport)
+        self.dport.extend(dport)
+        self.src += b''.join(src)
+        self.dst += b''.join(dst)
+        self.inode.extend(inode)
+        self.uid.extend(uid)
+        self.rqueue.extend(rqueue)
+        self.wqueue.extend(wqueue)
+        self.bytes_acked.extend(bytes_acked)
+        self.bytes_received.extend(bytes_received)
+        self.key.extend(key)
+
+    def extend(self, other: "SocketTable"):
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def address(self, index: int, remote: bool = False) -> str:
+        """IP de origen (o destino) del socket `index` como texto"""
+        raw = self.dst if remote else self.src
+        start = index * 16
+        if self.family[index] == socket.AF_INET:
+            return socket.inet_ntop(socket.AF_INET, bytes(raw[start:start + 4]))
+        return socket.inet_ntop(socket.AF_INET6, bytes(raw[start:start + 16]))
+
+    def state_name(self, index: int) -> str:
+        if self.proto[index] == IPPROTO_UDP:
+            # UDP no tiene estados: 1 es "conectado", 7 es "sin conectar"
+            return "ESTABLISHED" if self.state[index] == 1 else "UNCONN"
+        return TCP_STATES.get(self.state[index], "UNKNOWN")
+
+
+def _parse_dump(sock, buffer: bytearray, table: SocketTable, proto: int, info: bool):
+    unpack_msg = _NL_DIAG_MSG.unpack_from
+    unpack_rta = _RTATTR.unpack_from
+    unpack_bytes = _TCP_BYTES.unpack_from
+    msg_size = _NL_DIAG_MSG.size
+    ntohs = _ntohs
+    key_end = _KEY_END.get(proto, 56)
+    while True:
+        n = sock.recv_into(buffer)
+        data = bytes(memoryview(buffer)[:n])
+        # Las filas de cada lectura se pasan a la tabla de una vez
+        rows = []
+        append = rows.append
+        offset = 0
+        while offset < n:
+            if n - offset < msg_size:
+                length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+            else:
+                (length, msg_type, family, state, _, _, sport, dport, src, dst, _, _,
+                 rqueue, wqueue, uid, inode) = unpack_msg(data, offset)
+            if msg_type == NLMSG_DONE:
+                table.extend_rows(rows)
+                return
+            if msg_type == NLMSG_ERROR:
+                (errno,) = struct.unpack_from('=i', data, offset + 16)
+                raise OSError(-errno, os.strerror(-errno))
+            acked = received = 0
+            if info:
+                attr = offset + msg_size
+                end = offset + length
+                while attr + 4 <= end:
+                    rta_len, rta_type = unpack_rta(data, attr)
+                    if rta_len < 4:
+                        break
+                    if rta_type == INET_DIAG_INFO and rta_len >= 4 + _TCP_BYTES_OFFSET + 16:
+                        acked, received = unpack_bytes(data, attr + 4 + _TCP_BYTES_OFFSET)
+                    attr += (rta_len + 3) & ~3
+            append((family, proto, state, ntohs(sport), ntohs(dport), src, dst, inode,
+                    uid, rqueue, wqueue, acked, received,
+                    data[offset + _SOCKID_START:offset + key_end]))
+            offset += (length + 3) & ~3
+        table.extend_rows(rows)
+
+
+def dump(protocols: Iterable[int] = (IPPROTO_TCP, IPPROTO_UDP),
+         families: Iterable[int] = (socket.AF_INET, socket.AF_INET6),
+         info: bool = False) -> SocketTable:
+    """
+    Todos los sockets de los protocolos y familias indicados
+
+    Con `info=True` se piden los contadores de bytes de TCP (tcp_info).
+    Lanza OSError si el kernel no admite sock_diag para algún protocolo.
+    """
+    table = SocketTable()
+    ext = (1 << (INET_DIAG_INFO - 1)) if info else 0
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_SOCK_DIAG) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        buffer = bytearray(1 << 20)
+        seq = 0
+        for proto in protocols:
+            for family in families:
+                seq += 1
+                request = _DIAG_REQ.pack(family, proto, ext, 0, 0xFFFFFFFF)
+                header = _NLMSGHDR.pack(_NLMSGHDR.size + len(request), SOCK_DIAG_BY_FAMILY,
+                                        NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+                sock.send(header + request)
+                _parse_dump(sock, buffer, table, proto, info)
+    return table
+
+
+def available() -> bool:
+    """True si se puede usar sock_diag en este sistema"""
+    if not hasattr(socket, "AF_NETLINK"):
+        return False
+    try:
+        dump(protocols=(IPPROTO_TCP,), families=(socket.AF_INET,))
+        return True
+    except OSError:
+        return False
+
+
+def _proc_address(text: bytes) -> bytes:
+    """'0100007F' (o 32 cifras para IPv6) -> IP en orden de red, en 16 bytes"""
+    words = [int(text[i:i + 8], 16) for i in range(0, len(text), 8)]
+    return _WORDS[len(text) // 2].pack(*words).ljust(16, b'\0')
+
+
+def read_proc_net(protocols: Iterable[int] = (IPPROTO_TCP, IPPROTO_UDP),
+                  families: Iterable[int] = (socket.AF_INET, socket.AF_INET6),
+                  proc: str = "/proc") -> SocketTable:
+    """Lo mismo que dump() leyendo /proc/net (sin contadores de bytes)"""
+    table = SocketTable()
+    append = table.append
+    addresses: Dict[bytes, bytes] = {}
+    for proto in protocols:
+        separator = b'/' if proto == IPPROTO_TCP else b'|'     # Clave distinta por protocolo
+        for family in families:
+            try:
+                with open(f"{proc}/net/{_PROC_NET_FILES[proto, family]}", 'rb') as f:
+                    lines = f.read().splitlines()
+            except FileNotFoundError:
+                continue    # Por ejemplo, IPv6 desactivado
+            for line in lines[1:]:
+                # sl local remoto st tx:rx tr:when retrnsmt uid timeout inodo ...
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                local, _, sport = fields[1].partition(b':')
+                remote, _, dport = fields[2].partition(b':')
+                src = addresses.get(local)
+                if src is None:
+                    src = addresses[local] = _proc_address(local)
+                dst = addresses.get(remote)
+                if dst is None:
+                    dst = addresses[remote] = _proc_address(remote)
+                wqueue, _, rqueue = fields[4].partition(b':')
+                append(family, proto, int(fields[3], 16), int(sport, 16), int(dport, 16),
+                       src, dst, int(fields[9]), int(fields[7]), int(rqueue, 16), int(wqueue, 16),
+                       0, 0, fields[1] + separator + fields[2])
+    return table
+
+
+class InodePidMap:
+    """Inodo de socket -> PID, con refresco incremental de /proc"""
+
+    def __init__(self, proc: str = "/proc"):
+        self.proc = proc
+        self.owner: Dict[int, int] = {}             # inodo -> pid
+        self.pid_inodes: Dict[int, Set[int]] = {}   # pid -> inodos
+        self.unresolved: Set[int] = set()           # ya buscados sin éxito
+        self.full_scans = 0
+
+    def _scan_pid(self, pid: int):
+        inodes = set()
+        try:
+            with os.scandir(f"{self.proc}/{pid}/fd") as entries:
+                for entry in entries:
+                    try:
+                        link = os.readlink(entry.path)
+                    except OSError:
+                        continue
+                    if link.startswith("socket:["):
+                        inodes.add(int(link[8:-1]))
+        except OSError:
+            pass    # Proceso terminado o sin permisos
+        old = self.pid_inodes.get(pid)
+        if old:
+            for inode in old - inodes:
+                if self.owner.get(inode) == pid:
+                    del self.owner[inode]
+        self.pid_inodes[pid] = inodes
+        for inode in inodes:
+            self.owner[inode] = pid
+
+    def _forget_pid(self, pid: int):
+        for inode in self.pid_inodes.pop(pid, ()):
+            if self.owner.get(inode) == pid:
+                del self.owner[inode]
+
+    def refresh(self, wanted: Iterable[int] = ()):
+        """
+        Actualiza el mapa: se olvidan los procesos terminados y se leen los
+        nuevos. Los ya conocidos solo se releen si algún inodo de `wanted` no
+        tiene dueño (y cada inodo desconocido provoca como mucho una relectura).
+        """
+        try:
+            pids = {int(name) for name in os.listdir(self.proc) if name.isdigit()}
+        except OSError:
+            return
+        known = set(self.pid_inodes)
+        for pid in known - pids:
+            self._forget_pid(pid)
+        for pid in pids - known:
+            self._scan_pid(pid)
+        wanted = set(wanted)
+        wanted.discard(0)   # TIME_WAIT y similares no tienen inodo
+        missing = wanted - self.owner.keys() - self.unresolved
+        if missing:
+            self.full_scans += 1
+            for pid in pids & known:
+                self._scan_pid(pid)
+            self.unresolved |= missing - self.owner.keys()
+        # Los inodos sin resolver que ya no existen no hace falta recordarlos
+        self.unresolved &= wanted
+
+    def get(self, inode: int) -> Optional[int]:
+        return self.owner.get(inode)
+
+
+class ProcessTraffic:
+    """
+    Tráfico de red por proceso con una enumeración de sockets por tick
+
+    Con sock_diag los bytes salen de tcp_info (bytes_acked / bytes_received)
+    de cada socket TCP, sumados por PID a través de InodePidMap. UDP no tiene
+    contadores por socket: sus sockets cuentan como conexiones pero no suman
+    bytes. Sin sock_diag se usa una única llamada a psutil.net_connections()
+    y solo se cuentan conexiones (`has_bytes` es False).
+    """
+
+    def __init__(self):
+        self.use_netlink = available()
+        self.has_bytes = self.use_netlink
+        self.pids = InodePidMap()
+        self._last: Dict[int, tuple] = {}   # inodo -> (enviados, recibidos)
+        self._last_time = None
+        self._names: Dict[int, tuple] = {}  # pid -> (nombre, usuario)
+
+    def _process_info(self, pid: int) -> tuple:
+        info = self._names.get(pid)
+        if info is None:
+            try:
+                proc = psutil.Process(pid)
+                info = (proc.name(), proc.username() or "N/A")
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                info = ("?", "N/A")
+            self._names[pid] = info
+        return info
+
+    def sample(self) -> List[dict]:
+        """
+        Procesos con sockets: pid, name, username, download, upload (bytes/s),
+        bytes_recv, bytes_sent (bytes del intervalo) y connections
+        """
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time else 0.0
+        first = self._last_time is None
+        self._last_time = now
+        connections: Dict[int, int] = {}
+        download: Dict[int, float] = {}
+        upload: Dict[int, float] = {}
+
+        if self.use_netlink:
+            table = dump(info=True)
+            self.pids.refresh(table.inode)
+            owner = self.pids.owner
+            last = self._last
+            current = {}
+            inode_col, proto_col = table.inode, table.proto
+            acked_col, received_col = table.bytes_acked, table.bytes_received
+            for i in range(len(table)):
+                inode = inode_col[i]
+                tcp = proto_col[i] == IPPROTO_TCP
+                if tcp:
+                    # Se guarda aunque aún no se sepa el dueño: si aparece en
+                    # la próxima muestra, su delta no incluirá todo lo anterior
+                    sent, received = acked_col[i], received_col[i]
+                    current[inode] = (sent, received)
+                pid = owner.get(inode)
+                if pid is None:
+                    continue
+                connections[pid] = connections.get(pid, 0) + 1
+                if not tcp:
+                    continue
+                old = last.get(inode)
+                if old is not None:
+                    sent -= old[0]
+                    received -= old[1]
+                elif first:
+                    continue    # Sin referencia: lo acumulado antes no es de este intervalo
+                if sent > 0:
+                    upload[pid] = upload.get(pid, 0) + sent
+                if received > 0:
+                    download[pid] = download.get(pid, 0) + received
+            self._last = current
+        else:
+            for conn in psutil.net_connections(kind='inet'):
+                if conn.pid:
+                    connections[conn.pid] = connections.get(conn.pid, 0) + 1
+
+        # Olvidar nombres de procesos que ya no tienen sockets
+        for pid in [pid for pid in self._names if pid not in connections]:
+            del self._names[pid]
+
+        result = []
+        for pid, count in connections.items():
+            name, username = self._process_info(pid)
+            result.append({
+                'pid': pid,
+                'name': name,
+                'username': username,
+                'download': download.get(pid, 0) / elapsed if elapsed > 0 else 0,
+                'upload': upload.get(pid, 0) / elapsed if elapsed > 0 else 0,
+                'bytes_recv': download.get(pid, 0),
+                'bytes_sent': upload.get(pid, 0),
+                'connections': count,
+            })
+        return result
+
+
+class ConnectionLister:
+    """
+    Conexiones TCP/UDP del sistema con el proceso al que pertenecen
+
+    Cada muestra es una enumeración completa (sock_diag o, como respaldo,
+    /proc/net) guardada en una SocketTable. Los PIDs salen de InodePidMap y
+    los nombres de proceso y las IPs en texto se guardan en caché.
+    """
+
+    MAX_HOSTS = 65536   # Tamaño máximo de la caché de IPs en texto
+
+    def __init__(self, proc: str = "/proc"):
+        self.proc = proc
+        self.use_netlink = available()
+        self.backend = "sock_diag" if self.use_netlink else "/proc/net"
+        self.pids = InodePidMap(proc)
+        self._names: Dict[int, str] = {}    # pid -> "pid/nombre"
+        # familia -> {IP en bytes: texto}
+        self._hosts: Dict[int, Dict[bytes, str]] = {socket.AF_INET: {}, socket.AF_INET6: {}}
+
+    def sample(self) -> SocketTable:
+        """Todos los sockets, con el mapa de inodos a PID ya actualizado"""
+        if self.use_netlink:
+            try:
+                table = dump()
+            except OSError:
+                self.use_netlink = False
+                self.backend = "/proc/net"
+                table = read_proc_net(proc=self.proc)
+        else:
+            table = read_proc_net(proc=self.proc)
+        self.pids.refresh(table.inode)
+        names = self._names
+        for pid in [pid for pid in names if pid not in self.pids.pid_inodes]:
+            del names[pid]
+        return table
+
+    def process_label(self, pid: int) -> str:
+        label = self._names.get(pid)
+        if label is None:
+            try:
+                label = f"{pid}/{psutil.Process(pid).name()}"
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                label = str(pid)
+            self._names[pid] = label
+        return label
+
+    def _host(self, family: int, raw: bytes) -> str:
+        host = socket.inet_ntop(family, raw)
+        if family != socket.AF_INET:
+            host = f"[{host}]"
+        self._hosts[family][raw] = host
+        return host
+
+    def rows(self, table: SocketTable) -> List[Tuple[str, str, str, str, str]]:
+        """(proto, local, remoto, estado, "pid/programa") de cada socket"""
+        inet, inet6 = socket.AF_INET, socket.AF_INET6
+        hosts4, hosts6 = self._hosts[inet], self._hosts[inet6]
+        if len(hosts4) + len(hosts6) > self.MAX_HOSTS:
+            hosts4.clear()
+            hosts6.clear()
+        make_host = self._host
+        owner = self.pids.owner
+        names = self._names
+        label = self.process_label
+        udp_states = {1: "ESTABLISHED"}
+        src, dst = bytes(table.src), bytes(table.dst)
+        result = []
+        append = result.append
+        columns = zip(table.family, table.proto, table.state, table.sport, table.dport, table.inode)
+        for start, (family, proto, state, sport, dport, inode) in zip(range(0, len(src), 16), columns):
+            if family == inet:
+                local = src[start:start + 4]
+                remote = dst[start:start + 4]
+                hosts = hosts4
+            else:
+                local = src[start:start + 16]
+                remote = dst[start:start + 16]
+                hosts = hosts6
+            local = hosts.get(local) or make_host(family, local)
+            remote = hosts.get(remote) or make_host(family, remote)
+            if proto == IPPROTO_TCP:
+                proto_text = "tcp"
+                state_text = TCP_STATES.get(state, "UNKNOWN")
+            else:
+                proto_text = PROTO_NAMES.get(proto) or str(proto)
+                state_text = udp_states.get(state, "UNCONN")
+            pid = owner.get(inode)
+            if pid is None:
+                process = ""
+            else:
+                process = names.get(pid) or label(pid)
+            append((proto_text,
+                    f"{local}:{sport}" if sport else f"{local}:*",
+                    f"{remote}:{dport}" if dport else f"{remote}:*",
+                    state_text, process))
+        return result
+
+
+if __name__ == "__main__":
+    # Benchmark: python sock_diag.py [sockets]  (crea los sockets en loopback,
+    # repartidos en procesos hijos para no chocar con el límite de descriptores)
+    import resource
+    import signal
+    import sys
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_child = max(1000, resource.getrlimit(resource.RLIMIT_NOFILE)[0] - 100)
+
+    def open_sockets(count: int, first: int):
+        # Un 10% de sockets TCP conectados (pares) y el resto UDP en IPv4 e IPv6
+        sockets = []
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1024)
+        sockets.append(listener)
+        for _ in range(count // 20):
+            client = socket.create_connection(listener.getsockname())
+            server, _ = listener.accept()
+            sockets += (client, server)
+        for i in range(first, first + count - len(sockets)):
+            family = socket.AF_INET6 if i % 4 == 0 else socket.AF_INET
+            udp = socket.socket(family, socket.SOCK_DGRAM)
+            host = "::1" if family == socket.AF_INET6 else f"127.0.{i // 40000}.1"
+            udp.bind((host, 20000 + (i // 4 if family == socket.AF_INET6 else i % 40000)))
+            sockets.append(udp)
+        return sockets
+
+    children = []
+    for first in range(0, n, per_child):
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            held = open_sockets(min(per_child, n - first), first)
+            os.write(ready_w, b"1")
+            signal.pause()
+            os._exit(0)
+        os.close(ready_w)
+        os.read(ready_r, 1)
+        os.close(ready_r)
+        children.append(pid)
+
+    def timed(label, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        print(f"{label:<34} {(time.perf_counter() - start) * 1000:8.1f} ms")
+        return result
+
+    try:
+        for use_netlink in ((True, False) if available() else (False,)):
+            lister = ConnectionLister()
+            lister.use_netlink = use_netlink
+            name = "sock_diag" if use_netlink else "/proc/net"
+            table = timed(f"{name}: primera muestra", lister.sample)
+            timed(f"{name}: filas (caché vacía)", lister.rows, table)
+            start = time.perf_counter()
+            table = lister.sample()
+            rows = lister.rows(table)
+            print(f"{name + ': refresco completo':<34} {(time.perf_counter() - start) * 1000:8.1f} ms "
+                  f"({len(rows):,} filas, {lister.pids.full_scans} relecturas de /proc)")
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
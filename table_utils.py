@@ -0,0 +1,148 @@
+"""
+Utilidades para tablas (DataTable) que se refrescan periódicamente
+
+sync_table() compara las filas nuevas con las de la vez anterior y aplica solo
+las diferencias (altas, bajas y celdas cambiadas), en lugar de vaciar la tabla
+y volver a llenarla. Así se conservan el scroll y la fila seleccionada, y el
+coste por refresco depende de lo que cambia, no del número de filas.
+"""
+
+from typing import Dict, Hashable, Sequence, Tuple
+
+from textual.widgets import DataTable
+
+
+# remove_row() de DataTable recorre toda la tabla: quitar una fila cuesta más
+# o menos como volver a añadir REBUILD_RATIO filas. Con muchas bajas sale más
+# barato reconstruir (conservando cursor y scroll).
+REBUILD_RATIO = 0.4
+
+
+def sync_table(table: DataTable, rows: Dict[Hashable, Sequence], ordered: bool = False) -> Tuple[int, int, int]:
+    """
+    Deja en `table` exactamente las filas de `rows` ({clave: valores})
+
+    Las celdas cambiadas se actualizan en su sitio y las filas nuevas se
+    añaden al final. Con `ordered=True` las filas quedan además en el orden de
+    `rows` (solo se reordena si ha cambiado). Devuelve (altas, cambios, bajas).
+    """
+    # DataTable solo localiza celdas por claves de texto
+    rows = {str(key): tuple(values) for key, values in rows.items()}
+    state = getattr(table, "_sync_rows", None)
+    # Si alguien ha tocado la tabla por su cuenta (p. ej. clear()) se empieza de cero
+    if state is None or len(state) != table.row_count:
+        state = {}
+        if table.row_count:
+            table.clear()
+
+    gone = [key for key in state if key not in rows]
+    added = sum(1 for key in rows if key not in state)
+    if gone and len(gone) * table.row_count * REBUILD_RATIO > len(rows):
+        _rebuild(table, rows)
+        changed = sum(1 for key, values in rows.items() if key in state and state[key] != values)
+        return added, changed, len(gone)
+
+    columns = list(table.columns)
+    updated = 0
+    for key in gone:
+        table.remove_row(key)
+        del state[key]
+    for key, values in rows.items():
+        old = state.get(key)
+        if old is None:
+            table.add_row(*values, key=key)
+        elif old != values:
+            for column, old_value, value in zip(columns, old, values):
+                if old_value != value:
+                    table.update_cell(key, column, value)
+            updated += 1
+        state[key] = values
+
+    if ordered and list(state) != list(rows):
+        _reorder(table, rows)
+    # El orden guardado sigue al de `rows` para la siguiente comparación
+    table._sync_rows = {key: state[key] for key in rows}
+    return added, updated, len(gone)
+
+
+def _rebuild(table: DataTable, rows: Dict[str, tuple]):
+    """Vacía y rellena la tabla manteniendo la fila seleccionada y el scroll"""
+    cursor_key = None
+    if table.row_count and 0 <= table.cursor_row < table.row_count:
+        cursor_key = table.coordinate_to_cell_key(table.cursor_coordinate).row_key.value
+    scroll_x, scroll_y = table.scroll_x, table.scroll_y
+
+    table.clear()
+    state = {}
+    for key, values in rows.items():
+        table.add_row(*values, key=key)
+        state[key] = values
+    table._sync_rows = state
+
+    if cursor_key in state:
+        table.move_cursor(row=table.get_row_index(cursor_key), scroll=False)
+    table.scroll_to(scroll_x, scroll_y, animate=False)
+
+
+def _reorder(table: DataTable, rows: Dict[str, tuple]):
+    """Ordena la tabla como `rows` (si los valores se pueden usar de clave)"""
+    try:
+        rank = {values: index for index, values in enumerate(rows.values())}
+    except TypeError:
+        return
+    table.sort(key=lambda values: rank.get(tuple(values), 0))
+
+
+if __name__ == "__main__":
+    # Benchmark: python table_utils.py [filas]  (refresco con un 1% de filas cambiadas)
+    import asyncio
+    import random
+    import sys
+    import time
+
+    from textual.app import App, ComposeResult
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    class BenchApp(App):
+        def compose(self) -> ComposeResult:
+            yield DataTable()
+
+    def frame(version: int, churn: bool) -> Dict[str, tuple]:
+        rows = {}
+        for i in range(n):
+            # En cada versión cambia el valor de ~1% de las filas y, con
+            # `churn`, además se sustituyen otras ~1% por filas nuevas
+            ident = f"v{version}-{i}" if churn and i < n // 100 else f"k{i}"
+            value = random.random() if i % 100 == version % 100 else 0.5
+            rows[ident] = (ident, f"10.0.{i // 256 % 256}.{i % 256}", f"{value:.3f}", "ESTABLISHED")
+        return rows
+
+    async def main():
+        app = BenchApp()
+        async with app.run_test() as pilot:
+            table = app.query_one(DataTable)
+            table.add_columns("Clave", "IP", "Valor", "Estado")
+            for churn in (False, True):
+                frames = [frame(v, churn) for v in range(6)]
+
+                table.clear()
+                start = time.perf_counter()
+                for rows in frames[1:]:
+                    table.clear()
+                    for values in rows.values():
+                        table.add_row(*values)
+                rebuild = (time.perf_counter() - start) / 5 * 1000
+                await pilot.pause()
+
+                table.clear()
+                sync_table(table, frames[0])
+                start = time.perf_counter()
+                for rows in frames[1:]:
+                    counts = sync_table(table, rows)
+                diff = (time.perf_counter() - start) / 5 * 1000
+                await pilot.pause()
+                print(f"{n:,} filas, {'con' if churn else 'sin'} altas/bajas: clear()+add_row {rebuild:.1f} ms, "
+                      f"sync_table {diff:.1f} ms ({counts[0]} altas, {counts[1]} cambios, {counts[2]} bajas)")
+
+    asyncio.run(main())
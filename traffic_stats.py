@@ -0,0 +1,199 @@
+"""
+Estadísticas de tráfico en ventana deslizante con coste O(1) por paquete
+
+- Paquetes y bytes por segundo por protocolo: anillo de `window` cubetas de
+  un segundo por protocolo (array de tamaño fijo).
+- Top de hosts origen/destino: contadores acotados con decaimiento.
+- Histograma de tamaños: anillo de cubetas por segundo y rango de tamaño.
+
+La memoria es constante: no depende del número de paquetes ni de hosts.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+
+# Límite superior (incluido) de cada rango del histograma; el último es abierto
+SIZE_BINS = (64, 127, 255, 511, 1023, 1517)
+SIZE_LABELS = ("≤64", "65-127", "128-255", "256-511", "512-1023", "1024-1517", "≥1518")
+
+OTHER_PROTOCOL = "Otros"
+
+# Rango de cada tamaño posible precalculado (una indexación por paquete)
+_SIZE_BIN_TABLE = bytes(bisect_left(SIZE_BINS, n) for n in range(65536))
+
+
+class HeavyHitters:
+    """
+    Contadores aproximados de los elementos más frecuentes en memoria acotada
+
+    Cuando hay más de 2*capacity claves se descartan las menores hasta
+    quedarse con `capacity` (coste amortizado O(1) por inserción). decay()
+    reduce todos los valores para que el top refleje el tráfico reciente.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+
+    def add(self, key: str, amount: float = 1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + amount
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        keep = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+        self.counts = dict(keep)
+
+    def decay(self, factor: float = 0.5):
+        self.counts = {key: value * factor for key, value in self.counts.items() if value * factor >= 1}
+
+    def top(self, n: int = 10) -> List[Tuple[str, float]]:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def clear(self):
+        self.counts = {}
+
+
+class TrafficStats:
+    """Contadores deslizantes por protocolo, hosts y tamaño de paquete"""
+
+    def __init__(self, window: int = 60, max_protocols: int = 16, host_capacity: int = 256):
+        self.window = window
+        self.max_protocols = max_protocols
+        self.protocols: Dict[str, int] = {}      # nombre -> fila en los anillos
+        self.proto_totals: List[int] = []
+        self.packets = array('Q', bytes(8 * window * max_protocols))
+        self.bytes = array('Q', bytes(8 * window * max_protocols))
+        self.sizes = array('Q', bytes(8 * window * len(SIZE_LABELS)))
+        self.src_hosts = HeavyHitters(host_capacity)
+        self.dst_hosts = HeavyHitters(host_capacity)
+        self.total_packets = 0
+        self.total_bytes = 0
+        self.current_second = None
+
+    def _protocol_row(self, name: str) -> int:
+        row = self.protocols.get(name)
+        if row is None:
+            if len(self.protocols) < self.max_protocols - 1 or name == OTHER_PROTOCOL:
+                row = len(self.protocols)
+                self.protocols[name] = row
+                self.proto_totals.append(0)
+            else:
+                row = self._protocol_row(OTHER_PROTOCOL)
+        return row
+
+    def _advance(self, second: int):
+        """Pone a cero las cubetas de los segundos que se han saltado"""
+        if self.current_second is None:
+            self.current_second = second
+            return
+        gap = second - self.current_second
+        if gap <= 0:
+            return
+        window = self.window
+        nprotos = self.max_protocols
+        nsizes = len(SIZE_LABELS)
+        for step in range(1, min(gap, window) + 1):
+            slot = (self.current_second + step) % window
+            base = slot * nprotos
+            for i in range(nprotos):
+                self.packets[base + i] = 0
+                self.bytes[base + i] = 0
+            base = slot * nsizes
+            for i in range(nsizes):
+                self.sizes[base + i] = 0
+        # Olvidar progresivamente a los hosts una vez por ventana
+        if self.current_second // window != second // window:
+            self.src_hosts.decay()
+            self.dst_hosts.decay()
+        self.current_second = second
+
+    def add(self, ts: float, protocol: str, src: str, dst: str, length: int):
+        """Contabiliza un paquete (O(1))"""
+        second = int(ts)
+        if second != self.current_second:
+            self._advance(second)
+        slot = self.current_second % self.window
+        row = self._protocol_row(protocol)
+        index = slot * self.max_protocols + row
+        self.packets[index] += 1
+        self.bytes[index] += length
+        self.proto_totals[row] += 1
+        self.sizes[slot * len(SIZE_LABELS) + _SIZE_BIN_TABLE[min(length, 65535)]] += 1
+        if src:
+            self.src_hosts.add(src, length)
+        if dst:
+            self.dst_hosts.add(dst, length)
+        self.total_packets += 1
+        self.total_bytes += length
+
+    def rates(self, seconds: int = 5, now: Optional[float] = None) -> Dict[str, Tuple[float, float, int]]:
+        """
+        Media de paquetes/s y bytes/s por protocolo en los últimos `seconds`
+        segundos completos, más el total acumulado de paquetes
+        """
+        result = {}
+        if self.current_second is None:
+            return result
+        if now is not None:
+            self._advance(int(now))
+        seconds = max(1, min(seconds, self.window - 1))
+        for name, row in self.protocols.items():
+            pkts = nbytes = 0
+            for step in range(1, seconds + 1):
+                slot = (self.current_second - step) % self.window
+                index = slot * self.max_protocols + row
+                pkts += self.packets[index]
+                nbytes += self.bytes[index]
+            result[name] = (pkts / seconds, nbytes / seconds, self.proto_totals[row])
+        return result
+
+    def size_histogram(self) -> List[int]:
+        """Paquetes por rango de tamaño en toda la ventana"""
+        nsizes = len(SIZE_LABELS)
+        hist = [0] * nsizes
+        for slot in range(self.window):
+            base = slot * nsizes
+            for i in range(nsizes):
+                hist[i] += self.sizes[base + i]
+        return hist
+
+    def snapshot(self, top_hosts: int = 10, seconds: int = 5, now: Optional[float] = None) -> dict:
+        """Resumen en tipos simples (se puede pasar a otro hilo o proceso)"""
+        return {
+            'rates': self.rates(seconds, now),
+            'src_hosts': self.src_hosts.top(top_hosts),
+            'dst_hosts': self.dst_hosts.top(top_hosts),
+            'sizes': self.size_histogram(),
+            'total_packets': self.total_packets,
+            'total_bytes': self.total_bytes,
+        }
+
+    def clear(self):
+        self.__init__(self.window, self.max_protocols, self.src_hosts.capacity)
+
+
+def merge_stats_snapshots(snapshots: List[dict], top_hosts: int = 10) -> dict:
+    """Suma los resúmenes de varios TrafficStats (p. ej. de cada decodificador)"""
+    merged = {'rates': {}, 'src_hosts': [], 'dst_hosts': [], 'sizes': [0] * len(SIZE_LABELS),
+              'total_packets': 0, 'total_bytes': 0}
+    src: Dict[str, float] = {}
+    dst: Dict[str, float] = {}
+    for snap in snapshots:
+        for name, (pps, bps, total) in snap['rates'].items():
+            old = merged['rates'].get(name, (0.0, 0.0, 0))
+            merged['rates'][name] = (old[0] + pps, old[1] + bps, old[2] + total)
+        for host, value in snap['src_hosts']:
+            src[host] = src.get(host, 0) + value
+        for host, value in snap['dst_hosts']:
+            dst[host] = dst.get(host, 0) + value
+        for i, count in enumerate(snap['sizes']):
+            merged['sizes'][i] += count
+        merged['total_packets'] += snap['total_packets']
+        merged['total_bytes'] += snap['total_bytes']
+    merged['src_hosts'] = sorted(src.items(), key=lambda item: item[1], reverse=True)[:top_hosts]
+    merged['dst_hosts'] = sorted(dst.items(), key=lambda item: item[1], reverse=True)[:top_hosts]
+    return merged